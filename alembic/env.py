@@ -1,6 +1,10 @@
 from app.db import Base
 from app.models.subscription import Subscription
 from app.models.webhook_log import WebhookLog
+from app.models.webhook_payload import WebhookPayload
+from app.models.delivery_stats import SubscriptionStats
+from app.models.delivery import Delivery
+from app.models.dead_letter import DeadLetter
 
 
 from logging.config import fileConfig
@@ -0,0 +1,61 @@
+"""store payloads once per delivery in webhook_payloads
+
+Revision ID: 5d1e8b27a4f3
+Revises: c3949683cac0
+Create Date: 2026-10-17 14:03:27.519402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '5d1e8b27a4f3'
+down_revision: Union[str, None] = 'c3949683cac0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'webhook_payloads',
+        sa.Column('delivery_id', sa.UUID(), nullable=False),
+        sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('payload_hash', sa.String(length=64), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('delivery_id')
+    )
+    op.create_index('idx_webhook_payload_created_at', 'webhook_payloads', ['created_at'], unique=False)
+    # Keep the first attempt's copy of each delivery's payload. The hash here is over
+    # jsonb's text form; new rows hash the canonical JSON, so hashes are only compared
+    # between rows written the same way.
+    op.execute(
+        """
+        INSERT INTO webhook_payloads (delivery_id, payload, payload_hash, created_at)
+        SELECT DISTINCT ON (delivery_id)
+               delivery_id, payload, encode(sha256(convert_to(payload::text, 'UTF8')), 'hex'), created_at
+        FROM webhook_logs
+        ORDER BY delivery_id, attempt_number, created_at
+        """
+    )
+    op.drop_column('webhook_logs', 'payload')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('webhook_logs', sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    op.execute(
+        """
+        UPDATE webhook_logs l SET payload = p.payload
+        FROM webhook_payloads p
+        WHERE p.delivery_id = l.delivery_id
+        """
+    )
+    # Attempts whose payload was already removed by retention get an empty object
+    op.execute("UPDATE webhook_logs SET payload = '{}'::jsonb WHERE payload IS NULL")
+    op.alter_column('webhook_logs', 'payload', nullable=False)
+    op.drop_index('idx_webhook_payload_created_at', table_name='webhook_payloads')
+    op.drop_table('webhook_payloads')
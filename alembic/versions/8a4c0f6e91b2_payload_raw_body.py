@@ -0,0 +1,44 @@
+"""store the raw delivered body instead of JSONB payload
+
+Revision ID: 8a4c0f6e91b2
+Revises: 5d1e8b27a4f3
+Create Date: 2026-10-17 16:25:08.301147
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '8a4c0f6e91b2'
+down_revision: Union[str, None] = '5d1e8b27a4f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing rows keep jsonb's text rendering, re-hashed so payload_hash always covers body
+    op.alter_column(
+        'webhook_payloads', 'payload',
+        new_column_name='body',
+        existing_type=postgresql.JSONB(astext_type=sa.Text()),
+        type_=sa.Text(),
+        existing_nullable=False,
+        postgresql_using='payload::text',
+    )
+    op.execute("UPDATE webhook_payloads SET payload_hash = encode(sha256(convert_to(body, 'UTF8')), 'hex')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column(
+        'webhook_payloads', 'body',
+        new_column_name='payload',
+        existing_type=sa.Text(),
+        type_=postgresql.JSONB(astext_type=sa.Text()),
+        existing_nullable=False,
+        postgresql_using='body::jsonb',
+    )
@@ -0,0 +1,30 @@
+"""per-subscription delivery limits
+
+Revision ID: a3d7e1f09c52
+Revises: f5b8c2a7d306
+Create Date: 2026-10-18 00:27:45.903118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d7e1f09c52'
+down_revision: Union[str, None] = 'f5b8c2a7d306'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NULL keeps the service-wide defaults from Settings
+    op.add_column('subscriptions', sa.Column('max_concurrency', sa.Integer(), nullable=True))
+    op.add_column('subscriptions', sa.Column('rate_limit_per_second', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('subscriptions', 'rate_limit_per_second')
+    op.drop_column('subscriptions', 'max_concurrency')
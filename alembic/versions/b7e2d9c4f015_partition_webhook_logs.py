@@ -0,0 +1,125 @@
+"""partition webhook_logs by day on created_at
+
+Rebuilds webhook_logs as a partitioned table and copies every row across in a
+single INSERT ... SELECT, inside the migration's transaction. webhook_logs is
+locked for writes until it commits, which takes time proportional to the table
+size: run it in a maintenance window, with workers stopped, on large tables (or
+let retention cleanup shrink the table first).
+
+Revision ID: b7e2d9c4f015
+Revises: 8a4c0f6e91b2
+Create Date: 2026-10-17 18:47:52.640913
+
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2d9c4f015'
+down_revision: Union[str, None] = '8a4c0f6e91b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('idx_webhook_log_created_at', ['created_at']),
+    ('idx_webhook_log_delivery_id', ['delivery_id']),
+    ('idx_webhook_log_subscription_id', ['subscription_id']),
+    ('ix_webhook_logs_delivery_id', ['delivery_id']),
+]
+
+# Partitions made ahead of today; the partition maintenance task keeps adding them afterwards
+DAYS_AHEAD = 3
+
+COLUMNS = (
+    "id, delivery_id, subscription_id, target_url, event_type, attempt_number, "
+    "status_code, status, error_details, created_at"
+)
+
+
+def _log_columns():
+    return [
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('delivery_id', sa.UUID(), nullable=False),
+        sa.Column('subscription_id', sa.UUID(), nullable=False),
+        sa.Column('target_url', sa.String(length=255), nullable=False),
+        sa.Column('event_type', sa.String(length=100), nullable=True),
+        sa.Column('attempt_number', sa.Integer(), nullable=False),
+        sa.Column('status_code', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(length=50), nullable=False),
+        sa.Column('error_details', sa.Text(), nullable=True),
+    ]
+
+
+def _retire_old_table() -> None:
+    """Move webhook_logs aside (freeing its index and constraint names) so it can be rebuilt"""
+    for name, _ in INDEXES:
+        op.drop_index(name, table_name='webhook_logs')
+    op.rename_table('webhook_logs', 'webhook_logs_old')
+    op.execute("ALTER TABLE webhook_logs_old RENAME CONSTRAINT webhook_logs_pkey TO webhook_logs_old_pkey")
+    op.execute(
+        "ALTER TABLE webhook_logs_old RENAME CONSTRAINT webhook_logs_subscription_id_fkey "
+        "TO webhook_logs_old_subscription_id_fkey"
+    )
+
+
+def _create_partitions(connection, start) -> None:
+    """The DEFAULT partition and one partition per UTC day from `start` (default today) through DAYS_AHEAD"""
+    op.execute("CREATE TABLE IF NOT EXISTS webhook_logs_default PARTITION OF webhook_logs DEFAULT")
+    today = datetime.now(timezone.utc).date()
+    day = start or today
+    while day <= today + timedelta(days=DAYS_AHEAD):
+        name = f"webhook_logs_p{day:%Y%m%d}"
+        if not connection.execute(sa.text("SELECT to_regclass(:name)"), {"name": name}).scalar():
+            day_start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+            op.execute(
+                f"CREATE TABLE {name} PARTITION OF webhook_logs "
+                f"FOR VALUES FROM ('{day_start.isoformat()}') TO ('{(day_start + timedelta(days=1)).isoformat()}')"
+            )
+        day += timedelta(days=1)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _retire_old_table()
+    op.create_table(
+        'webhook_logs',
+        *_log_columns(),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['subscription_id'], ['subscriptions.id'], name='webhook_logs_subscription_id_fkey'),
+        sa.PrimaryKeyConstraint('id', 'created_at'),
+        postgresql_partition_by='RANGE (created_at)',
+    )
+    for name, columns in INDEXES:
+        op.create_index(name, 'webhook_logs', columns, unique=False)
+
+    # Daily partitions for every day that still has rows, plus the days ahead
+    connection = op.get_bind()
+    oldest = connection.execute(sa.text("SELECT min(created_at) FROM webhook_logs_old")).scalar()
+    start = oldest.astimezone(timezone.utc).date() if oldest else None
+    _create_partitions(connection, start)
+
+    op.execute(
+        f"INSERT INTO webhook_logs ({COLUMNS}) "
+        f"SELECT {COLUMNS.replace('created_at', 'coalesce(created_at, now())')} FROM webhook_logs_old"
+    )
+    op.drop_table('webhook_logs_old')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _retire_old_table()
+    op.create_table(
+        'webhook_logs',
+        *_log_columns(),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['subscription_id'], ['subscriptions.id'], name='webhook_logs_subscription_id_fkey'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    for name, columns in INDEXES:
+        op.create_index(name, 'webhook_logs', columns, unique=False)
+    op.execute(f"INSERT INTO webhook_logs ({COLUMNS}) SELECT {COLUMNS} FROM webhook_logs_old")
+    # Dropping the partitioned parent drops all of its partitions
+    op.drop_table('webhook_logs_old')
@@ -0,0 +1,29 @@
+"""per-subscription retry policy
+
+Revision ID: b8f4a2c6e913
+Revises: a3d7e1f09c52
+Create Date: 2026-10-18 01:12:30.448271
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8f4a2c6e913'
+down_revision: Union[str, None] = 'a3d7e1f09c52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NULL keeps the service-wide retry defaults from Settings
+    op.add_column('subscriptions', sa.Column('retry_policy', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('subscriptions', 'retry_policy')
@@ -0,0 +1,49 @@
+"""event_types array with GIN index
+
+Revision ID: c3949683cac0
+Revises: 142bb092fb15
+Create Date: 2026-10-17 09:12:41.218734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3949683cac0'
+down_revision: Union[str, None] = '142bb092fb15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Comma-separated text -> varchar[]; blank lists become NULL (deliver all event types)
+    op.alter_column(
+        'subscriptions', 'event_types',
+        existing_type=sa.Text(),
+        type_=postgresql.ARRAY(sa.String(length=100)),
+        existing_nullable=True,
+        postgresql_using=(
+            "CASE WHEN event_types IS NULL OR btrim(event_types, ' ,') = '' THEN NULL "
+            "ELSE array_remove(regexp_split_to_array(btrim(event_types, ' ,'), '\\s*,\\s*'), '')::varchar(100)[] END"
+        ),
+    )
+    op.create_index(
+        'idx_subscription_event_types', 'subscriptions', ['event_types'],
+        unique=False, postgresql_using='gin'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_subscription_event_types', table_name='subscriptions', postgresql_using='gin')
+    op.alter_column(
+        'subscriptions', 'event_types',
+        existing_type=postgresql.ARRAY(sa.String(length=100)),
+        type_=sa.Text(),
+        existing_nullable=True,
+        postgresql_using="array_to_string(event_types, ',')",
+    )
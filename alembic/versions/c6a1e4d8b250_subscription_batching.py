@@ -0,0 +1,31 @@
+"""per-subscription micro-batching
+
+Revision ID: c6a1e4d8b250
+Revises: b8f4a2c6e913
+Create Date: 2026-10-18 03:41:07.215904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6a1e4d8b250'
+down_revision: Union[str, None] = 'b8f4a2c6e913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NULL keeps one request per event
+    op.add_column('subscriptions', sa.Column('batch_max_events', sa.Integer(), nullable=True))
+    op.add_column('subscriptions', sa.Column('batch_window_ms', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('subscriptions', 'batch_window_ms')
+    op.drop_column('subscriptions', 'batch_max_events')
@@ -0,0 +1,31 @@
+"""per-subscription fair scheduling weight and cap
+
+Revision ID: d2b7f5a9c614
+Revises: c6a1e4d8b250
+Create Date: 2026-10-18 05:02:44.817360
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2b7f5a9c614'
+down_revision: Union[str, None] = 'c6a1e4d8b250'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NULL: weight 1, no dispatch cap
+    op.add_column('subscriptions', sa.Column('lane_weight', sa.Integer(), nullable=True))
+    op.add_column('subscriptions', sa.Column('lane_max_per_second', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('subscriptions', 'lane_max_per_second')
+    op.drop_column('subscriptions', 'lane_weight')
@@ -0,0 +1,49 @@
+"""per-subscription delivery rollups
+
+Revision ID: d41f6a3b8c27
+Revises: b7e2d9c4f015
+Create Date: 2026-10-17 21:14:36.082915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41f6a3b8c27'
+down_revision: Union[str, None] = 'b7e2d9c4f015'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'subscription_delivery_stats',
+        sa.Column('subscription_id', sa.UUID(), nullable=False),
+        sa.Column('total_deliveries', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('successful_deliveries', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('failed_deliveries', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('subscription_id')
+    )
+    # Seed from the logs still within retention (the deliveries table doesn't exist yet)
+    op.execute(
+        """
+        INSERT INTO subscription_delivery_stats
+            (subscription_id, total_deliveries, successful_deliveries, failed_deliveries, updated_at)
+        SELECT subscription_id,
+               count(DISTINCT delivery_id),
+               count(DISTINCT delivery_id) FILTER (WHERE status = 'SUCCESS'),
+               count(DISTINCT delivery_id) FILTER (WHERE status = 'FAILURE'),
+               now()
+        FROM webhook_logs
+        GROUP BY subscription_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('subscription_delivery_stats')
@@ -0,0 +1,49 @@
+"""dead-letter store
+
+Revision ID: e7c3a9d2f481
+Revises: d2b7f5a9c614
+Create Date: 2026-10-18 06:41:09.215734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7c3a9d2f481'
+down_revision: Union[str, None] = 'd2b7f5a9c614'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'dead_letters',
+        sa.Column('delivery_id', sa.UUID(), nullable=False),
+        sa.Column('subscription_id', sa.UUID(), nullable=False),
+        sa.Column('event_type', sa.String(length=100), nullable=True),
+        sa.Column('body', sa.Text(), nullable=True),
+        sa.Column('attempt_count', sa.Integer(), nullable=False),
+        sa.Column('last_status_code', sa.Integer(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('replayed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('replay_delivery_id', sa.UUID(), nullable=True),
+        sa.PrimaryKeyConstraint('delivery_id')
+    )
+    # Replays only scan dead letters not replayed yet
+    op.create_index(
+        'idx_dead_letter_pending', 'dead_letters', ['subscription_id', 'created_at'],
+        unique=False, postgresql_where=sa.text('replayed_at IS NULL')
+    )
+    op.create_index('idx_dead_letter_created_at', 'dead_letters', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_dead_letter_created_at', table_name='dead_letters')
+    op.drop_index('idx_dead_letter_pending', table_name='dead_letters', postgresql_where=sa.text('replayed_at IS NULL'))
+    op.drop_table('dead_letters')
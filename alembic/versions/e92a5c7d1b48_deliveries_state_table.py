@@ -0,0 +1,59 @@
+"""deliveries table holding the current state of each delivery
+
+Revision ID: e92a5c7d1b48
+Revises: d41f6a3b8c27
+Create Date: 2026-10-17 23:02:11.457390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e92a5c7d1b48'
+down_revision: Union[str, None] = 'd41f6a3b8c27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'deliveries',
+        sa.Column('delivery_id', sa.UUID(), nullable=False),
+        sa.Column('subscription_id', sa.UUID(), nullable=False),
+        sa.Column('event_type', sa.String(length=100), nullable=True),
+        sa.Column('status', sa.String(length=50), nullable=False),
+        sa.Column('attempt_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('last_status_code', sa.Integer(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('next_retry_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_attempt_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('delivery_id')
+    )
+    # Latest attempt of every delivery still in the logs; first attempt time as created_at
+    op.execute(
+        """
+        INSERT INTO deliveries
+            (delivery_id, subscription_id, event_type, status, attempt_count,
+             last_status_code, last_error, last_attempt_at, created_at, updated_at)
+        SELECT DISTINCT ON (delivery_id)
+               delivery_id, subscription_id, event_type, status, attempt_number,
+               status_code, error_details, created_at,
+               min(created_at) OVER (PARTITION BY delivery_id), now()
+        FROM webhook_logs
+        ORDER BY delivery_id, attempt_number DESC, created_at DESC
+        """
+    )
+    op.create_index('idx_delivery_subscription_id', 'deliveries', ['subscription_id'], unique=False)
+    op.create_index('idx_delivery_created_at', 'deliveries', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_delivery_created_at', table_name='deliveries')
+    op.drop_index('idx_delivery_subscription_id', table_name='deliveries')
+    op.drop_table('deliveries')
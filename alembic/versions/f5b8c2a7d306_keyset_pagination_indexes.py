@@ -0,0 +1,41 @@
+"""keyset pagination indexes; consolidate duplicate delivery_id index
+
+Revision ID: f5b8c2a7d306
+Revises: e92a5c7d1b48
+Create Date: 2026-10-17 23:41:08.215634
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5b8c2a7d306'
+down_revision: Union[str, None] = 'e92a5c7d1b48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Created on the partitioned parent, so every partition (current and future) gets it
+    op.create_index(
+        'idx_webhook_log_subscription_created_at',
+        'webhook_logs',
+        ['subscription_id', sa.text('created_at DESC'), 'id'],
+        unique=False,
+    )
+    # Leading column of the composite index covers subscription_id lookups
+    op.drop_index('idx_webhook_log_subscription_id', table_name='webhook_logs')
+    # Same column as idx_webhook_log_delivery_id
+    op.drop_index('ix_webhook_logs_delivery_id', table_name='webhook_logs')
+    op.create_index('idx_subscription_created_at_id', 'subscriptions', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_subscription_created_at_id', table_name='subscriptions')
+    op.create_index('ix_webhook_logs_delivery_id', 'webhook_logs', ['delivery_id'], unique=False)
+    op.create_index('idx_webhook_log_subscription_id', 'webhook_logs', ['subscription_id'], unique=False)
+    op.drop_index('idx_webhook_log_subscription_created_at', table_name='webhook_logs')
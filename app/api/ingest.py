@@ -1,65 +1,394 @@
+import asyncio
 import json
 import uuid
-from fastapi import APIRouter, Body, Depends, HTTPException, status, Header
-from sqlalchemy.orm import Session
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Header
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db import get_db
-from app.models.subscription import Subscription
-from app.schemas.webhook import WebhookIngestion
+from app.celery_app import celery_app
+from app.config import settings
+from app.db import get_async_db
+from app.cache.subscriptions import aget_subscription
+from app.services.claim_check import astore_bodies, astore_body, should_claim_check
+from app.services.deliveries import create_deliveries
+from app.services.idempotency import aclaim_idempotency_key, arelease_idempotency_key, idempotency_key
+from app.services.lanes import aenqueue_deliveries
+from app.services.routing import match_subscriptions
 from app.workers.tasks import deliver_webhook
-from app.utils import verify_signature
+from app.utils import (
+    create_hmac,
+    should_deliver_to_subscription,
+    signatures_match,
+    strip_signature_prefix,
+    verify_signature,
+)
 
 router = APIRouter(
     prefix="/ingest",
     tags=["Webhook Ingestion (Payload)"],
 )
 
-@router.post("/{subscription_id}", status_code=status.HTTP_202_ACCEPTED)
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+# Placeholder for NDJSON lines that failed to parse, so item indexes stay aligned
+_INVALID_JSON = object()
+
+# Broker publishes are blocking socket calls, so they run on a dedicated pool
+# instead of the event loop (or the shared threadpool used by sync endpoints)
+_publish_executor = ThreadPoolExecutor(
+    max_workers=settings.INGEST_PUBLISH_THREADS,
+    thread_name_prefix="ingest-publish",
+)
+
+# Request bodies are read raw (so signatures are checked against the exact bytes
+# received), which hides them from FastAPI; document them for the OpenAPI schema
+_JSON_OBJECT_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {
+                "schema": {"type": "object"},
+                "example": {"event": "order.created", "data": {"order_id": 123, "amount": 99.99}},
+            }
+        },
+    }
+}
+
+async def _read_json_object(request: Request) -> Tuple[str, Dict[str, Any]]:
+    """Return the raw body (as text) and its parsed form, which must be a JSON object"""
+    raw = await request.body()
+    try:
+        body = raw.decode('utf-8')
+        parsed = json.loads(body)
+    except ValueError:
+        parsed = None
+    if not isinstance(parsed, dict):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Body must be a JSON object"
+        )
+    return body, parsed
+
+def _verify_body_signature(body: str, parsed: Dict[str, Any], signature: str, secret_key: str) -> bool:
+    if verify_signature(body.encode('utf-8'), signature, secret_key):
+        return True
+    # Older clients signed json.dumps() of the payload rather than the bytes they sent
+    return verify_signature(json.dumps(parsed).encode('utf-8'), signature, secret_key)
+
+async def _claim_check_large_bodies(task_kwargs_list: List[Dict[str, Any]]) -> None:
+    """Move bodies over CLAIM_CHECK_THRESHOLD_BYTES out of the task messages into Redis"""
+    large = [task_kwargs for task_kwargs in task_kwargs_list if should_claim_check(task_kwargs["body"])]
+    if not large:
+        return
+    refs = await astore_bodies([task_kwargs.pop("body") for task_kwargs in large])
+    for task_kwargs, body_ref in zip(large, refs):
+        task_kwargs["body_ref"] = body_ref
+
+async def publish_delivery(**task_kwargs) -> None:
+    """Queue a deliver_webhook task without blocking the event loop"""
+    if settings.FAIR_SCHEDULING_ENABLED:
+        await aenqueue_deliveries([task_kwargs])
+        return
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(
+        _publish_executor,
+        partial(deliver_webhook.apply_async, kwargs=task_kwargs),
+    )
+
+def _publish_many(task_kwargs_list: List[Dict[str, Any]]) -> None:
+    # One producer (and broker connection) for the whole batch instead of a pool checkout per task
+    with celery_app.producer_or_acquire() as producer:
+        for task_kwargs in task_kwargs_list:
+            deliver_webhook.apply_async(kwargs=task_kwargs, producer=producer)
+
+async def publish_deliveries(task_kwargs_list: List[Dict[str, Any]]) -> None:
+    """Queue many deliver_webhook tasks in a single hop off the event loop"""
+    if not task_kwargs_list:
+        return
+    if settings.FAIR_SCHEDULING_ENABLED:
+        # Into per-subscription lanes; dispatch_lanes feeds the delivery queue from them
+        await aenqueue_deliveries(task_kwargs_list)
+        return
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_publish_executor, _publish_many, task_kwargs_list)
+
+@router.post("/events/{event_type}", status_code=status.HTTP_202_ACCEPTED, openapi_extra=_JSON_OBJECT_BODY)
+async def ingest_event(
+    event_type: str,
+    request: Request,
+    x_hub_signature_256: str = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Fan a webhook out to every active subscription interested in `event_type`.
+
+    Subscribers are resolved from an in-memory routing index, so events nobody
+    subscribed to are never queued. When `FANOUT_INGEST_SECRET` is configured the
+    payload must be signed with it in `x-hub-signature-256`.
+    """
+    body, parsed = await _read_json_object(request)
+    
+    if settings.FANOUT_INGEST_SECRET:
+        if not x_hub_signature_256:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Signature required"
+            )
+        if not _verify_body_signature(body, parsed, strip_signature_prefix(x_hub_signature_256), settings.FANOUT_INGEST_SECRET):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid signature"
+            )
+    
+    subscription_ids = await match_subscriptions(db, event_type)
+    
+    # A large body is stored once and shared by every subscriber's delivery
+    body_kwargs = {"body": body}
+    if subscription_ids and should_claim_check(body):
+        body_kwargs = {"body_ref": await astore_body(body, refs=len(subscription_ids))}
+    
+    deliveries = []
+    tasks = []
+    for subscription_id in subscription_ids:
+        delivery_id = str(uuid.uuid4())
+        tasks.append(dict(
+            delivery_id=delivery_id,
+            subscription_id=subscription_id,
+            attempt_number=1,
+            event_type=event_type,
+            **body_kwargs
+        ))
+        deliveries.append({"subscription_id": subscription_id, "delivery_id": delivery_id})
+    
+    await create_deliveries(db, tasks)
+    await publish_deliveries(tasks)
+    
+    return {
+        "status": "accepted",
+        "event_type": event_type,
+        "deliveries": deliveries,
+        "message": f"Webhook queued for {len(deliveries)} subscription(s)"
+    }
+
+@router.post("/{subscription_id}", status_code=status.HTTP_202_ACCEPTED, openapi_extra=_JSON_OBJECT_BODY)
 async def ingest_webhook(
     subscription_id: uuid.UUID,
-    payload: dict = Body(..., example={"event": "order.created", "data": {"order_id": 123, "amount": 99.99}}),
+    request: Request,
     x_hub_signature_256: str = Header(None),
     x_webhook_event: str = Header(None),
-    db: Session = Depends(get_db)
+    idempotency_key_header: str = Header(None, alias="Idempotency-Key"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    subscription = db.query(Subscription).filter(Subscription.id == subscription_id).first()
+    """
+    Ingest one webhook for a subscription.
+
+    Send an `Idempotency-Key` header to make retries safe: a repeat within
+    IDEMPOTENCY_TTL returns the original delivery_id and queues nothing.
+    """
+    subscription = await aget_subscription(db, subscription_id)
     if not subscription:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Subscription with ID {subscription_id} not found"
         )
     
-    body_bytes = json.dumps(payload).encode('utf-8')
+    # The raw body is verified and later delivered as-is, never re-serialized
+    body, parsed = await _read_json_object(request)
     
-    if subscription.secret_key and x_hub_signature_256:
-        signature = x_hub_signature_256
-        if signature.startswith("sha256="):
-            signature = signature[7:]
+    if subscription["secret_key"] and x_hub_signature_256:
+        signature = strip_signature_prefix(x_hub_signature_256)
             
-        if not verify_signature(body_bytes, signature, subscription.secret_key):
+        if not _verify_body_signature(body, parsed, signature, subscription["secret_key"]):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid signature"
             )
-    elif subscription.secret_key:
+    elif subscription["secret_key"]:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Signature required"
         )
     
-    delivery_id = str(uuid.uuid4())
     event_type = x_webhook_event
     
-    deliver_webhook.delay(
+    # Filter at ingest so mismatched events never cost a task or a log row
+    if not should_deliver_to_subscription(event_type, subscription["event_types"]):
+        return {
+            "status": "filtered",
+            "delivery_id": None,
+            "message": f"Event type {event_type} doesn't match subscription filters"
+        }
+    
+    delivery_id = str(uuid.uuid4())
+    
+    # Claimed only once the request is authenticated, so nobody else can take a producer's keys
+    dedup_key = idempotency_key(idempotency_key_header, body)
+    if dedup_key:
+        original_id = await aclaim_idempotency_key(str(subscription_id), dedup_key, delivery_id)
+        if original_id:
+            return {
+                "status": "duplicate",
+                "delivery_id": original_id,
+                "message": "Duplicate of an accepted webhook, not queued again"
+            }
+    
+    task_kwargs = dict(
         delivery_id=delivery_id,
         subscription_id=str(subscription_id),
-        payload=payload,
         attempt_number=1,
-        event_type=event_type
+        event_type=event_type,
+        body=body
     )
+    try:
+        await _claim_check_large_bodies([task_kwargs])
+        await create_deliveries(db, [task_kwargs])
+        await publish_delivery(**task_kwargs)
+    except Exception:
+        if dedup_key:
+            await arelease_idempotency_key(str(subscription_id), dedup_key)
+        raise
     
     return {
         "status": "accepted",
         "delivery_id": delivery_id,
         "message": "Webhook queued for delivery"
-    }
\ No newline at end of file
+    }
+
+async def _read_ndjson_items(request: Request, batch_mac) -> List[Any]:
+    """Parse a (possibly chunked) NDJSON body line by line as it arrives"""
+    items = []
+    buffer = b""
+
+    def parse_line(line: bytes) -> None:
+        if not line.strip():
+            return
+        try:
+            items.append(json.loads(line))
+        except ValueError:
+            items.append(_INVALID_JSON)
+        _check_batch_size(len(items))
+
+    async for chunk in request.stream():
+        if batch_mac is not None:
+            batch_mac.update(chunk)
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            parse_line(line)
+    parse_line(buffer)
+    return items
+
+async def _read_json_array_items(request: Request, batch_mac) -> List[Any]:
+    body = await request.body()
+    if batch_mac is not None:
+        batch_mac.update(body)
+    try:
+        items = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body must be a JSON array")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body must be a JSON array")
+    _check_batch_size(len(items))
+    return items
+
+def _check_batch_size(count: int) -> None:
+    if count > settings.INGEST_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch exceeds {settings.INGEST_BATCH_MAX_ITEMS} items"
+        )
+
+def _item_rejection(item: Any, body: Optional[str], subscription: Dict[str, Any], batch_signed: bool, default_event_type: Optional[str]) -> Optional[str]:
+    """Validate a batch item (and its serialized payload `body`); returns the rejection reason, or None if it is accepted"""
+    if item is _INVALID_JSON:
+        return "Invalid JSON"
+    if not isinstance(item, dict) or not isinstance(item.get("payload"), dict):
+        return "Item must be an object with a 'payload' object"
+    event_type = item.get("event_type") or default_event_type
+    if not should_deliver_to_subscription(event_type, subscription["event_types"]):
+        return f"Event type {event_type} doesn't match subscription filters"
+    secret_key = subscription["secret_key"]
+    if secret_key and not batch_signed:
+        signature = item.get("signature")
+        if not signature:
+            return "Signature required"
+        if not isinstance(signature, str):
+            return "Invalid signature"
+        if not verify_signature(body.encode('utf-8'), strip_signature_prefix(signature), secret_key):
+            return "Invalid signature"
+    return None
+
+@router.post("/{subscription_id}/batch", status_code=status.HTTP_202_ACCEPTED)
+async def ingest_webhook_batch(
+    subscription_id: uuid.UUID,
+    request: Request,
+    x_hub_signature_256: str = Header(None),
+    x_webhook_event: str = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Ingest many webhooks for one subscription in a single request.
+
+    The body is either a JSON array or NDJSON (`Content-Type: application/x-ndjson`),
+    one item per element/line: `{"payload": {...}, "event_type": "...", "signature": "sha256=..."}`.
+
+    For subscriptions with a secret key, either sign the whole raw body with
+    `x-hub-signature-256`, or sign each item's payload in its `signature` field.
+    `event_type` defaults to the `x-webhook-event` header.
+    """
+    subscription = await aget_subscription(db, subscription_id)
+    if not subscription:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Subscription with ID {subscription_id} not found"
+        )
+    
+    secret_key = subscription["secret_key"]
+    batch_signed = bool(secret_key and x_hub_signature_256)
+    batch_mac = create_hmac(secret_key) if batch_signed else None
+    
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in NDJSON_CONTENT_TYPES:
+        items = await _read_ndjson_items(request, batch_mac)
+    else:
+        items = await _read_json_array_items(request, batch_mac)
+    
+    # A batch signature covers every item, so nothing is published unless it matches
+    if batch_signed and not signatures_match(batch_mac.hexdigest(), strip_signature_prefix(x_hub_signature_256)):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid signature"
+        )
+    
+    results = []
+    tasks = []
+    for index, item in enumerate(items):
+        # Serialized once here; these are the bytes that get signed, stored and sent
+        body = json.dumps(item["payload"]) if isinstance(item, dict) and isinstance(item.get("payload"), dict) else None
+        reason = _item_rejection(item, body, subscription, batch_signed, x_webhook_event)
+        if reason:
+            results.append({"index": index, "status": "rejected", "reason": reason})
+            continue
+        
+        delivery_id = str(uuid.uuid4())
+        tasks.append(dict(
+            delivery_id=delivery_id,
+            subscription_id=str(subscription_id),
+            attempt_number=1,
+            event_type=item.get("event_type") or x_webhook_event,
+            body=body
+        ))
+        results.append({"index": index, "status": "accepted", "delivery_id": delivery_id})
+    
+    await _claim_check_large_bodies(tasks)
+    await create_deliveries(db, tasks)
+    await publish_deliveries(tasks)
+    
+    return {
+        "status": "accepted",
+        "accepted": len(tasks),
+        "rejected": len(results) - len(tasks),
+        "results": results
+    }
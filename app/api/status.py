@@ -1,13 +1,26 @@
-from typing import List
+from datetime import datetime
+from typing import List, Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import or_
 
+from app.config import settings
 from app.db import get_db
 from app.models.webhook_log import WebhookLog
 from app.models.subscription import Subscription
+from app.models.delivery import Delivery
+from app.models.delivery_stats import SubscriptionStats
 from app.schemas.webhook import WebhookLogEntry, DeliveryStatus, SubscriptionDeliveryStats
+from app.cache.subscriptions import get_subscription_cache_stats
+from app.metrics import get_metrics, get_process_stats
+from app.services.batching import get_batch_buffer_sizes
+from app.services.circuit_breaker import get_circuit_breakers
+from app.services.lanes import delivery_queue_depth, get_lane_depths
+from app.services.retry_scheduler import get_retry_schedule_stats
+from app.services.log_export import iter_log_export, parse_export_fields
+from app.utils import encode_cursor, decode_cursor
 
 router = APIRouter(
     prefix="/status",
@@ -15,7 +28,7 @@ router = APIRouter(
 )
 
 # Helper function to convert WebhookLog ORM model to WebhookLogEntry Pydantic model
-def webhook_log_to_entry(log: WebhookLog) -> WebhookLogEntry:
+def webhook_log_to_entry(log: WebhookLog, include_payload: bool = True) -> WebhookLogEntry:
     return WebhookLogEntry(
         id=log.id,
         delivery_id=log.delivery_id,
@@ -27,38 +40,47 @@ def webhook_log_to_entry(log: WebhookLog) -> WebhookLogEntry:
         status=log.status,
         error_details=log.error_details,
         created_at=log.created_at,
-        payload=log.payload  # Make sure to include payload if it exists in your WebhookLogEntry model
+        payload=log.payload if include_payload else None
     )
 
 @router.get("/deliveries/{delivery_id}", response_model=DeliveryStatus)
 def get_delivery_status(
     delivery_id: UUID,
+    include_logs: bool = False,
+    include_payload: bool = True,
     db: Session = Depends(get_db)
 ):
     try:
-        # Get all log entries for this delivery ID
-        logs = db.query(WebhookLog).filter(WebhookLog.delivery_id == delivery_id).order_by(WebhookLog.created_at).all()
+        # Current state is a single primary-key lookup
+        delivery = db.get(Delivery, delivery_id)
         
-        if not logs:
+        if not delivery:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"No delivery found with ID {delivery_id}"
             )
         
-        # Get the latest log entry
-        latest_log = logs[-1]
-        
-        # Convert ORM WebhookLog objects to WebhookLogEntry Pydantic models
-        log_entries = [webhook_log_to_entry(log) for log in logs]
+        log_entries = []
+        if include_logs:
+            # Full attempt history; all attempts share one payload row, loaded once
+            logs = db.query(WebhookLog).filter(WebhookLog.delivery_id == delivery_id).order_by(WebhookLog.created_at).all()
+            log_entries = [webhook_log_to_entry(log, include_payload) for log in logs]
         
         return DeliveryStatus(
             delivery_id=delivery_id,
-            subscription_id=latest_log.subscription_id,
-            total_attempts=len(logs),
-            latest_status=latest_log.status,
-            latest_attempt=latest_log.created_at,
-            logs=log_entries  # Use the converted list
+            subscription_id=delivery.subscription_id,
+            event_type=delivery.event_type,
+            total_attempts=delivery.attempt_count,
+            latest_status=delivery.status,
+            latest_attempt=delivery.last_attempt_at,
+            last_status_code=delivery.last_status_code,
+            last_error=delivery.last_error,
+            next_retry_at=delivery.next_retry_at,
+            created_at=delivery.created_at,
+            logs=log_entries
         )
+    except HTTPException:
+        raise
     except Exception as e:
         # Log the error
         print(f"Error retrieving delivery status: {str(e)}")
@@ -71,9 +93,18 @@ def get_delivery_status(
 def get_subscription_deliveries(
     subscription_id: UUID,
     limit: int = 20,
+    include_payload: bool = False,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     try:
+        after = None
+        if cursor:
+            try:
+                after = decode_cursor(cursor)
+            except ValueError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        
         # Check if subscription exists
         subscription = db.query(Subscription).filter(Subscription.id == subscription_id).first()
         if not subscription:
@@ -82,38 +113,42 @@ def get_subscription_deliveries(
                 detail=f"Subscription with ID {subscription_id} not found"
             )
         
-        # Get delivery statistics
-        # Count total deliveries (unique delivery_ids)
-        delivery_count = db.query(func.count(WebhookLog.delivery_id.distinct()))\
-            .filter(WebhookLog.subscription_id == subscription_id)\
-            .scalar()
-        
-        # Count successful deliveries
-        successful_count = db.query(func.count(WebhookLog.delivery_id.distinct()))\
-            .filter(WebhookLog.subscription_id == subscription_id, WebhookLog.status == "SUCCESS")\
-            .scalar()
+        # Rollup counters maintained as attempts are logged: one primary-key lookup
+        stats = db.get(SubscriptionStats, subscription_id)
         
-        # Count failed deliveries (those that reached FAILURE status)
-        failed_count = db.query(func.count(WebhookLog.delivery_id.distinct()))\
-            .filter(WebhookLog.subscription_id == subscription_id, WebhookLog.status == "FAILURE")\
-            .scalar()
-        
-        # Get recent log entries, ordered by creation time (newest first)
-        recent_logs = db.query(WebhookLog)\
+        # Get recent log entries, newest first; the order matches the
+        # (subscription_id, created_at DESC, id) index so each page is a range scan
+        query = db.query(WebhookLog)\
             .filter(WebhookLog.subscription_id == subscription_id)\
-            .order_by(desc(WebhookLog.created_at))\
-            .limit(limit)\
-            .all()
+            .order_by(WebhookLog.created_at.desc(), WebhookLog.id)
+        if after:
+            # Keyset: resume right after the last row of the previous page
+            after_created_at, after_id = after
+            query = query.filter(
+                WebhookLog.created_at <= after_created_at,
+                or_(WebhookLog.created_at < after_created_at, WebhookLog.id > after_id),
+            )
+        query = query.limit(limit)
+        if include_payload:
+            # One extra query for the distinct deliveries on the page
+            query = query.options(selectinload(WebhookLog.payload_record))
+        recent_logs = query.all()
         
         # Convert ORM objects to Pydantic models
-        log_entries = [webhook_log_to_entry(log) for log in recent_logs]
+        log_entries = [webhook_log_to_entry(log, include_payload) for log in recent_logs]
+        
+        next_cursor = None
+        if limit > 0 and len(recent_logs) == limit:
+            next_cursor = encode_cursor(recent_logs[-1].created_at, recent_logs[-1].id)
         
         return SubscriptionDeliveryStats(
             subscription_id=subscription_id,
-            total_deliveries=delivery_count,
-            successful_deliveries=successful_count,
-            failed_deliveries=failed_count,
-            recent_logs=log_entries  # Use the converted list
+            total_deliveries=stats.total_deliveries if stats else 0,
+            successful_deliveries=stats.successful_deliveries if stats else 0,
+            failed_deliveries=stats.failed_deliveries if stats else 0,
+            in_flight_deliveries=stats.in_flight_deliveries if stats else 0,
+            recent_logs=log_entries,  # Use the converted list
+            next_cursor=next_cursor
         )
     except HTTPException:
         raise
@@ -123,4 +158,115 @@ def get_subscription_deliveries(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred while retrieving subscription deliveries"
-        )
\ No newline at end of file
+        )
+
+@router.get("/subscriptions/{subscription_id}/export")
+def export_subscription_logs(
+    subscription_id: UUID,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    fields: Optional[str] = None,
+    gzip: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Stream a subscription's delivery attempts as NDJSON, oldest first.
+
+    `from` (inclusive) and `to` (exclusive) bound created_at, `status` filters on
+    the attempt status, and `fields` is a comma-separated projection (leave out
+    `payload` to skip payload bodies). `gzip=true` compresses the stream.
+    """
+    try:
+        selected_fields = parse_export_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    if not db.query(Subscription.id).filter(Subscription.id == subscription_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Subscription with ID {subscription_id} not found"
+        )
+    
+    # A sync generator: Starlette pulls each chunk in the threadpool, so the
+    # export never blocks the event loop
+    filename = f"webhook-logs-{subscription_id}.ndjson"
+    if gzip:
+        filename += ".gz"
+    return StreamingResponse(
+        iter_log_export(subscription_id, selected_fields, start, end, status_filter, compress=gzip),
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@router.get("/cache")
+def get_cache_stats():
+    """Subscription cache hit/miss/eviction counters for this API process"""
+    return get_subscription_cache_stats()
+
+
+@router.get("/delivery-pool")
+def get_delivery_pool_stats():
+    """Connection pool stats (reuse ratio, open connections) reported by each worker process"""
+    return get_process_stats("delivery_pool")
+
+@router.get("/limiter")
+def get_limiter_stats():
+    """Deliveries deferred by the per-destination concurrency and rate limits"""
+    return get_metrics("limiter")
+
+@router.get("/circuit-breakers")
+def get_circuit_breaker_states():
+    """Circuit breaker state and parked deliveries per target host, plus parked/drained/expired counters"""
+    return {"hosts": get_circuit_breakers(), **get_metrics("circuit_breaker")}
+
+@router.get("/lanes")
+def get_lane_stats():
+    """Deliveries waiting in each subscription's lane, the shared delivery queue's depth, and dispatch counters"""
+    return {
+        "delivery_queue_depth": delivery_queue_depth(),
+        "lanes": get_lane_depths(),
+        **get_metrics("lanes"),
+    }
+
+@router.get("/retry-scheduler")
+def get_retry_scheduler_stats():
+    """Retries waiting in the Redis schedule, how many are due, the pump's lag, and the retry queue's depth"""
+    return {
+        **get_retry_schedule_stats(),
+        "retry_queue_depth": delivery_queue_depth(settings.RETRY_QUEUE),
+        **get_metrics("retry_scheduler"),
+    }
+
+@router.get("/retry-policy")
+def get_retry_policy_stats():
+    """Failures not retried because the response was terminal (e.g. 400, 410)"""
+    return get_metrics("retry_policy")
+
+@router.get("/batching")
+def get_batching_stats():
+    """Deliveries waiting in micro-batch buffers per subscription, plus buffered/batches/delivered counters"""
+    return {"buffered_by_subscription": get_batch_buffer_sizes(), **get_metrics("batching")}
+
+@router.get("/dead-letters")
+def get_dead_letter_stats():
+    """Dead letters replayed as new deliveries"""
+    return get_metrics("dead_letters")
+
+@router.get("/idempotency")
+def get_idempotency_stats():
+    """Ingest requests checked for an idempotency key, duplicates found, and the dedup hit rate"""
+    metrics = get_metrics("idempotency")
+    checked = metrics["counters"].get("checked", 0)
+    duplicates = metrics["counters"].get("duplicates", 0)
+    return {**metrics, "hit_rate": round(duplicates / checked, 4) if checked else 0.0}
+
+@router.get("/log-sink")
+def get_log_sink_stats():
+    """Buffered delivery log writer stats (pending rows, flushes) reported by each worker process"""
+    return get_process_stats("log_sink")
+
+@router.get("/retention")
+def get_retention_stats():
+    """Retention cleanup progress: rows deleted, batches, partitions dropped and lag behind the cutoff"""
+    return get_metrics("retention")
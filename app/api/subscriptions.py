@@ -1,6 +1,8 @@
-from typing import List
+from datetime import datetime, timezone
+from typing import List, Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
 
 from app.db import get_db
@@ -11,6 +13,10 @@ from app.schemas.subscription import (
     SubscriptionResponse
 )
 from app.cache.redis import invalidate_subscription_cache
+from app.config import settings
+from app.services.dead_letters import count_pending_dead_letters, parse_status_filter
+from app.utils import encode_cursor, decode_cursor
+from app.workers.tasks import replay_dead_letters
 
 router = APIRouter(
     prefix="/subscriptions",
@@ -22,31 +28,58 @@ def create_subscription(
     subscription: SubscriptionCreate,
     db: Session = Depends(get_db)
 ):
-    # Convert event_types from list to comma-separated string
-    event_types_str = None
-    if subscription.event_types:
-        event_types_str = ",".join(subscription.event_types)
-    
-    # Create new subscription
+    # Create new subscription (an empty event_types list means all event types)
     db_subscription = Subscription(
         target_url=str(subscription.target_url),
         secret_key=subscription.secret_key,
-        event_types=event_types_str
+        event_types=subscription.event_types or None,
+        max_concurrency=subscription.max_concurrency,
+        rate_limit_per_second=subscription.rate_limit_per_second,
+        retry_policy=subscription.retry_policy.dict(exclude_none=True) if subscription.retry_policy else None,
+        batch_max_events=subscription.batch_max_events,
+        batch_window_ms=subscription.batch_window_ms,
+        lane_weight=subscription.lane_weight,
+        lane_max_per_second=subscription.lane_max_per_second
     )
     
     db.add(db_subscription)
     db.commit()
     db.refresh(db_subscription)
     
+    # Drop any negative cache entry for this ID
+    invalidate_subscription_cache(str(db_subscription.id))
+    
     return db_subscription
 
 @router.get("/", response_model=List[SubscriptionResponse])
 def get_subscriptions(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    subscriptions = db.query(Subscription).offset(skip).limit(limit).all()
+    # Stable (created_at, id) order so a page token always resumes at the same row
+    query = db.query(Subscription).order_by(Subscription.created_at, Subscription.id)
+    if cursor:
+        # Keyset pagination: an index range scan however deep the page is
+        try:
+            after_created_at, after_id = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        query = query.filter(or_(
+            Subscription.created_at > after_created_at,
+            and_(Subscription.created_at == after_created_at, Subscription.id > after_id),
+        ))
+    elif skip:
+        # Offset paging is kept for existing clients; it gets slower the deeper the page
+        query = query.offset(skip)
+    subscriptions = query.limit(limit).all()
+    
+    # A full page may have more rows after it; pass ?cursor=<X-Next-Cursor> to continue
+    if limit > 0 and len(subscriptions) == limit:
+        last = subscriptions[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.created_at, last.id)
     return subscriptions
 
 @router.get("/{subscription_id}", response_model=SubscriptionResponse)
@@ -75,13 +108,13 @@ def update_subscription(
             detail=f"Subscription with ID {subscription_id} not found"
         )
     
-    # Handle event_types conversion from list to string
-    if subscription_update.event_types is not None:
-        subscription_update_dict = subscription_update.dict(exclude_unset=True)
-        if "event_types" in subscription_update_dict:
-            subscription_update_dict["event_types"] = ",".join(subscription_update.event_types)
-    else:
-        subscription_update_dict = subscription_update.dict(exclude_unset=True)
+    subscription_update_dict = subscription_update.dict(exclude_unset=True)
+    if "event_types" in subscription_update_dict:
+        subscription_update_dict["event_types"] = subscription_update.event_types or None
+    if subscription_update_dict.get("retry_policy"):
+        subscription_update_dict["retry_policy"] = subscription_update.retry_policy.dict(exclude_none=True)
+    if "target_url" in subscription_update_dict and subscription_update.target_url is not None:
+        subscription_update_dict["target_url"] = str(subscription_update.target_url)
     
     # Update subscription
     for key, value in subscription_update_dict.items():
@@ -113,4 +146,54 @@ def delete_subscription(
     # Invalidate cache
     invalidate_subscription_cache(str(subscription_id))
     
-    return None
\ No newline at end of file
+    return None
+
+@router.post("/{subscription_id}/replay", status_code=status.HTTP_202_ACCEPTED)
+def replay_subscription_dead_letters(
+    subscription_id: UUID,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    rate: Optional[float] = Query(None, gt=0),
+    db: Session = Depends(get_db)
+):
+    """
+    Re-deliver the subscription's dead letters (deliveries that ended in FAILURE)
+    that failed in [from, to), optionally only those whose last status matches
+    `status` (e.g. 503 or 5xx). Each is sent as a new delivery, at most `rate`
+    (default DEAD_LETTER_REPLAY_RATE) per second; a dead letter is replayed once.
+    """
+    subscription = db.query(Subscription).filter(Subscription.id == subscription_id).first()
+    if not subscription:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Subscription with ID {subscription_id} not found"
+        )
+    try:
+        status_range = parse_status_filter(status_filter)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    # Naive timestamps are UTC; the range never extends past now, so replays that fail again stay out of it
+    now = datetime.now(timezone.utc)
+    start = start.replace(tzinfo=timezone.utc) if start and start.tzinfo is None else start
+    end = end.replace(tzinfo=timezone.utc) if end and end.tzinfo is None else end
+    end = min(end, now) if end else now
+    
+    pending = count_pending_dead_letters(db, subscription_id, start, end, status_range)
+    if pending:
+        replay_dead_letters.apply_async(kwargs=dict(
+            subscription_id=str(subscription_id),
+            start=start.isoformat() if start else None,
+            end=end.isoformat(),
+            status=status_filter,
+            rate=rate
+        ))
+    
+    return {
+        "status": "accepted",
+        "subscription_id": subscription_id,
+        "dead_letters": pending,
+        "rate_per_second": rate or settings.DEAD_LETTER_REPLAY_RATE,
+        "message": f"Replaying {pending} dead letter(s)"
+    }
@@ -1,13 +1,37 @@
 import json
+import logging
+import os
+import threading
 from typing import Optional, Any, Dict
 import redis
+import redis.asyncio as redis_async
 from app.config import settings
+from app.cache.local import LocalTTLCache
+
+logger = logging.getLogger(__name__)
 
 # Parse from full REDIS_URL
 redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+async_redis_client = redis_async.from_url(settings.REDIS_URL, decode_responses=True)
 
 # Cache TTL (seconds)
 SUBSCRIPTION_CACHE_TTL = 3600
+SUBSCRIPTION_NEGATIVE_CACHE_TTL = settings.SUBSCRIPTION_NEGATIVE_CACHE_TTL
+
+# Stored in place of the subscription JSON for IDs known not to exist
+NEGATIVE_CACHE_MARKER = "__missing__"
+
+# Pub/sub channel used to evict in-process copies in every API/worker process
+SUBSCRIPTION_INVALIDATION_CHANNEL = "subscription:invalidate"
+
+# In-process tier in front of Redis, shared by everything running in this process
+subscription_local_cache = LocalTTLCache(
+    maxsize=settings.SUBSCRIPTION_LOCAL_CACHE_SIZE,
+    ttl=settings.SUBSCRIPTION_LOCAL_CACHE_TTL,
+)
+
+# Redis tier counters for this process
+redis_cache_stats = {"hits": 0, "misses": 0, "negative_hits": 0}
 
 def get_subscription_cache_key(subscription_id: str) -> str:
     return f"subscription:{subscription_id}"
@@ -17,18 +41,66 @@ def cache_subscription(subscription_id: str, subscription_data: Dict[str, Any])
     key = get_subscription_cache_key(subscription_id)
     redis_client.setex(key, SUBSCRIPTION_CACHE_TTL, json.dumps(subscription_data))
 
+def cache_missing_subscription(subscription_id: str) -> None:
+    """Remember that a subscription does not exist (negative cache)"""
+    key = get_subscription_cache_key(subscription_id)
+    redis_client.setex(key, SUBSCRIPTION_NEGATIVE_CACHE_TTL, NEGATIVE_CACHE_MARKER)
+
 def get_cached_subscription(subscription_id: str) -> Optional[Dict[str, Any]]:
     """Get subscription data from cache"""
     key = get_subscription_cache_key(subscription_id)
     data = redis_client.get(key)
-    if data:
+    if data and data != NEGATIVE_CACHE_MARKER:
         return json.loads(data)
     return None
 
 def invalidate_subscription_cache(subscription_id: str) -> None:
-    """Invalidate subscription cache"""
+    """Invalidate subscription cache in Redis and in every process' local tier"""
     key = get_subscription_cache_key(subscription_id)
     redis_client.delete(key)
+    subscription_local_cache.delete(subscription_id)
+    redis_client.publish(SUBSCRIPTION_INVALIDATION_CHANNEL, subscription_id)
+
+# Extra per-process reactions to invalidations, called with the subscription ID,
+# or with None when messages may have been missed
+_invalidation_callbacks = []
+
+def on_subscription_invalidated(callback) -> None:
+    _invalidation_callbacks.append(callback)
+
+_listener_lock = threading.Lock()
+_listener_pid = None
+_listener_pubsub = None
+
+def _handle_invalidation(message: Dict[str, Any]) -> None:
+    subscription_local_cache.delete(message["data"])
+    for callback in _invalidation_callbacks:
+        callback(message["data"])
+
+def start_invalidation_listener() -> None:
+    """
+    Subscribe this process to subscription invalidations.
+
+    Safe to call more than once; a forked child (Celery prefork) starts its own listener.
+    """
+    global _listener_pid, _listener_pubsub
+    with _listener_lock:
+        if _listener_pid == os.getpid():
+            return
+        # Anything cached before the listener was running may have missed an invalidation
+        subscription_local_cache.clear()
+        pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{SUBSCRIPTION_INVALIDATION_CHANNEL: _handle_invalidation})
+        pubsub.run_in_thread(sleep_time=1.0, daemon=True, exception_handler=_listener_error)
+        _listener_pubsub = pubsub
+        _listener_pid = os.getpid()
+
+def _listener_error(exc: Exception, pubsub, thread) -> None:
+    logger.warning(f"Subscription invalidation listener error: {str(exc)}")
+    # Entries may be stale while disconnected; the local TTL bounds how long
+    subscription_local_cache.clear()
+    for callback in _invalidation_callbacks:
+        callback(None)
 
 def is_redis_available() -> bool:
     """Check Redis connectivity"""
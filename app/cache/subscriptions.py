@@ -0,0 +1,107 @@
+import json
+from typing import Any, Dict, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.subscription import Subscription
+from app.cache.local import MISSING
+from app.cache.redis import (
+    NEGATIVE_CACHE_MARKER,
+    SUBSCRIPTION_CACHE_TTL,
+    SUBSCRIPTION_NEGATIVE_CACHE_TTL,
+    async_redis_client,
+    cache_missing_subscription,
+    cache_subscription,
+    get_subscription_cache_key,
+    redis_cache_stats,
+    redis_client,
+    subscription_local_cache,
+)
+
+# Two-tier subscription lookup: in-process LRU -> Redis -> Postgres.
+# Unknown IDs are cached as None in both tiers so 404 floods never reach the DB.
+
+def subscription_to_cache_dict(subscription: Subscription) -> Dict[str, Any]:
+    return {
+        "id": str(subscription.id),
+        "target_url": subscription.target_url,
+        "secret_key": subscription.secret_key,
+        "event_types": subscription.event_types,
+        "is_active": subscription.is_active,
+        "max_concurrency": subscription.max_concurrency,
+        "rate_limit_per_second": subscription.rate_limit_per_second,
+        "retry_policy": subscription.retry_policy,
+        "batch_max_events": subscription.batch_max_events,
+        "batch_window_ms": subscription.batch_window_ms,
+        "lane_weight": subscription.lane_weight,
+        "lane_max_per_second": subscription.lane_max_per_second
+    }
+
+def _from_redis_value(subscription_id: str, data: Optional[str]) -> Any:
+    """Decode a Redis value and populate the local tier; MISSING if Redis has nothing"""
+    if data is None:
+        redis_cache_stats["misses"] += 1
+        return MISSING
+    if data == NEGATIVE_CACHE_MARKER:
+        redis_cache_stats["negative_hits"] += 1
+        subscription_local_cache.set(subscription_id, None, ttl=SUBSCRIPTION_NEGATIVE_CACHE_TTL)
+        return None
+    redis_cache_stats["hits"] += 1
+    subscription_data = json.loads(data)
+    subscription_local_cache.set(subscription_id, subscription_data)
+    return subscription_data
+
+def get_subscription(db: Session, subscription_id: str) -> Optional[Dict[str, Any]]:
+    """Get subscription data for workers and sync code paths; None if it doesn't exist"""
+    subscription_id = str(subscription_id)
+    subscription_data = subscription_local_cache.get(subscription_id)
+    if subscription_data is not MISSING:
+        return subscription_data
+
+    subscription_data = _from_redis_value(
+        subscription_id, redis_client.get(get_subscription_cache_key(subscription_id))
+    )
+    if subscription_data is not MISSING:
+        return subscription_data
+
+    subscription = db.query(Subscription).filter(Subscription.id == subscription_id).first()
+    if not subscription:
+        cache_missing_subscription(subscription_id)
+        subscription_local_cache.set(subscription_id, None, ttl=SUBSCRIPTION_NEGATIVE_CACHE_TTL)
+        return None
+
+    subscription_data = subscription_to_cache_dict(subscription)
+    cache_subscription(subscription_id, subscription_data)
+    subscription_local_cache.set(subscription_id, subscription_data)
+    return subscription_data
+
+async def aget_subscription(db: AsyncSession, subscription_id: str) -> Optional[Dict[str, Any]]:
+    """Async variant of get_subscription for the ingest path"""
+    subscription_id = str(subscription_id)
+    subscription_data = subscription_local_cache.get(subscription_id)
+    if subscription_data is not MISSING:
+        return subscription_data
+
+    key = get_subscription_cache_key(subscription_id)
+    subscription_data = _from_redis_value(subscription_id, await async_redis_client.get(key))
+    if subscription_data is not MISSING:
+        return subscription_data
+
+    result = await db.execute(select(Subscription).where(Subscription.id == subscription_id))
+    subscription = result.scalars().first()
+    if not subscription:
+        await async_redis_client.setex(key, SUBSCRIPTION_NEGATIVE_CACHE_TTL, NEGATIVE_CACHE_MARKER)
+        subscription_local_cache.set(subscription_id, None, ttl=SUBSCRIPTION_NEGATIVE_CACHE_TTL)
+        return None
+
+    subscription_data = subscription_to_cache_dict(subscription)
+    await async_redis_client.setex(key, SUBSCRIPTION_CACHE_TTL, json.dumps(subscription_data))
+    subscription_local_cache.set(subscription_id, subscription_data)
+    return subscription_data
+
+def get_subscription_cache_stats() -> Dict[str, Any]:
+    return {
+        "local": subscription_local_cache.stats(),
+        "redis": dict(redis_cache_stats),
+    }
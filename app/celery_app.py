@@ -1,4 +1,6 @@
 from celery import Celery
+from celery.signals import celeryd_after_setup
+from kombu import Queue
 from app.config import settings
 
 
@@ -9,6 +11,18 @@ celery_app = Celery(
     include=["app.workers.tasks"]
 )
 
+def route_delivery(name, args, kwargs, options, task=None, **kw):
+    """First attempts go to the delivery queue, retries (attempt 2+) to the retry queue"""
+    retry = (kwargs or {}).get("attempt_number", 1) > 1
+    if name == "app.workers.tasks.deliver_webhook":
+        return {"queue": settings.RETRY_QUEUE if retry else settings.DELIVERY_QUEUE}
+    if name == "app.workers.tasks.deliver_webhook_batch" and retry:
+        # The asyncio engine (which consumes the retry queue) only runs deliver_webhook,
+        # so with it batch retries stay on the default queue with first-attempt batches
+        if settings.DELIVERY_ENGINE != "asyncio":
+            return {"queue": settings.RETRY_QUEUE}
+    return None
+
 
 # Celery Config
 celery_app.conf.update(
@@ -23,11 +37,62 @@ celery_app.conf.update(
     task_time_limit=300,
     broker_connection_retry_on_startup=True,
     broker_connection_timeout=10,
+    task_default_queue="celery",
+    task_queues=(Queue("celery"), Queue(settings.DELIVERY_QUEUE), Queue(settings.RETRY_QUEUE)),
+    task_routes=(route_delivery,),
 )
 
+# Independently sized pools: a WORKER_POOL=retry worker runs only retries, with its own concurrency
+# and prefetch, so retries can't take the slots or prefetch buffers of first attempts
+if settings.WORKER_POOL == "retry":
+    celery_app.conf.worker_concurrency = settings.RETRY_WORKER_CONCURRENCY or None
+    celery_app.conf.worker_prefetch_multiplier = settings.RETRY_WORKER_PREFETCH_MULTIPLIER
+else:
+    celery_app.conf.worker_concurrency = settings.DELIVERY_WORKER_CONCURRENCY or None
+    celery_app.conf.worker_prefetch_multiplier = settings.DELIVERY_WORKER_PREFETCH_MULTIPLIER
+
+def pool_queues() -> list:
+    """Delivery queues consumed by this process's WORKER_POOL"""
+    if settings.WORKER_POOL == "retry":
+        return [settings.RETRY_QUEUE]
+    if settings.WORKER_POOL == "delivery":
+        return [settings.DELIVERY_QUEUE]
+    return [settings.DELIVERY_QUEUE, settings.RETRY_QUEUE]
+
+@celeryd_after_setup.connect
+def configure_worker_queues(sender, instance, **kwargs):
+    queues = instance.app.amqp.queues
+    if settings.WORKER_POOL == "retry":
+        # Retries only (including batch retries); maintenance tasks and first-attempt batches stay with the delivery pool
+        queues.select([settings.RETRY_QUEUE])
+    elif settings.WORKER_POOL == "delivery":
+        queues.deselect([settings.RETRY_QUEUE])
+    # With the asyncio engine, deliveries are consumed by app/workers/async_engine.py only
+    if settings.DELIVERY_ENGINE == "asyncio":
+        queues.deselect([settings.DELIVERY_QUEUE, settings.RETRY_QUEUE])
+
 celery_app.conf.beat_schedule = {
     'cleanup-old-logs': {
         'task': 'app.workers.tasks.cleanup_old_webhook_logs',  # Task function
         'schedule': 3600.0,  # Run every hour (3600 seconds)
     },
-}
\ No newline at end of file
+    'pump-due-retries': {
+        'task': 'app.workers.tasks.pump_due_retries',
+        'schedule': settings.RETRY_PUMP_INTERVAL,  # Retry latency is at most about one interval
+    },
+    'drain-parked-deliveries': {
+        'task': 'app.workers.tasks.drain_parked_deliveries',
+        'schedule': settings.CIRCUIT_BREAKER_DRAIN_INTERVAL,  # Releases a bounded batch per host per run
+    },
+    'maintain-log-partitions': {
+        'task': 'app.workers.tasks.maintain_webhook_log_partitions',
+        'schedule': 3600.0,  # Creates partitions days ahead, so hourly is plenty
+    },
+}
+
+if settings.FAIR_SCHEDULING_ENABLED:
+    # Only laned deliveries need dispatching; lanes left over after switching it off drain once it is back on
+    celery_app.conf.beat_schedule['dispatch-lanes'] = {
+        'task': 'app.workers.tasks.dispatch_lanes',
+        'schedule': settings.FAIR_DISPATCH_INTERVAL,  # Laned deliveries wait at most about one interval for room
+    }
@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
@@ -7,10 +8,18 @@ load_dotenv()
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL")
+    ASYNC_DATABASE_URL: Optional[str] = os.getenv("ASYNC_DATABASE_URL")  # Derived from DATABASE_URL if unset
+    ASYNC_DB_POOL_SIZE: int = int(os.getenv("ASYNC_DB_POOL_SIZE", "20"))
+    ASYNC_DB_MAX_OVERFLOW: int = int(os.getenv("ASYNC_DB_MAX_OVERFLOW", "20"))
 
     # Redis
     REDIS_URL: str = os.getenv("REDIS_URL")
 
+    # Subscription cache (in-process tier in front of Redis)
+    SUBSCRIPTION_LOCAL_CACHE_SIZE: int = int(os.getenv("SUBSCRIPTION_LOCAL_CACHE_SIZE", "10000"))
+    SUBSCRIPTION_LOCAL_CACHE_TTL: int = int(os.getenv("SUBSCRIPTION_LOCAL_CACHE_TTL", "30"))
+    SUBSCRIPTION_NEGATIVE_CACHE_TTL: int = int(os.getenv("SUBSCRIPTION_NEGATIVE_CACHE_TTL", "60"))
+
     # Celery
     CELERY_BROKER_URL: str = os.getenv("CELERY_BROKER_URL")
     CELERY_RESULT_BACKEND: str = os.getenv("CELERY_RESULT_BACKEND")
@@ -20,14 +29,107 @@ class Settings(BaseSettings):
     # API
     API_HOST: str = os.getenv("API_HOST", "0.0.0.0")
     API_PORT: int = int(os.getenv("API_PORT", 8000))
+    INGEST_PUBLISH_THREADS: int = int(os.getenv("INGEST_PUBLISH_THREADS", "32"))
+    INGEST_BATCH_MAX_ITEMS: int = int(os.getenv("INGEST_BATCH_MAX_ITEMS", "10000"))
+    FANOUT_INGEST_SECRET: Optional[str] = os.getenv("FANOUT_INGEST_SECRET")  # Signs POST /ingest/events/{event_type}
+    # Repeats of POST /ingest/{subscription_id} with the same Idempotency-Key within the TTL (seconds)
+    # get the original delivery_id back; with IDEMPOTENCY_HASH_PAYLOADS the body hash is the default key
+    IDEMPOTENCY_TTL: int = int(os.getenv("IDEMPOTENCY_TTL", "3600"))
+    IDEMPOTENCY_HASH_PAYLOADS: bool = os.getenv("IDEMPOTENCY_HASH_PAYLOADS", "false").lower() == "true"
 
     # Webhook Delivery
     MAX_RETRY_ATTEMPTS: int = int(os.getenv("MAX_RETRY_ATTEMPTS", "5"))
     RETRY_BACKOFF_FACTOR: int = int(os.getenv("RETRY_BACKOFF_FACTOR", "2"))
     INITIAL_RETRY_DELAY: int = int(os.getenv("INITIAL_RETRY_DELAY", "10"))
+    RETRY_JITTER: float = float(os.getenv("RETRY_JITTER", "0.1"))  # +/- fraction of each backoff delay
+    # Default retry policy (subscriptions can override): "decorrelated" jitter or "exponential" backoff,
+    # and the cap on any single delay, including one requested by Retry-After
+    RETRY_BACKOFF_STRATEGY: str = os.getenv("RETRY_BACKOFF_STRATEGY", "decorrelated").lower()
+    RETRY_MAX_DELAY: float = float(os.getenv("RETRY_MAX_DELAY", "3600"))
+    # Retries wait in a Redis sorted set; the beat pump publishes due ones every interval, in batches
+    RETRY_PUMP_INTERVAL: float = float(os.getenv("RETRY_PUMP_INTERVAL", "1.0"))
+    RETRY_PUMP_BATCH_SIZE: int = int(os.getenv("RETRY_PUMP_BATCH_SIZE", "500"))
     WEBHOOK_TIMEOUT: int = int(os.getenv("WEBHOOK_TIMEOUT", "5"))
+    WEBHOOK_MAX_CONNECTIONS_PER_HOST: int = int(os.getenv("WEBHOOK_MAX_CONNECTIONS_PER_HOST", "10"))
+    WEBHOOK_KEEPALIVE_EXPIRY: float = float(os.getenv("WEBHOOK_KEEPALIVE_EXPIRY", "60"))
+    WEBHOOK_HTTP2: bool = os.getenv("WEBHOOK_HTTP2", "false").lower() == "true"
+    WEBHOOK_POOL_MAX_HOSTS: int = int(os.getenv("WEBHOOK_POOL_MAX_HOSTS", "256"))
+
+    # Per-destination delivery limits (Redis, shared by all workers); subscriptions can
+    # override max concurrency and rate. 0 means unlimited. Over-limit deliveries are deferred.
+    DELIVERY_LIMIT_KEY: str = os.getenv("DELIVERY_LIMIT_KEY", "host").lower()  # host | subscription
+    DELIVERY_MAX_CONCURRENCY: int = int(os.getenv("DELIVERY_MAX_CONCURRENCY", "20"))
+    DELIVERY_RATE_LIMIT_PER_SECOND: float = float(os.getenv("DELIVERY_RATE_LIMIT_PER_SECOND", "0"))
+    DELIVERY_RATE_LIMIT_BURST: float = float(os.getenv("DELIVERY_RATE_LIMIT_BURST", "0"))  # 0: one second of rate
+    DELIVERY_LIMIT_RETRY_DELAY: float = float(os.getenv("DELIVERY_LIMIT_RETRY_DELAY", "1.0"))
+
+    # Per-target-host circuit breaker: open after N consecutive failures, probe after the open period,
+    # and release parked deliveries in batches of DRAIN_BATCH per host every DRAIN_INTERVAL seconds.
+    # A delivery parked for longer than MAX_PARK_SECONDS (0: no limit) becomes a failed attempt.
+    CIRCUIT_BREAKER_ENABLED: bool = os.getenv("CIRCUIT_BREAKER_ENABLED", "true").lower() == "true"
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_BREAKER_OPEN_SECONDS: float = float(os.getenv("CIRCUIT_BREAKER_OPEN_SECONDS", "30"))
+    CIRCUIT_BREAKER_DRAIN_INTERVAL: float = float(os.getenv("CIRCUIT_BREAKER_DRAIN_INTERVAL", "5"))
+    CIRCUIT_BREAKER_DRAIN_BATCH: int = int(os.getenv("CIRCUIT_BREAKER_DRAIN_BATCH", "100"))
+    CIRCUIT_BREAKER_MAX_PARK_SECONDS: float = float(os.getenv("CIRCUIT_BREAKER_MAX_PARK_SECONDS", "3600"))
+
+    # Weighted fair scheduling: ingest appends to per-subscription lanes, and every DISPATCH_INTERVAL
+    # the dispatcher refills the delivery queue up to TARGET_DEPTH, lane_weight * LANE_QUANTUM per lane per round.
+    # Opt-in: with it enabled, first deliveries depend on celery beat running dispatch_lanes
+    FAIR_SCHEDULING_ENABLED: bool = os.getenv("FAIR_SCHEDULING_ENABLED", "false").lower() == "true"
+    FAIR_DISPATCH_INTERVAL: float = float(os.getenv("FAIR_DISPATCH_INTERVAL", "0.5"))
+    FAIR_QUEUE_TARGET_DEPTH: int = int(os.getenv("FAIR_QUEUE_TARGET_DEPTH", "200"))
+    FAIR_LANE_QUANTUM: int = int(os.getenv("FAIR_LANE_QUANTUM", "10"))
+
+    # Delivery engine: "celery" (prefork workers) or "asyncio" (app/workers/async_engine.py)
+    DELIVERY_ENGINE: str = os.getenv("DELIVERY_ENGINE", "celery").lower()
+    DELIVERY_QUEUE: str = os.getenv("DELIVERY_QUEUE", "webhook_deliveries")
+    # Retries (attempt 2+) have their own queue and worker pool, so a retry storm during an outage
+    # doesn't delay first attempts to healthy targets
+    RETRY_QUEUE: str = os.getenv("RETRY_QUEUE", f"{DELIVERY_QUEUE}.retry")
+    # Which deliveries this worker (or async engine) process consumes: all | delivery | retry
+    WORKER_POOL: str = os.getenv("WORKER_POOL", "all").lower()
+    # Pool size (0: number of CPUs) and prefetch per pool; retries often wait on timeouts, so they prefetch less
+    DELIVERY_WORKER_CONCURRENCY: int = int(os.getenv("DELIVERY_WORKER_CONCURRENCY", "0"))
+    DELIVERY_WORKER_PREFETCH_MULTIPLIER: int = int(os.getenv("DELIVERY_WORKER_PREFETCH_MULTIPLIER", "4"))
+    RETRY_WORKER_CONCURRENCY: int = int(os.getenv("RETRY_WORKER_CONCURRENCY", "4"))
+    RETRY_WORKER_PREFETCH_MULTIPLIER: int = int(os.getenv("RETRY_WORKER_PREFETCH_MULTIPLIER", "1"))
+    ASYNC_ENGINE_CONCURRENCY: int = int(os.getenv("ASYNC_ENGINE_CONCURRENCY", "1000"))
+    ASYNC_ENGINE_DB_THREADS: int = int(os.getenv("ASYNC_ENGINE_DB_THREADS", "10"))
+    ASYNC_ENGINE_MAX_CONNECTIONS_PER_HOST: int = int(os.getenv("ASYNC_ENGINE_MAX_CONNECTIONS_PER_HOST", "100"))
+    ASYNC_ENGINE_POOL_SHARD_SIZE: int = int(os.getenv("ASYNC_ENGINE_POOL_SHARD_SIZE", "16"))
+    ASYNC_ENGINE_SHUTDOWN_TIMEOUT: float = float(os.getenv("ASYNC_ENGINE_SHUTDOWN_TIMEOUT", "30"))
+
+    # Bodies larger than this travel as a Redis reference instead of inside the task message
+    CLAIM_CHECK_THRESHOLD_BYTES: int = int(os.getenv("CLAIM_CHECK_THRESHOLD_BYTES", "16384"))
+    # Must outlast the whole retry schedule
+    CLAIM_CHECK_TTL: int = int(os.getenv("CLAIM_CHECK_TTL", "86400"))
+
+    # Delivery log writes: "buffered" (bulk write-behind) or "sync" (commit per attempt)
+    LOG_WRITE_MODE: str = os.getenv("LOG_WRITE_MODE", "buffered").lower()
+    LOG_FLUSH_BATCH_SIZE: int = int(os.getenv("LOG_FLUSH_BATCH_SIZE", "500"))
+    LOG_FLUSH_INTERVAL: float = float(os.getenv("LOG_FLUSH_INTERVAL", "1.0"))
+    LOG_BUFFER_MAX_ROWS: int = int(os.getenv("LOG_BUFFER_MAX_ROWS", "50000"))
+
+    # Micro-batching window for subscriptions with batch_max_events but no batch_window_ms
+    BATCH_WINDOW_MS: int = int(os.getenv("BATCH_WINDOW_MS", "250"))
+
+    # Dead letters (deliveries that ended in FAILURE) are kept this long; replays re-deliver them
+    # in batches at no more than the replay rate (deliveries per second, per replay)
+    DEAD_LETTER_RETENTION_DAYS: int = int(os.getenv("DEAD_LETTER_RETENTION_DAYS", "30"))
+    DEAD_LETTER_REPLAY_RATE: float = float(os.getenv("DEAD_LETTER_REPLAY_RATE", "50"))
+    DEAD_LETTER_REPLAY_BATCH_SIZE: int = int(os.getenv("DEAD_LETTER_REPLAY_BATCH_SIZE", "100"))
+
+    # Rows fetched per server-side cursor round-trip by the NDJSON log export
+    LOG_EXPORT_FETCH_SIZE: int = int(os.getenv("LOG_EXPORT_FETCH_SIZE", "1000"))
 
     # Log Retention
     LOG_RETENTION_HOURS: int = int(os.getenv("LOG_RETENTION_HOURS", "72"))
+    # Chunked cleanup: rows per DELETE, pause between chunks, and time budget per run
+    LOG_CLEANUP_BATCH_SIZE: int = int(os.getenv("LOG_CLEANUP_BATCH_SIZE", "5000"))
+    LOG_CLEANUP_PAUSE_MS: int = int(os.getenv("LOG_CLEANUP_PAUSE_MS", "100"))
+    LOG_CLEANUP_TIME_BUDGET: float = float(os.getenv("LOG_CLEANUP_TIME_BUDGET", "300"))
+    # Daily webhook_logs partitions created ahead of time
+    LOG_PARTITION_PREMAKE_DAYS: int = int(os.getenv("LOG_PARTITION_PREMAKE_DAYS", "3"))
 
 settings = Settings()
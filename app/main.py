@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
@@ -5,8 +6,9 @@ from fastapi.openapi.docs import get_swagger_ui_html
 import logging
 
 from app.api import subscriptions, ingest, status
-from app.db import Base, engine
-from app.cache.redis import is_redis_available  # health
+from app.db import Base, engine, async_engine
+from app.cache.redis import is_redis_available, start_invalidation_listener
+from app.services.routing import routing_index
 from app.api import subscriptions, ingest, status, tools 
 
 # Initialize database tables 
@@ -84,8 +86,11 @@ async def global_exception_handler(request: Request, exc: Exception):
 @app.on_event("startup")
 async def startup_event():
     logging.info("Starting Webhook Delivery Service")
+    start_invalidation_listener()
+    await asyncio.get_running_loop().run_in_executor(None, routing_index.try_rebuild)
 
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_event():
     logging.info("Shutting down Webhook Delivery Service")
+    await async_engine.dispose()
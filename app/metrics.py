@@ -0,0 +1,62 @@
+import json
+import os
+import socket
+import time
+from typing import Any, Dict
+
+from app.cache.redis import async_redis_client, redis_client
+
+# Per-process stats (connection pools, local caches, ...) are reported to Redis
+# with a TTL so the API can show every live worker process, not just its own.
+PROCESS_STATS_TTL = 120
+PROCESS_STATS_INTERVAL = 10
+
+_last_reported: Dict[str, float] = {}
+
+def _process_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def report_process_stats(name: str, stats: Dict[str, Any], force: bool = False) -> None:
+    """Publish this process' stats for `name`, at most once per PROCESS_STATS_INTERVAL"""
+    now = time.monotonic()
+    if not force and now - _last_reported.get(name, 0) < PROCESS_STATS_INTERVAL:
+        return
+    _last_reported[name] = now
+    redis_client.setex(f"stats:{name}:{_process_name()}", PROCESS_STATS_TTL, json.dumps(stats))
+
+def get_process_stats(name: str) -> Dict[str, Any]:
+    """Latest reported stats for `name`, keyed by host:pid"""
+    prefix = f"stats:{name}:"
+    keys = list(redis_client.scan_iter(match=f"{prefix}*"))
+    if not keys:
+        return {}
+    values = redis_client.mget(keys)
+    return {
+        key[len(prefix):]: json.loads(value)
+        for key, value in zip(keys, values) if value
+    }
+
+# Cluster-wide counters and gauges (e.g. retention progress) kept in Redis hashes
+def incr_counters(name: str, values: Dict[str, int]) -> None:
+    with redis_client.pipeline(transaction=False) as pipe:
+        for field, amount in values.items():
+            pipe.hincrby(f"counters:{name}", field, amount)
+        pipe.execute()
+
+async def aincr_counters(name: str, values: Dict[str, int]) -> None:
+    """incr_counters for the event loop"""
+    async with async_redis_client.pipeline(transaction=False) as pipe:
+        for field, amount in values.items():
+            pipe.hincrby(f"counters:{name}", field, amount)
+        await pipe.execute()
+
+def set_gauges(name: str, values: Dict[str, Any]) -> None:
+    redis_client.hset(f"gauges:{name}", mapping=values)
+
+def get_metrics(name: str) -> Dict[str, Any]:
+    counters = redis_client.hgetall(f"counters:{name}")
+    gauges = redis_client.hgetall(f"gauges:{name}")
+    return {
+        "counters": {field: int(value) for field, value in counters.items()},
+        "gauges": gauges,
+    }
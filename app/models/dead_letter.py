@@ -0,0 +1,28 @@
+from sqlalchemy import Column, String, Integer, Text, DateTime, Index
+from sqlalchemy.dialects.postgresql import UUID
+from app.db import Base
+
+class DeadLetter(Base):
+    __tablename__ = "dead_letters"
+
+    # Deliveries that ended in FAILURE, kept with their body so they can be replayed once the target is fixed
+    delivery_id = Column(UUID(as_uuid=True), primary_key=True)
+    subscription_id = Column(UUID(as_uuid=True), nullable=False)
+    event_type = Column(String(100), nullable=True)
+    body = Column(Text, nullable=True)  # NULL if the payload was no longer available
+    attempt_count = Column(Integer, nullable=False)
+    last_status_code = Column(Integer, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)  # When the delivery failed
+    # Set when replayed; the replay is a new delivery
+    replayed_at = Column(DateTime(timezone=True), nullable=True)
+    replay_delivery_id = Column(UUID(as_uuid=True), nullable=True)
+
+    __table_args__ = (
+        # Replay range scans only ever look at dead letters not replayed yet
+        Index('idx_dead_letter_pending', subscription_id, created_at, postgresql_where=replayed_at.is_(None)),
+        Index('idx_dead_letter_created_at', created_at),  # For retention cleanup
+    )
+
+    def __repr__(self):
+        return f"<DeadLetter(delivery_id={self.delivery_id}, subscription_id={self.subscription_id})>"
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, String, Integer, Text, DateTime, Index, func
+from sqlalchemy.dialects.postgresql import UUID
+from app.db import Base
+
+class Delivery(Base):
+    __tablename__ = "deliveries"
+
+    # Current state of each delivery; the per-attempt history stays in webhook_logs
+    delivery_id = Column(UUID(as_uuid=True), primary_key=True)
+    subscription_id = Column(UUID(as_uuid=True), nullable=False)
+    event_type = Column(String(100), nullable=True)
+    status = Column(String(50), nullable=False)  # QUEUED, FAILED_ATTEMPT (retry pending), SUCCESS, FAILURE
+    attempt_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_status_code = Column(Integer, nullable=True)
+    last_error = Column(Text, nullable=True)
+    next_retry_at = Column(DateTime(timezone=True), nullable=True)
+    last_attempt_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index('idx_delivery_subscription_id', subscription_id),
+        Index('idx_delivery_created_at', created_at),  # For log retention cleanup
+    )
+
+    def __repr__(self):
+        return f"<Delivery(delivery_id={self.delivery_id}, status={self.status}, attempts={self.attempt_count})>"
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, BigInteger, DateTime, func
+from sqlalchemy.dialects.postgresql import UUID
+from app.db import Base
+
+class SubscriptionStats(Base):
+    __tablename__ = "subscription_delivery_stats"
+
+    # Rollup counters maintained as delivery attempts are logged (see app/services/delivery_stats.py)
+    subscription_id = Column(UUID(as_uuid=True), primary_key=True)
+    total_deliveries = Column(BigInteger, nullable=False, default=0, server_default="0")
+    successful_deliveries = Column(BigInteger, nullable=False, default=0, server_default="0")
+    failed_deliveries = Column(BigInteger, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    @property
+    def in_flight_deliveries(self) -> int:
+        return max(0, self.total_deliveries - self.successful_deliveries - self.failed_deliveries)
+
+    def __repr__(self):
+        return f"<SubscriptionStats(subscription_id={self.subscription_id}, total={self.total_deliveries})>"
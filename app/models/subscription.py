@@ -1,6 +1,6 @@
 import uuid
-from sqlalchemy import Column, String, Boolean, Text, DateTime, func, Index
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Boolean, DateTime, Float, Integer, func, Index
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, UUID
 from app.db import Base
 
 class Subscription(Base):
@@ -9,14 +9,29 @@ class Subscription(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     target_url = Column(String(255), nullable=False)
     secret_key = Column(String(255), nullable=True)
-    event_types = Column(Text, nullable=True)  # Comma-separated list of event types
+    event_types = Column(ARRAY(String(100)), nullable=True)  # NULL means all event types
     is_active = Column(Boolean, default=True)
+    # Delivery limits for this subscription's destination; NULL uses the Settings defaults, 0 is unlimited
+    max_concurrency = Column(Integer, nullable=True)
+    rate_limit_per_second = Column(Float, nullable=True)
+    # Retry policy overrides (see app/services/retry.py); NULL or missing fields use the defaults
+    retry_policy = Column(JSONB, nullable=True)
+    # Micro-batching: up to batch_max_events deliveries (NULL or 1: no batching) collected for up to
+    # batch_window_ms (NULL uses the default) are posted as one JSON array
+    batch_max_events = Column(Integer, nullable=True)
+    batch_window_ms = Column(Integer, nullable=True)
+    # Fair scheduling: share of dispatch relative to other busy subscriptions (NULL is 1), and a cap
+    # on deliveries dispatched per second (NULL is uncapped)
+    lane_weight = Column(Integer, nullable=True)
+    lane_max_per_second = Column(Integer, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Indexes
     __table_args__ = (
         Index('idx_subscription_id', id),
+        Index('idx_subscription_event_types', event_types, postgresql_using='gin'),  # Fan-out routing
+        Index('idx_subscription_created_at_id', created_at, id),  # Keyset pagination
     )
     
     def __repr__(self):
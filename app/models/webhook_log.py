@@ -1,29 +1,49 @@
+import json
 import uuid
-from sqlalchemy import Column, String, Integer, Text, DateTime, ForeignKey, Index, func
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy import Column, String, Integer, Text, DateTime, ForeignKey, Index, event, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
 from app.db import Base
+from app.models.webhook_payload import WebhookPayload
+from app.services.partitions import init_log_partitions
 
 class WebhookLog(Base):
     __tablename__ = "webhook_logs"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    delivery_id = Column(UUID(as_uuid=True), nullable=False, index=True)  # Used to identify retries of the same webhook
+    delivery_id = Column(UUID(as_uuid=True), nullable=False)  # Used to identify retries of the same webhook
     subscription_id = Column(UUID(as_uuid=True), ForeignKey("subscriptions.id"), nullable=False)
     target_url = Column(String(255), nullable=False)
     event_type = Column(String(100), nullable=True)
-    payload = Column(JSONB, nullable=False)
     attempt_number = Column(Integer, nullable=False, default=1)
     status_code = Column(Integer, nullable=True)  # HTTP status code, null if couldn't reach
     status = Column(String(50), nullable=False)  # SUCCESS, FAILED_ATTEMPT, FAILURE
     error_details = Column(Text, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Part of the primary key because the table is range-partitioned on it (daily partitions)
+    created_at = Column(DateTime(timezone=True), primary_key=True, nullable=False, server_default=func.now())
+
+    # Payload is stored once per delivery in webhook_payloads; loaded lazily (or via selectinload)
+    payload_record = relationship(
+        WebhookPayload,
+        primaryjoin="foreign(WebhookLog.delivery_id) == WebhookPayload.delivery_id",
+        viewonly=True,
+        lazy="select",
+    )
     
     # Indexes for efficient querying
     __table_args__ = (
         Index('idx_webhook_log_delivery_id', delivery_id),
-        Index('idx_webhook_log_subscription_id', subscription_id),
+        # Keyset pagination of a subscription's logs, newest first
+        Index('idx_webhook_log_subscription_created_at', subscription_id, created_at.desc(), id),
         Index('idx_webhook_log_created_at', created_at),  # For log retention cleanup
+        {"postgresql_partition_by": "RANGE (created_at)"},
     )
     
+    @property
+    def payload(self):
+        return json.loads(self.payload_record.body) if self.payload_record is not None else None
+
     def __repr__(self):
-        return f"<WebhookLog(id={self.id}, delivery_id={self.delivery_id}, attempt={self.attempt_number})>"
\ No newline at end of file
+        return f"<WebhookLog(id={self.id}, delivery_id={self.delivery_id}, attempt={self.attempt_number})>"
+# A partitioned table needs partitions before it accepts rows
+event.listen(WebhookLog.__table__, "after_create", init_log_partitions)
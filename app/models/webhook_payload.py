@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, Text, DateTime, Index, func
+from sqlalchemy.dialects.postgresql import UUID
+from app.db import Base
+
+class WebhookPayload(Base):
+    __tablename__ = "webhook_payloads"
+
+    # One row per delivery; every attempt in webhook_logs references it by delivery_id
+    delivery_id = Column(UUID(as_uuid=True), primary_key=True)
+    body = Column(Text, nullable=False)  # Raw JSON body exactly as signed and sent
+    payload_hash = Column(String(64), nullable=False)  # sha256 of body
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index('idx_webhook_payload_created_at', created_at),  # For log retention cleanup
+    )
+
+    def __repr__(self):
+        return f"<WebhookPayload(delivery_id={self.delivery_id}, hash={self.payload_hash})>"
@@ -1,12 +1,32 @@
-from typing import Optional, List
+from typing import Literal, Optional, List
 from uuid import UUID
-from pydantic import BaseModel, HttpUrl, validator
+from pydantic import BaseModel, Field, HttpUrl, validator
 from datetime import datetime
 
+class RetryPolicy(BaseModel):
+    """Per-subscription retry overrides; unset fields use the service defaults"""
+    max_attempts: Optional[int] = Field(None, ge=1, le=100)
+    base_delay: Optional[float] = Field(None, ge=0)
+    max_delay: Optional[float] = Field(None, ge=0)
+    backoff: Optional[Literal["decorrelated", "exponential"]] = None
+    backoff_factor: Optional[float] = Field(None, ge=1)
+    honor_retry_after: Optional[bool] = None
+    # Replaces the default retryable set (408, 425, 429, 5xx); network errors are always retried
+    retryable_status_codes: Optional[List[int]] = None
+
 class SubscriptionBase(BaseModel):
     target_url: HttpUrl
     secret_key: Optional[str] = None
     event_types: Optional[List[str]] = None
+    # Destination limits; None uses the service defaults, 0 means unlimited
+    max_concurrency: Optional[int] = Field(None, ge=0)
+    rate_limit_per_second: Optional[float] = Field(None, ge=0)
+    retry_policy: Optional[RetryPolicy] = None
+    # Micro-batching; None or 1 sends every event on its own
+    batch_max_events: Optional[int] = Field(None, ge=1, le=1000)
+    batch_window_ms: Optional[int] = Field(None, ge=0, le=60000)
+    lane_weight: Optional[int] = Field(None, ge=1, le=1000)
+    lane_max_per_second: Optional[int] = Field(None, ge=1)
     
     @validator('event_types', pre=True)
     def parse_event_types(cls, v):
@@ -22,6 +42,13 @@ class SubscriptionUpdate(BaseModel):
     secret_key: Optional[str] = None
     event_types: Optional[List[str]] = None
     is_active: Optional[bool] = None
+    max_concurrency: Optional[int] = Field(None, ge=0)
+    rate_limit_per_second: Optional[float] = Field(None, ge=0)
+    retry_policy: Optional[RetryPolicy] = None  # Replaces the whole policy; null restores the defaults
+    batch_max_events: Optional[int] = Field(None, ge=1, le=1000)
+    batch_window_ms: Optional[int] = Field(None, ge=0, le=60000)
+    lane_weight: Optional[int] = Field(None, ge=1, le=1000)
+    lane_max_per_second: Optional[int] = Field(None, ge=1)
 
 class SubscriptionResponse(SubscriptionBase):
     id: UUID
@@ -35,14 +35,21 @@ class WebhookLogEntry(BaseModel):
 class DeliveryStatus(BaseModel):
     delivery_id: UUID
     subscription_id: UUID
+    event_type: Optional[str] = None
     total_attempts: int
-    latest_status: str
-    latest_attempt: datetime
-    logs: List[WebhookLogEntry]
+    latest_status: str  # QUEUED, FAILED_ATTEMPT (retry pending), SUCCESS or FAILURE
+    latest_attempt: Optional[datetime] = None
+    last_status_code: Optional[int] = None
+    last_error: Optional[str] = None
+    next_retry_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    logs: List[WebhookLogEntry] = []  # Only loaded with include_logs=true
 
 class SubscriptionDeliveryStats(BaseModel):
     subscription_id: UUID
     total_deliveries: int
     successful_deliveries: int
     failed_deliveries: int
-    recent_logs: List[WebhookLogEntry]
\ No newline at end of file
+    in_flight_deliveries: int = 0
+    recent_logs: List[WebhookLogEntry]
+    next_cursor: Optional[str] = None  # Pass as ?cursor= to fetch the next (older) page of logs
\ No newline at end of file
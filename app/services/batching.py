@@ -0,0 +1,147 @@
+"""
+Per-subscription micro-batching buffer.
+
+Subscriptions with `batch_max_events` > 1 opt in. Their first delivery
+attempts are appended to a Redis list instead of being posted one by one.
+The delivery that opens a window schedules a flush `batch_window_ms` later,
+and the delivery that fills the batch triggers one immediately. The flush
+pops up to `batch_max_events` items atomically (so concurrent flushes never
+send an event twice) and posts them as a single signed JSON array.
+
+Every window has an id. A window flush only pops if its window is still the
+current one, so the timer of a window already emptied by a full batch does
+not cut the next window short. The next delivery buffered while no window is
+open opens one, so a buffer whose flush could not be scheduled is picked up
+again by the next delivery.
+
+Each item keeps its own delivery_id, so logging, status tracking and retries
+stay per event. A failed batch is retried as a whole.
+"""
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.cache.redis import redis_client
+from app.config import settings
+
+BATCH_BUFFER_KEY = "batch:buffer:{subscription_id}"
+BATCH_WINDOW_KEY = "batch:window:{subscription_id}"
+
+# Upper bound for batch_max_events, also the flush size if batching is turned off with events still buffered
+BATCH_MAX_EVENTS_LIMIT = 1000
+
+# Outcomes of append_to_batch
+WINDOW_OPENED = 1
+BATCH_FULL = 2
+
+# KEYS: buffer list, window id; ARGV: item, max events, ttl (s), id for a new window
+# Returns 1 when this item opened a window, 2 when the batch is full, else 0
+_APPEND_SCRIPT = """
+local size = redis.call('RPUSH', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+if size >= tonumber(ARGV[2]) then
+    return 2
+end
+if redis.call('SET', KEYS[2], ARGV[4], 'NX', 'EX', ARGV[3]) then
+    return 1
+end
+return 0
+"""
+
+# KEYS: buffer list, window id; ARGV: item, window it opened ('' for none)
+# Returns 1 if the item was still buffered (and is now removed), else 0
+_REMOVE_SCRIPT = """
+local removed = redis.call('LREM', KEYS[1], 1, ARGV[1])
+if ARGV[2] ~= '' and redis.call('GET', KEYS[2]) == ARGV[2] then
+    redis.call('DEL', KEYS[2])
+end
+return removed
+"""
+
+# KEYS: buffer list, window id; ARGV: max events, window being flushed ('' for any),
+# id for the window of whatever is left
+# Returns the popped items followed by the number still buffered (nothing for a stale window)
+_POP_SCRIPT = """
+if ARGV[2] ~= '' and redis.call('GET', KEYS[2]) ~= ARGV[2] then
+    return {0}
+end
+local count = tonumber(ARGV[1])
+local items = redis.call('LRANGE', KEYS[1], 0, count - 1)
+redis.call('LTRIM', KEYS[1], count, -1)
+local remaining = redis.call('LLEN', KEYS[1])
+if remaining > 0 then
+    redis.call('SET', KEYS[2], ARGV[3], 'KEEPTTL')
+else
+    redis.call('DEL', KEYS[2])
+end
+table.insert(items, remaining)
+return items
+"""
+
+_append = redis_client.register_script(_APPEND_SCRIPT)
+_pop = redis_client.register_script(_POP_SCRIPT)
+_remove = redis_client.register_script(_REMOVE_SCRIPT)
+
+def batch_settings(subscription_data: dict) -> Optional[Tuple[int, int]]:
+    """(max events, window ms) if the subscription batches its deliveries, else None"""
+    max_events = subscription_data.get("batch_max_events")
+    if not max_events or max_events <= 1:
+        return None
+    window_ms = subscription_data.get("batch_window_ms")
+    if window_ms is None:
+        window_ms = settings.BATCH_WINDOW_MS
+    return max_events, window_ms
+
+def _batch_keys(subscription_id: str) -> List[str]:
+    return [
+        BATCH_BUFFER_KEY.format(subscription_id=subscription_id),
+        BATCH_WINDOW_KEY.format(subscription_id=subscription_id),
+    ]
+
+def append_to_batch(subscription_id: str, item: Dict[str, Any], max_events: int, window_id: str) -> int:
+    """Buffer one delivery; returns WINDOW_OPENED (the window is `window_id`), BATCH_FULL or 0"""
+    return _append(
+        keys=_batch_keys(subscription_id),
+        # Buffered items outlive any realistic window, but not forever if no flush ever runs
+        args=[json.dumps(item), max_events, settings.CLAIM_CHECK_TTL, window_id],
+    )
+
+def remove_from_batch(subscription_id: str, item: Dict[str, Any], window_id: Optional[str] = None) -> bool:
+    """
+    Undo append_to_batch when its flush could not be scheduled, closing the window it opened
+    (the next delivery buffered opens a new one). False if a flush has taken the item already.
+    """
+    return bool(_remove(keys=_batch_keys(subscription_id), args=[json.dumps(item), window_id or ""]))
+
+def pop_batch(
+    subscription_id: str,
+    max_events: int,
+    window_id: Optional[str],
+    next_window_id: str
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Take up to `max_events` buffered items, oldest first, and how many are left.
+    
+    With a `window_id`, nothing is popped unless that window is still open. Items left
+    behind belong to a new window, `next_window_id`.
+    """
+    result = _pop(keys=_batch_keys(subscription_id), args=[max_events, window_id or "", next_window_id])
+    return [json.loads(item) for item in result[:-1]], result[-1]
+
+def get_batch_buffer_sizes() -> Dict[str, int]:
+    """Buffered deliveries per subscription"""
+    prefix = BATCH_BUFFER_KEY.format(subscription_id="")
+    keys = list(redis_client.scan_iter(match=f"{prefix}*"))
+    with redis_client.pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.llen(key)
+        sizes = pipe.execute()
+    return {key[len(prefix):]: size for key, size in zip(keys, sizes) if size}
+
+def build_batch_body(items: List[Dict[str, Any]]) -> str:
+    """JSON array of {delivery_id, event_type, payload}, with each raw payload spliced in unchanged"""
+    return "[" + ",".join(
+        f'{{"delivery_id":{json.dumps(item["delivery_id"])},'
+        f'"event_type":{json.dumps(item.get("event_type"))},'
+        f'"payload":{item["body"]}}}'
+        for item in items
+    ) + "]"
@@ -0,0 +1,265 @@
+"""
+Per-target-host circuit breaker shared by all workers through Redis.
+
+closed     deliveries are attempted; consecutive failures (network errors,
+           timeouts, 5xx, 408, 429) are counted and reaching
+           CIRCUIT_BREAKER_FAILURE_THRESHOLD opens the circuit
+open       deliveries are parked in a per-host Redis list without an HTTP
+           attempt; after CIRCUIT_BREAKER_OPEN_SECONDS the next delivery
+           moves the circuit to half-open
+half_open  exactly one delivery (holding the probe lock) is attempted; success
+           closes the circuit, failure opens it again for another cool-down.
+           Results of requests that were in flight when the circuit opened
+           are ignored until then, so only the probe can close it. A probe
+           deferred by the destination limiter gives its lock back
+
+Parked deliveries are re-enqueued by the drain_parked_deliveries beat task,
+at most CIRCUIT_BREAKER_DRAIN_BATCH per host per run once the circuit has
+closed (and one at a time while waiting for a probe), so a recovered target
+is not hit by the whole backlog at once. Deliveries parked for longer than
+CIRCUIT_BREAKER_MAX_PARK_SECONDS are taken out by the same task and recorded
+as failed attempts, so a host that stays down does not hold them forever.
+
+State transitions run as Lua scripts so concurrent workers agree on them.
+Every function fails open: if Redis is unavailable, deliveries are attempted.
+"""
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from app.cache.redis import redis_client
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+BREAKER_STATE_KEY = "breaker:state:{host}"
+BREAKER_PROBE_KEY = "breaker:probe:{host}"
+BREAKER_PARKED_KEY = "breaker:parked:{host}"
+BREAKER_PARKED_HOSTS_KEY = "breaker:parked-hosts"
+
+# Outcomes of check_circuit
+ATTEMPT = "attempt"
+PROBE = "probe"
+PARK = "park"
+
+# Idle breaker state is forgotten after this long
+BREAKER_STATE_TTL = 7 * 24 * 3600
+
+# KEYS: state hash, probe lock; ARGV: now (ms), open period (ms), probe lock ttl (ms)
+# Returns 1 to attempt, 2 to attempt as the half-open probe, 0 to park
+_CHECK_SCRIPT = """
+local state = redis.call('HGET', KEYS[1], 'state')
+if not state or state == 'closed' then
+    return 1
+end
+if state == 'open' then
+    local opened_at = tonumber(redis.call('HGET', KEYS[1], 'opened_at')) or 0
+    if tonumber(ARGV[1]) < opened_at + tonumber(ARGV[2]) then
+        return 0
+    end
+    redis.call('HSET', KEYS[1], 'state', 'half_open')
+end
+if redis.call('SET', KEYS[2], '1', 'NX', 'PX', ARGV[3]) then
+    return 2
+end
+return 0
+"""
+
+# KEYS: state hash, probe lock; ARGV: healthy (1/0), now (ms), failure threshold, state ttl (s)
+# Returns the transition ('opened', 'reopened', 'closed') or '' if there was none
+_RECORD_SCRIPT = """
+local state = redis.call('HGET', KEYS[1], 'state') or 'closed'
+if ARGV[1] == '1' then
+    if state == 'open' then
+        -- A request sent before the circuit opened; only the half-open probe may close it
+        return ''
+    end
+    if state == 'half_open' then
+        redis.call('HSET', KEYS[1], 'state', 'closed', 'failures', 0, 'closed_at', ARGV[2])
+        redis.call('EXPIRE', KEYS[1], ARGV[4])
+        redis.call('DEL', KEYS[2])
+        return 'closed'
+    end
+    if (tonumber(redis.call('HGET', KEYS[1], 'failures')) or 0) > 0 then
+        redis.call('HSET', KEYS[1], 'failures', 0)
+    end
+    return ''
+end
+if state == 'half_open' then
+    redis.call('HSET', KEYS[1], 'state', 'open', 'opened_at', ARGV[2])
+    redis.call('DEL', KEYS[2])
+    return 'reopened'
+end
+if state == 'open' then
+    return ''
+end
+local failures = redis.call('HINCRBY', KEYS[1], 'failures', 1)
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+if failures >= tonumber(ARGV[3]) then
+    redis.call('HSET', KEYS[1], 'state', 'open', 'opened_at', ARGV[2])
+    return 'opened'
+end
+return ''
+"""
+
+# KEYS: parked list, parked hosts set; ARGV: host
+_FORGET_IF_EMPTY_SCRIPT = """
+if redis.call('LLEN', KEYS[1]) == 0 then
+    redis.call('SREM', KEYS[2], ARGV[1])
+end
+"""
+
+# KEYS: parked list; ARGV: parked before (epoch seconds), max entries
+# Entries are parked in order, so the expired ones are at the head
+_POP_EXPIRED_SCRIPT = """
+local expired = {}
+while #expired < tonumber(ARGV[2]) do
+    local item = redis.call('LINDEX', KEYS[1], 0)
+    if not item then
+        break
+    end
+    local parked_at = cjson.decode(item)['parked_at']
+    if type(parked_at) ~= 'number' or parked_at >= tonumber(ARGV[1]) then
+        break
+    end
+    redis.call('LPOP', KEYS[1])
+    expired[#expired + 1] = item
+end
+return expired
+"""
+
+_check = redis_client.register_script(_CHECK_SCRIPT)
+_record = redis_client.register_script(_RECORD_SCRIPT)
+_forget_if_empty = redis_client.register_script(_FORGET_IF_EMPTY_SCRIPT)
+_pop_expired = redis_client.register_script(_POP_EXPIRED_SCRIPT)
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+def _probe_ttl_ms() -> int:
+    # The probe lock outlives the longest possible request
+    return int((settings.WEBHOOK_TIMEOUT * 2 + 5) * 1000)
+
+def is_target_failure(status_code: Optional[int]) -> bool:
+    """Outcomes that count against the breaker; other 4xx mean the target is up"""
+    return status_code is None or status_code >= 500 or status_code in (408, 429)
+
+def check_circuit(host: str) -> str:
+    """ATTEMPT, PROBE (attempt as the half-open probe) or PARK for a delivery to `host`"""
+    if not settings.CIRCUIT_BREAKER_ENABLED:
+        return ATTEMPT
+    try:
+        result = _check(
+            keys=[BREAKER_STATE_KEY.format(host=host), BREAKER_PROBE_KEY.format(host=host)],
+            args=[_now_ms(), int(settings.CIRCUIT_BREAKER_OPEN_SECONDS * 1000), _probe_ttl_ms()],
+        )
+    except Exception as e:
+        logger.warning(f"Circuit breaker unavailable, attempting delivery to {host}: {str(e)}")
+        return ATTEMPT
+    return {1: ATTEMPT, 2: PROBE}.get(result, PARK)
+
+def record_circuit_result(host: str, status_code: Optional[int]) -> None:
+    """Feed an attempt's outcome (None for network errors) into the host's breaker"""
+    if not settings.CIRCUIT_BREAKER_ENABLED:
+        return
+    try:
+        transition = _record(
+            keys=[BREAKER_STATE_KEY.format(host=host), BREAKER_PROBE_KEY.format(host=host)],
+            args=[
+                0 if is_target_failure(status_code) else 1,
+                _now_ms(),
+                settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+                BREAKER_STATE_TTL,
+            ],
+        )
+    except Exception as e:
+        logger.warning(f"Failed to record circuit breaker result for {host}: {str(e)}")
+        return
+    if transition:
+        logger.warning(f"Circuit breaker for {host}: {transition}")
+
+def release_probe(host: str) -> None:
+    """Give up the half-open probe lock without an attempt, so the next delivery can probe"""
+    if not settings.CIRCUIT_BREAKER_ENABLED:
+        return
+    try:
+        redis_client.delete(BREAKER_PROBE_KEY.format(host=host))
+    except Exception as e:
+        logger.warning(f"Failed to release circuit breaker probe for {host}: {str(e)}")
+
+def park_delivery(host: str, task_kwargs: Dict[str, Any], task_name: Optional[str] = None) -> None:
+    """Hold a delivery (deliver_webhook's kwargs, or another task's) until the host's circuit closes"""
+    entry = {"task": task_name, "kwargs": task_kwargs, "parked_at": time.time()}
+    with redis_client.pipeline(transaction=False) as pipe:
+        pipe.rpush(BREAKER_PARKED_KEY.format(host=host), json.dumps(entry))
+        pipe.sadd(BREAKER_PARKED_HOSTS_KEY, host)
+        pipe.execute()
+
+def drain_budget(host: str) -> int:
+    """How many parked deliveries for `host` may be released right now"""
+    state = redis_client.hmget(BREAKER_STATE_KEY.format(host=host), "state", "opened_at")
+    if not state[0] or state[0] == "closed":
+        return settings.CIRCUIT_BREAKER_DRAIN_BATCH
+    # Not closed: release one delivery to act as the probe, once a probe is due
+    if redis_client.exists(BREAKER_PROBE_KEY.format(host=host)):
+        return 0
+    if state[0] == "open" and _now_ms() < int(state[1] or 0) + settings.CIRCUIT_BREAKER_OPEN_SECONDS * 1000:
+        return 0
+    return 1
+
+def pop_parked_deliveries(host: str, count: int) -> List[Dict[str, Any]]:
+    """Take up to `count` parked deliveries for `host`, oldest first"""
+    items = redis_client.lpop(BREAKER_PARKED_KEY.format(host=host), count) or []
+    return [json.loads(item) for item in items]
+
+def pop_expired_parked_deliveries(host: str, count: int) -> List[Dict[str, Any]]:
+    """Take up to `count` deliveries parked for `host` longer than CIRCUIT_BREAKER_MAX_PARK_SECONDS"""
+    if settings.CIRCUIT_BREAKER_MAX_PARK_SECONDS <= 0:
+        return []
+    items = _pop_expired(
+        keys=[BREAKER_PARKED_KEY.format(host=host)],
+        args=[time.time() - settings.CIRCUIT_BREAKER_MAX_PARK_SECONDS, count],
+    )
+    return [json.loads(item) for item in items]
+
+def return_parked_deliveries(host: str, entries: List[Dict[str, Any]]) -> None:
+    """Put popped deliveries back at the head of the host's parked list, in their original order"""
+    if not entries:
+        return
+    with redis_client.pipeline(transaction=False) as pipe:
+        pipe.lpush(BREAKER_PARKED_KEY.format(host=host), *[json.dumps(entry) for entry in reversed(entries)])
+        pipe.sadd(BREAKER_PARKED_HOSTS_KEY, host)
+        pipe.execute()
+
+def forget_parked_host(host: str) -> None:
+    """Stop tracking `host` for draining, unless a delivery was parked meanwhile"""
+    _forget_if_empty(keys=[BREAKER_PARKED_KEY.format(host=host), BREAKER_PARKED_HOSTS_KEY], args=[host])
+
+def parked_hosts() -> List[str]:
+    return sorted(redis_client.smembers(BREAKER_PARKED_HOSTS_KEY))
+
+def get_circuit_breakers() -> Dict[str, Dict[str, Any]]:
+    """State, failure count and parked deliveries for every host with breaker state or a backlog"""
+    prefix = BREAKER_STATE_KEY.format(host="")
+    hosts = {key[len(prefix):] for key in redis_client.scan_iter(match=f"{prefix}*")}
+    hosts.update(parked_hosts())
+    hosts = sorted(hosts)
+
+    with redis_client.pipeline(transaction=False) as pipe:
+        for host in hosts:
+            pipe.hgetall(BREAKER_STATE_KEY.format(host=host))
+            pipe.llen(BREAKER_PARKED_KEY.format(host=host))
+        results = pipe.execute()
+
+    breakers = {}
+    for i, host in enumerate(hosts):
+        state, parked = results[2 * i], results[2 * i + 1]
+        opened_at = state.get("opened_at")
+        breakers[host] = {
+            "state": state.get("state", "closed"),
+            "consecutive_failures": int(state.get("failures", 0)),
+            "opened_at": int(opened_at) / 1000 if opened_at else None,
+            "parked_deliveries": parked,
+        }
+    return breakers
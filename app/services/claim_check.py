@@ -0,0 +1,77 @@
+"""
+Claim-check storage for large webhook bodies.
+
+Bodies above CLAIM_CHECK_THRESHOLD_BYTES are kept in Redis and delivery tasks
+carry only the key (`body_ref`), so broker messages stay small no matter how
+large the payload is, including every retry. A body shared by several deliveries
+(fan-out) is stored once with a reference count; each delivery releases its
+reference when it reaches a terminal state and the last one deletes it.
+"""
+import logging
+import uuid
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.cache.redis import async_redis_client, redis_client
+from app.config import settings
+from app.models.webhook_payload import WebhookPayload
+
+logger = logging.getLogger(__name__)
+
+CLAIM_CHECK_KEY_PREFIX = "claim:"
+
+def should_claim_check(body: str) -> bool:
+    threshold = settings.CLAIM_CHECK_THRESHOLD_BYTES
+    # A UTF-8 character is 1 to 4 bytes, so only bodies in between need encoding to measure
+    if len(body) > threshold:
+        return True
+    if len(body) * 4 <= threshold:
+        return False
+    return len(body.encode("utf-8")) > threshold
+
+async def astore_bodies(bodies: List[str], refs: int = 1) -> List[str]:
+    """Store bodies in Redis (one pipeline round-trip) and return their keys"""
+    keys = [f"{CLAIM_CHECK_KEY_PREFIX}{uuid.uuid4()}" for _ in bodies]
+    async with async_redis_client.pipeline(transaction=False) as pipe:
+        for key, body in zip(keys, bodies):
+            pipe.hset(key, mapping={"body": body, "refs": refs})
+            pipe.expire(key, settings.CLAIM_CHECK_TTL)
+        await pipe.execute()
+    return keys
+
+async def astore_body(body: str, refs: int = 1) -> str:
+    return (await astore_bodies([body], refs))[0]
+
+def store_bodies(bodies: List[str], refs: int = 1) -> List[str]:
+    """astore_bodies for sync callers (workers)"""
+    keys = [f"{CLAIM_CHECK_KEY_PREFIX}{uuid.uuid4()}" for _ in bodies]
+    with redis_client.pipeline(transaction=False) as pipe:
+        for key, body in zip(keys, bodies):
+            pipe.hset(key, mapping={"body": body, "refs": refs})
+            pipe.expire(key, settings.CLAIM_CHECK_TTL)
+        pipe.execute()
+    return keys
+
+def load_body(db: Session, delivery_id: str, body_ref: str) -> Optional[str]:
+    """
+    Fetch a claim-checked body.
+
+    Falls back to the delivery's stored payload (written on its first attempt) if
+    the Redis copy is gone; returns None if neither exists.
+    """
+    body = redis_client.hget(body_ref, "body")
+    if body is not None:
+        return body
+    logger.warning(f"Claim-checked body {body_ref} for delivery {delivery_id} missing from Redis")
+    record = db.get(WebhookPayload, delivery_id)
+    return record.body if record is not None else None
+
+def release_body(body_ref: str) -> None:
+    """Drop one delivery's reference; the last reference deletes the body"""
+    try:
+        if redis_client.hincrby(body_ref, "refs", -1) <= 0:
+            redis_client.delete(body_ref)
+    except Exception as e:
+        # The TTL still removes it eventually
+        logger.warning(f"Failed to release claim-checked body {body_ref}: {str(e)}")
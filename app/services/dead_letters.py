@@ -0,0 +1,156 @@
+"""
+Dead-letter store and bulk replay.
+
+Every delivery whose final logged attempt is a FAILURE is copied, with its
+body, into dead_letters by the log sink, in the same transaction as the log
+row. Dead letters outlive the delivery logs (DEAD_LETTER_RETENTION_DAYS).
+
+POST /subscriptions/{id}/replay starts the replay_dead_letters task, which
+claims dead letters in batches (FOR UPDATE SKIP LOCKED, so concurrent replays
+never pick the same one), re-enters each one into the pipeline as a new delivery
+and schedules the next batch at the replay rate. The replay's end time is fixed
+when it starts, so replays that fail again are not picked up by the same replay.
+"""
+import re
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.models.dead_letter import DeadLetter
+from app.models.delivery import Delivery
+
+def apply_dead_letters(connection, rows: Iterable[Dict[str, Any]]) -> None:
+    """Record the deliveries that reached FAILURE in a batch of webhook_logs rows (with their bodies)"""
+    failed = {str(row["delivery_id"]): row for row in rows if row["status"] == "FAILURE"}
+    if not failed:
+        return
+    # A delivery can only fail once; a redelivered task's second FAILURE row is ignored
+    connection.execute(
+        pg_insert(DeadLetter).on_conflict_do_nothing(index_elements=[DeadLetter.delivery_id]),
+        [
+            {
+                "delivery_id": row["delivery_id"],
+                "subscription_id": row["subscription_id"],
+                "event_type": row["event_type"],
+                "body": row.get("body"),
+                "attempt_count": row["attempt_number"],
+                "last_status_code": row["status_code"],
+                "last_error": row["error_details"],
+                "created_at": row["created_at"],
+            }
+            for _, row in sorted(failed.items())
+        ],
+    )
+
+def parse_status_filter(value: Optional[str]) -> Optional[Tuple[int, int]]:
+    """'503' or '5xx' as an inclusive range of last status codes; ValueError if malformed"""
+    if not value:
+        return None
+    value = value.strip().lower()
+    if re.fullmatch(r"[1-5]\d\d", value):
+        return int(value), int(value)
+    if re.fullmatch(r"[1-5]xx", value):
+        return int(value[0]) * 100, int(value[0]) * 100 + 99
+    raise ValueError(f"Invalid status filter '{value}': use a status code (503) or class (5xx)")
+
+def _pending_filters(
+    subscription_id: str,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    status_range: Optional[Tuple[int, int]]
+) -> list:
+    filters = [DeadLetter.subscription_id == subscription_id, DeadLetter.replayed_at.is_(None)]
+    if start is not None:
+        filters.append(DeadLetter.created_at >= start)
+    if end is not None:
+        filters.append(DeadLetter.created_at < end)
+    if status_range is not None:
+        filters.append(DeadLetter.last_status_code.between(*status_range))
+    return filters
+
+def count_pending_dead_letters(
+    db,
+    subscription_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    status_range: Optional[Tuple[int, int]] = None
+) -> int:
+    return db.execute(
+        select(func.count()).select_from(DeadLetter).where(*_pending_filters(subscription_id, start, end, status_range))
+    ).scalar()
+
+def claim_replay_batch(
+    connection,
+    subscription_id: str,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    status_range: Optional[Tuple[int, int]],
+    limit: int
+) -> Tuple[int, List[Dict[str, Any]]]:
+    """
+    Mark up to `limit` pending dead letters (oldest first) as replayed and queue a new delivery for each.
+
+    Returns how many were claimed and the new deliveries' task kwargs. Dead letters
+    without a body are skipped (marked replayed without a delivery).
+    """
+    rows = connection.execute(
+        select(DeadLetter.delivery_id, DeadLetter.event_type, DeadLetter.body)
+        .where(*_pending_filters(subscription_id, start, end, status_range))
+        .order_by(DeadLetter.created_at, DeadLetter.delivery_id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not rows:
+        return 0, []
+
+    now = datetime.now(timezone.utc)
+    claimed = []
+    task_kwargs_list = []
+    for row in rows:
+        replay_id = str(uuid.uuid4()) if row.body is not None else None
+        claimed.append({"dead_letter_id": row.delivery_id, "new_delivery_id": replay_id})
+        if replay_id:
+            task_kwargs_list.append(dict(
+                delivery_id=replay_id,
+                subscription_id=str(subscription_id),
+                attempt_number=1,
+                event_type=row.event_type,
+                body=row.body
+            ))
+
+    # executemany: one UPDATE statement for the whole batch
+    connection.execute(
+        update(DeadLetter.__table__)
+        .where(DeadLetter.__table__.c.delivery_id == bindparam("dead_letter_id"))
+        .values(replayed_at=now, replay_delivery_id=bindparam("new_delivery_id")),
+        claimed
+    )
+    if task_kwargs_list:
+        connection.execute(
+            pg_insert(Delivery).on_conflict_do_nothing(index_elements=[Delivery.delivery_id]),
+            [
+                {
+                    "delivery_id": task_kwargs["delivery_id"],
+                    "subscription_id": task_kwargs["subscription_id"],
+                    "event_type": task_kwargs["event_type"],
+                    "status": "QUEUED",
+                    "attempt_count": 0,
+                }
+                for task_kwargs in task_kwargs_list
+            ],
+        )
+    return len(rows), task_kwargs_list
+
+def unclaim_replays(connection, replay_delivery_ids: List[str]) -> None:
+    """Undo claim_replay_batch for deliveries that could not be published, so a later replay picks them up"""
+    if not replay_delivery_ids:
+        return
+    connection.execute(
+        update(DeadLetter)
+        .where(DeadLetter.replay_delivery_id.in_(replay_delivery_ids))
+        .values(replayed_at=None, replay_delivery_id=None)
+    )
+    connection.execute(delete(Delivery).where(Delivery.delivery_id.in_(replay_delivery_ids)))
@@ -0,0 +1,114 @@
+"""
+Delivery state rows (one per delivery_id).
+
+Ingest inserts a QUEUED row for every accepted delivery. Workers upsert the
+row from each logged attempt, in the same transaction as the attempt row, so
+the status endpoint can answer with one primary-key lookup.
+"""
+from typing import Any, Dict, Iterable, List
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.delivery import Delivery
+
+TERMINAL_STATUSES = ("SUCCESS", "FAILURE")
+
+async def create_deliveries(db: AsyncSession, task_kwargs_list: List[Dict[str, Any]]) -> None:
+    """Record freshly ingested deliveries as QUEUED (one multi-row INSERT)"""
+    if not task_kwargs_list:
+        return
+    # A worker may already have picked the task up and upserted the row
+    await db.execute(
+        pg_insert(Delivery).on_conflict_do_nothing(index_elements=[Delivery.delivery_id]),
+        [
+            {
+                "delivery_id": task_kwargs["delivery_id"],
+                "subscription_id": task_kwargs["subscription_id"],
+                "event_type": task_kwargs.get("event_type"),
+                "status": "QUEUED",
+                "attempt_count": 0,
+            }
+            for task_kwargs in task_kwargs_list
+        ],
+    )
+    await db.commit()
+
+def apply_delivery_states(connection, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Upsert each delivery's state from the latest of a batch of webhook_logs rows.
+    
+    Returns the transitions made, for the rollups: per delivery, whether this is its first
+    logged attempt (`started`) and the terminal status it reached (`finished`, else None).
+    Redelivered attempts, late flushes of older attempts and anything logged after a
+    terminal status are not transitions, and leave the stored state alone.
+    """
+    latest = {}
+    for row in rows:
+        key = str(row["delivery_id"])
+        if key not in latest or (row["attempt_number"], row["created_at"]) >= (latest[key]["attempt_number"], latest[key]["created_at"]):
+            latest[key] = row
+    if not latest:
+        return []
+    
+    # Locked in key order (like the upsert) so concurrent flushes see each other's transitions
+    previous = {
+        str(state.delivery_id): state
+        for state in connection.execute(
+            select(Delivery.delivery_id, Delivery.status, Delivery.attempt_count)
+            .where(Delivery.delivery_id.in_([row["delivery_id"] for _, row in sorted(latest.items())]))
+            .order_by(Delivery.delivery_id)
+            .with_for_update()
+        )
+    }
+    transitions = []
+    for key, row in latest.items():
+        before = previous.get(key)
+        if before is not None and (
+            before.attempt_count > row["attempt_number"] or before.status in TERMINAL_STATUSES
+        ):
+            # Older than the stored state, or the delivery already ended; the upsert below leaves it alone
+            continue
+        started = before is None or before.attempt_count == 0
+        finished = row["status"] if row["status"] in TERMINAL_STATUSES else None
+        if started or finished:
+            transitions.append({"subscription_id": row["subscription_id"], "started": started, "finished": finished})
+    
+    statement = pg_insert(Delivery)
+    excluded = statement.excluded
+    statement = statement.on_conflict_do_update(
+        index_elements=[Delivery.delivery_id],
+        set_={
+            "status": excluded.status,
+            "attempt_count": excluded.attempt_count,
+            "last_status_code": excluded.last_status_code,
+            "last_error": excluded.last_error,
+            "next_retry_at": excluded.next_retry_at,
+            "last_attempt_at": excluded.last_attempt_at,
+            "updated_at": func.now(),
+        },
+        # Flushes from different workers can arrive out of order, and a redelivered task can log
+        # the same attempt again after it ended; never move a delivery backwards or out of a terminal status
+        # (!= rather than NOT IN: expanding IN parameters can't be used with executemany)
+        where=and_(
+            Delivery.attempt_count <= excluded.attempt_count,
+            *(Delivery.status != status for status in TERMINAL_STATUSES),
+        ),
+    )
+    # Sorted so concurrent flushes lock rows in the same order
+    connection.execute(statement, [
+        {
+            "delivery_id": row["delivery_id"],
+            "subscription_id": row["subscription_id"],
+            "event_type": row["event_type"],
+            "status": row["status"],
+            "attempt_count": row["attempt_number"],
+            "last_status_code": row["status_code"],
+            "last_error": row["error_details"],
+            "next_retry_at": row.get("next_retry_at"),
+            "last_attempt_at": row["created_at"],
+        }
+        for _, row in sorted(latest.items())
+    ])
+    return transitions
@@ -1,3 +1,234 @@
-# All logic shifted to tasks.py
-# sorrry, had some issues with the directory structure initially
-# Details about delivery through celery task given in README.MD -- please verify
\ No newline at end of file
+import asyncio
+import itertools
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.config import settings
+
+class DeliveryHTTPPool:
+    """
+    Keep-alive HTTP clients for webhook delivery, one connection pool per target host.
+
+    One instance lives per worker process so connections (and TLS sessions) to
+    the same customer endpoints are reused across tasks instead of being set up
+    for every attempt.
+
+    Beyond `max_hosts`, the least recently used host's client is evicted. Other
+    threads may still be posting through it, so it is closed when its last
+    in-flight request finishes.
+    """
+
+    def __init__(
+        self,
+        timeout: float,
+        max_connections_per_host: int,
+        keepalive_expiry: float,
+        http2: bool = False,
+        max_hosts: int = 256,
+    ):
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections_per_host,
+            max_keepalive_connections=max_connections_per_host,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2
+        self.max_hosts = max_hosts
+        self._clients: "OrderedDict[Tuple[str, str, Optional[int]], httpx.Client]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Requests in progress per client (by id), and evicted clients waiting for theirs to finish
+        self._in_flight: Dict[int, int] = {}
+        self._retired: Dict[int, Any] = {}
+        self.requests = 0
+        self.new_connections = 0
+        self.tls_handshakes = 0
+        self.evicted_hosts = 0
+
+    def _new_client(self):
+        return httpx.Client(timeout=self.timeout, limits=self.limits, http2=self.http2)
+
+    def _close_client(self, client) -> None:
+        client.close()
+
+    def _acquire_client(self, url: str):
+        """The host's client, counted as in use until _release_client"""
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname or "", parts.port)
+        evicted = None
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+            else:
+                client = self._new_client()
+                self._clients[key] = client
+                if len(self._clients) > self.max_hosts:
+                    _, evicted = self._clients.popitem(last=False)
+                    self.evicted_hosts += 1
+                    if self._in_flight.get(id(evicted)):
+                        self._retired[id(evicted)] = evicted
+                        evicted = None
+            self._in_flight[id(client)] = self._in_flight.get(id(client), 0) + 1
+        if evicted is not None:
+            self._close_client(evicted)
+        return client
+
+    def _release_client(self, client) -> None:
+        with self._lock:
+            remaining = self._in_flight[id(client)] - 1
+            if remaining:
+                self._in_flight[id(client)] = remaining
+                return
+            del self._in_flight[id(client)]
+            retired = self._retired.pop(id(client), None)
+        if retired is not None:
+            self._close_client(retired)
+
+    def _trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        # httpcore only emits connect/TLS events when it opens a new connection
+        if event_name == "connection.connect_tcp.complete":
+            self.new_connections += 1
+        elif event_name == "connection.start_tls.complete":
+            self.tls_handshakes += 1
+
+    def post(self, url: str, **kwargs) -> httpx.Response:
+        client = self._acquire_client(url)
+        self.requests += 1
+        try:
+            return client.post(url, extensions={"trace": self._trace}, **kwargs)
+        finally:
+            self._release_client(client)
+
+    def open_connections(self) -> int:
+        with self._lock:
+            clients = list(self._clients.values())
+        total = 0
+        for client in clients:
+            for shard in getattr(client, "shards", [client]):
+                pool = getattr(getattr(shard, "_transport", None), "_pool", None)
+                total += len(getattr(pool, "connections", ()))
+        return total
+
+    def stats(self) -> Dict[str, Any]:
+        reused = max(self.requests - self.new_connections, 0)
+        return {
+            "hosts": len(self._clients),
+            "requests": self.requests,
+            "new_connections": self.new_connections,
+            "tls_handshakes": self.tls_handshakes,
+            "reuse_ratio": round(reused / self.requests, 4) if self.requests else 0.0,
+            "open_connections": self.open_connections(),
+            "evicted_hosts": self.evicted_hosts,
+            "http2": self.http2,
+        }
+
+    def _take_all_clients(self) -> list:
+        with self._lock:
+            clients = list(self._clients.values()) + list(self._retired.values())
+            self._clients.clear()
+            self._retired.clear()
+        return clients
+
+    def close(self) -> None:
+        for client in self._take_all_clients():
+            client.close()
+
+class _ShardedAsyncClient:
+    """
+    Several small httpx.AsyncClient pools for one host, used round-robin.
+
+    httpcore re-scans every connection of a pool whenever a request starts or
+    finishes, so one pool with hundreds of connections becomes CPU-bound.
+    """
+
+    def __init__(self, shards: List[httpx.AsyncClient]):
+        self.shards = shards
+        self._next = itertools.cycle(shards)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await next(self._next).post(url, **kwargs)
+
+    async def aclose(self) -> None:
+        for shard in self.shards:
+            await shard.aclose()
+
+class AsyncDeliveryHTTPPool(DeliveryHTTPPool):
+    """DeliveryHTTPPool for the asyncio delivery engine (sharded httpx.AsyncClient per host)"""
+
+    def __init__(self, *args, shard_size: int = 16, **kwargs):
+        super().__init__(*args, **kwargs)
+        connections = self.limits.max_connections
+        self.shard_count = max(1, math.ceil(connections / shard_size))
+        per_shard = math.ceil(connections / self.shard_count)
+        self.shard_limits = httpx.Limits(
+            max_connections=per_shard,
+            max_keepalive_connections=per_shard,
+            keepalive_expiry=self.limits.keepalive_expiry,
+        )
+
+    def _new_client(self):
+        return _ShardedAsyncClient([
+            httpx.AsyncClient(timeout=self.timeout, limits=self.shard_limits, http2=self.http2)
+            for _ in range(self.shard_count)
+        ])
+
+    def _close_client(self, client) -> None:
+        asyncio.ensure_future(client.aclose())
+
+    async def _atrace(self, event_name: str, info: Dict[str, Any]) -> None:
+        self._trace(event_name, info)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        client = self._acquire_client(url)
+        self.requests += 1
+        try:
+            return await client.post(url, extensions={"trace": self._atrace}, **kwargs)
+        finally:
+            self._release_client(client)
+
+    async def aclose(self) -> None:
+        for client in self._take_all_clients():
+            await client.aclose()
+
+    def close(self) -> None:
+        raise RuntimeError("Use 'await AsyncDeliveryHTTPPool.aclose()'")
+
+def create_async_delivery_pool(max_connections_per_host: int) -> AsyncDeliveryHTTPPool:
+    return AsyncDeliveryHTTPPool(
+        timeout=settings.WEBHOOK_TIMEOUT,
+        max_connections_per_host=max_connections_per_host,
+        keepalive_expiry=settings.WEBHOOK_KEEPALIVE_EXPIRY,
+        http2=settings.WEBHOOK_HTTP2,
+        max_hosts=settings.WEBHOOK_POOL_MAX_HOSTS,
+        shard_size=settings.ASYNC_ENGINE_POOL_SHARD_SIZE,
+    )
+
+_pool: Optional[DeliveryHTTPPool] = None
+_pool_pid: Optional[int] = None
+
+def get_delivery_pool() -> DeliveryHTTPPool:
+    """The pooled client for this process (re-created after a fork)"""
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        _pool = DeliveryHTTPPool(
+            timeout=settings.WEBHOOK_TIMEOUT,
+            max_connections_per_host=settings.WEBHOOK_MAX_CONNECTIONS_PER_HOST,
+            keepalive_expiry=settings.WEBHOOK_KEEPALIVE_EXPIRY,
+            http2=settings.WEBHOOK_HTTP2,
+            max_hosts=settings.WEBHOOK_POOL_MAX_HOSTS,
+        )
+        _pool_pid = os.getpid()
+    return _pool
+
+def close_delivery_pool() -> None:
+    global _pool, _pool_pid
+    if _pool is not None and _pool_pid == os.getpid():
+        _pool.close()
+    _pool = None
+    _pool_pid = None
@@ -0,0 +1,72 @@
+"""
+Per-subscription delivery rollups.
+
+Counters are bumped in the same transaction that writes the attempt rows,
+from the delivery state transitions those rows make: a delivery counts
+towards the total when its first attempt is logged, and towards
+succeeded/failed when it first reaches SUCCESS or FAILURE. A redelivered
+attempt (acks_late, lost worker) therefore doesn't count twice, and a
+delivery that fails before any attempt is logged still counts towards the
+total. In-flight is the remainder. rebuild_delivery_stats() recomputes them from
+the deliveries table, which keeps every delivery's state past the log retention window.
+"""
+from collections import defaultdict
+from typing import Any, Dict, Iterable
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.models.delivery_stats import SubscriptionStats
+
+def delivery_stats_deltas(transitions: Iterable[Dict[str, Any]]) -> Dict[Any, Dict[str, int]]:
+    """Counter increments per subscription for delivery state transitions (see apply_delivery_states)"""
+    deltas = defaultdict(lambda: {"total_deliveries": 0, "successful_deliveries": 0, "failed_deliveries": 0})
+    for transition in transitions:
+        delta = deltas[str(transition["subscription_id"])]
+        if transition["started"]:
+            delta["total_deliveries"] += 1
+        if transition["finished"] == "SUCCESS":
+            delta["successful_deliveries"] += 1
+        elif transition["finished"] == "FAILURE":
+            delta["failed_deliveries"] += 1
+    return deltas
+
+def apply_delivery_stats(connection, transitions: Iterable[Dict[str, Any]]) -> None:
+    """Add a batch of delivery state transitions to the rollups (one upsert per subscription)"""
+    deltas = delivery_stats_deltas(transitions)
+    if not deltas:
+        return
+    statement = pg_insert(SubscriptionStats)
+    statement = statement.on_conflict_do_update(
+        index_elements=[SubscriptionStats.subscription_id],
+        set_={
+            "total_deliveries": SubscriptionStats.total_deliveries + statement.excluded.total_deliveries,
+            "successful_deliveries": SubscriptionStats.successful_deliveries + statement.excluded.successful_deliveries,
+            "failed_deliveries": SubscriptionStats.failed_deliveries + statement.excluded.failed_deliveries,
+            "updated_at": func.now(),
+        },
+    )
+    # Sorted so concurrent flushes lock rows in the same order
+    connection.execute(statement, [
+        {"subscription_id": subscription_id, **delta}
+        for subscription_id, delta in sorted(deltas.items())
+    ])
+
+def rebuild_delivery_stats(connection) -> int:
+    """Recompute every subscription's rollup from the deliveries table; returns the number of subscriptions"""
+    # Held until commit: log flushes that commit meanwhile wait, then add their transitions on top
+    connection.execute(text("LOCK TABLE subscription_delivery_stats IN EXCLUSIVE MODE"))
+    connection.execute(text("DELETE FROM subscription_delivery_stats"))
+    return connection.execute(text(
+        """
+        INSERT INTO subscription_delivery_stats
+            (subscription_id, total_deliveries, successful_deliveries, failed_deliveries, updated_at)
+        SELECT subscription_id,
+               count(*) FILTER (WHERE attempt_count > 0),
+               count(*) FILTER (WHERE status = 'SUCCESS'),
+               count(*) FILTER (WHERE status = 'FAILURE'),
+               now()
+        FROM deliveries
+        GROUP BY subscription_id
+        """
+    )).rowcount
@@ -0,0 +1,64 @@
+"""
+Idempotent ingest.
+
+Producers retry POST /ingest/{subscription_id} on timeouts. A request with an
+`Idempotency-Key` header (or, with IDEMPOTENCY_HASH_PAYLOADS, any request: the
+key is then the sha256 of its body) claims that key for the subscription in
+Redis with SET NX EX before a delivery is created. A repeat within
+IDEMPOTENCY_TTL finds the key taken and gets the original delivery_id back
+without anything being enqueued.
+
+Keys are stored as a sha256 digest next to a delivery_id, so each entry has a
+fixed size whatever the producer sends, and expire after IDEMPOTENCY_TTL: the
+window holds at most TTL x ingest rate entries. If Redis is unavailable the
+request is not deduplicated rather than refused.
+"""
+import hashlib
+import logging
+from typing import Optional
+
+from app.cache.redis import async_redis_client
+from app.config import settings
+from app.metrics import aincr_counters
+from app.utils import payload_hash
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_KEY = "idem:{subscription_id}:{digest}"
+
+def idempotency_key(header_value: Optional[str], body: str) -> Optional[str]:
+    """The request's dedup key: the Idempotency-Key header, else the payload hash if enabled"""
+    if header_value:
+        return "key:" + hashlib.sha256(header_value.encode('utf-8')).hexdigest()
+    if settings.IDEMPOTENCY_HASH_PAYLOADS:
+        return "body:" + payload_hash(body)
+    return None
+
+async def aclaim_idempotency_key(subscription_id: str, key: str, delivery_id: str) -> Optional[str]:
+    """
+    Claim `key` for a new delivery. Returns None if it was claimed, or the delivery_id
+    of the request that already holds it.
+    """
+    redis_key = IDEMPOTENCY_KEY.format(subscription_id=subscription_id, digest=key)
+    try:
+        # MULTI: the GET sees whichever delivery_id won the SET NX
+        async with async_redis_client.pipeline(transaction=True) as pipe:
+            pipe.set(redis_key, delivery_id, nx=True, ex=settings.IDEMPOTENCY_TTL)
+            pipe.get(redis_key)
+            claimed, holder = await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Idempotency check failed, accepting request without dedup: {str(e)}")
+        return None
+    duplicate = not claimed and holder is not None
+    try:
+        await aincr_counters("idempotency", {"checked": 1, "duplicates": int(duplicate)})
+    except Exception as e:
+        logger.warning(f"Failed to count idempotency check: {str(e)}")
+    return holder if duplicate else None
+
+async def arelease_idempotency_key(subscription_id: str, key: str) -> None:
+    """Free a claimed key whose delivery was never queued, so the producer's retry is accepted"""
+    try:
+        await async_redis_client.delete(IDEMPOTENCY_KEY.format(subscription_id=subscription_id, digest=key))
+    except Exception as e:
+        logger.warning(f"Failed to release idempotency key: {str(e)}")
@@ -0,0 +1,135 @@
+"""
+Per-subscription delivery lanes (weighted fair scheduling).
+
+With FAIR_SCHEDULING_ENABLED, ingest no longer publishes deliver_webhook tasks
+straight to the delivery queue, where a large tenant's burst would sit in front
+of every other subscription's events for as long as it takes to drain. Each
+delivery's task kwargs are appended to its subscription's lane (a Redis list)
+and the dispatch_lanes beat task moves them to the delivery queue, keeping that
+queue at most FAIR_QUEUE_TARGET_DEPTH deep:
+
+- each round visits the non-empty lanes in turn, starting from a rotating
+  position, and takes up to lane_weight * FAIR_LANE_QUANTUM deliveries from
+  each, so busy lanes share delivery capacity in proportion to their weights;
+- a lane with lane_max_per_second is never dispatched faster than that.
+
+A small tenant's event therefore waits for at most a shallow queue and one
+round, however deep a large tenant's lane is. Retries and deferrals come from
+the retry schedule and are not laned.
+"""
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from app.cache.redis import async_redis_client, redis_client
+from app.celery_app import celery_app
+from app.config import settings
+
+LANE_KEY = "lane:{subscription_id}"
+LANE_SENT_KEY = "lane:sent:{subscription_id}:{second}"
+ACTIVE_LANES_KEY = "lane:active"
+LANE_CURSOR_KEY = "lane:cursor"
+
+# KEYS: lane list, dispatched-this-second counter, active lanes set
+# ARGV: max entries, max per second (0: no cap), subscription id
+_POP_SCRIPT = """
+local count = tonumber(ARGV[1])
+local cap = tonumber(ARGV[2])
+if cap > 0 then
+    count = math.min(count, cap - tonumber(redis.call('GET', KEYS[2]) or '0'))
+    if count <= 0 then
+        return {}
+    end
+end
+local items = redis.call('LRANGE', KEYS[1], 0, count - 1)
+if #items > 0 then
+    redis.call('LTRIM', KEYS[1], #items, -1)
+    if cap > 0 then
+        redis.call('INCRBY', KEYS[2], #items)
+        redis.call('EXPIRE', KEYS[2], 2)
+    end
+end
+if redis.call('LLEN', KEYS[1]) == 0 then
+    redis.call('SREM', KEYS[3], ARGV[3])
+end
+return items
+"""
+
+_pop = redis_client.register_script(_POP_SCRIPT)
+
+async def aenqueue_deliveries(task_kwargs_list: List[Dict[str, Any]]) -> None:
+    """Append deliveries to their subscriptions' lanes (one pipeline round-trip)"""
+    async with async_redis_client.pipeline(transaction=False) as pipe:
+        for task_kwargs in task_kwargs_list:
+            pipe.rpush(LANE_KEY.format(subscription_id=task_kwargs["subscription_id"]), json.dumps(task_kwargs))
+        # After the pushes, so a lane is never left with entries but no active marker
+        pipe.sadd(ACTIVE_LANES_KEY, *{task_kwargs["subscription_id"] for task_kwargs in task_kwargs_list})
+        await pipe.execute()
+
+def enqueue_deliveries(task_kwargs_list: List[Dict[str, Any]]) -> int:
+    """
+    aenqueue_deliveries for sync callers (workers). Returns how many of the
+    leading entries were pushed, so the caller can undo the rest.
+    """
+    with redis_client.pipeline(transaction=False) as pipe:
+        for task_kwargs in task_kwargs_list:
+            pipe.rpush(LANE_KEY.format(subscription_id=task_kwargs["subscription_id"]), json.dumps(task_kwargs))
+        pipe.sadd(ACTIVE_LANES_KEY, *{task_kwargs["subscription_id"] for task_kwargs in task_kwargs_list})
+        results = pipe.execute(raise_on_error=False)
+    pushed = 0
+    for result in results[:-1]:
+        if isinstance(result, Exception):
+            break
+        pushed += 1
+    return pushed
+
+def active_lanes() -> List[str]:
+    return sorted(redis_client.smembers(ACTIVE_LANES_KEY))
+
+def next_lane_offset(lane_count: int) -> int:
+    """Where this round starts, so the same lane doesn't always go first when capacity runs out"""
+    return redis_client.incr(LANE_CURSOR_KEY) % lane_count
+
+def pop_lane(subscription_id: str, count: int, max_per_second: Optional[int] = None) -> List[str]:
+    """Take up to `count` deliveries (JSON task kwargs) from a lane, oldest first, within its per-second cap"""
+    return _pop(
+        keys=[
+            LANE_KEY.format(subscription_id=subscription_id),
+            LANE_SENT_KEY.format(subscription_id=subscription_id, second=int(time.time())),
+            ACTIVE_LANES_KEY,
+        ],
+        args=[count, max_per_second or 0, subscription_id],
+    )
+
+def return_to_lane(subscription_id: str, entries: List[str]) -> None:
+    """Put popped entries back at the head of their lane (used when publishing them failed)"""
+    if entries:
+        with redis_client.pipeline(transaction=False) as pipe:
+            pipe.lpush(LANE_KEY.format(subscription_id=subscription_id), *reversed(entries))
+            pipe.sadd(ACTIVE_LANES_KEY, subscription_id)
+            pipe.execute()
+
+def delivery_queue_depth(queue: Optional[str] = None) -> int:
+    """Messages waiting in the broker's delivery queue (or another queue)"""
+    with celery_app.connection_or_acquire() as connection:
+        # Own channel: a failed passive declare closes the channel it was made on (AMQP)
+        channel = connection.channel()
+        try:
+            return channel.queue_declare(queue=queue or settings.DELIVERY_QUEUE, passive=True).message_count
+        except connection.channel_errors:
+            # Not declared yet: nothing has been published to it or consumed from it
+            return 0
+        finally:
+            try:
+                channel.close()
+            except Exception:
+                pass
+
+def get_lane_depths() -> Dict[str, int]:
+    """Deliveries waiting in each non-empty lane"""
+    lanes = active_lanes()
+    with redis_client.pipeline(transaction=False) as pipe:
+        for subscription_id in lanes:
+            pipe.llen(LANE_KEY.format(subscription_id=subscription_id))
+        depths = pipe.execute()
+    return {subscription_id: depth for subscription_id, depth in zip(lanes, depths) if depth}
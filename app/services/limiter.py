@@ -0,0 +1,128 @@
+"""
+Distributed per-destination delivery limits.
+
+Each destination (the target host by default, or the subscription with
+DELIVERY_LIMIT_KEY=subscription) gets, in Redis:
+
+- a concurrency lease set: a sorted set of in-flight lease IDs scored by
+  their expiry, so a worker that dies mid-request only holds its slot until
+  the lease expires;
+- a token bucket: a hash holding the token count and the last refill time.
+
+Both are checked and updated atomically by one Lua script, so every worker
+and engine process shares the same limits. A delivery that does not get a
+slot is deferred by the caller instead of being attempted (or failed), which
+frees the worker for deliveries to healthy destinations.
+
+Limits come from the subscription (`max_concurrency`, `rate_limit_per_second`)
+and fall back to the DELIVERY_* defaults in Settings; 0 means unlimited.
+"""
+import logging
+import time
+import uuid
+from typing import Optional, Tuple
+
+from app.cache.redis import redis_client
+from app.config import settings
+from app.utils import target_host
+
+logger = logging.getLogger(__name__)
+
+LIMIT_KEY_PREFIX = "limit:"
+
+# KEYS: lease zset, token bucket hash
+# ARGV: now (ms), lease id, max concurrency, lease ttl (ms), rate (tokens/s), burst
+# Returns {1, 0} when a slot was granted, else {0, suggested wait in ms}
+_ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local max_concurrency = tonumber(ARGV[3])
+local rate = tonumber(ARGV[5])
+local burst = tonumber(ARGV[6])
+
+if max_concurrency > 0 then
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+    if redis.call('ZCARD', KEYS[1]) >= max_concurrency then
+        return {0, -1}
+    end
+end
+
+if rate > 0 then
+    local bucket = redis.call('HMGET', KEYS[2], 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or burst
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - ts) * rate / 1000)
+    if tokens < 1 then
+        redis.call('HSET', KEYS[2], 'tokens', tostring(tokens), 'ts', now)
+        redis.call('PEXPIRE', KEYS[2], math.ceil(burst * 1000 / rate) + 1000)
+        return {0, math.ceil((1 - tokens) * 1000 / rate)}
+    end
+    redis.call('HSET', KEYS[2], 'tokens', tostring(tokens - 1), 'ts', now)
+    redis.call('PEXPIRE', KEYS[2], math.ceil(burst * 1000 / rate) + 1000)
+end
+
+if max_concurrency > 0 then
+    redis.call('ZADD', KEYS[1], now + tonumber(ARGV[4]), ARGV[2])
+    redis.call('PEXPIRE', KEYS[1], tonumber(ARGV[4]))
+end
+return {1, 0}
+"""
+
+_acquire = redis_client.register_script(_ACQUIRE_SCRIPT)
+
+def limit_scope(subscription_data: dict) -> str:
+    """The destination a delivery counts against: target host (default) or subscription"""
+    if settings.DELIVERY_LIMIT_KEY == "subscription":
+        return f"sub:{subscription_data['id']}"
+    return f"host:{target_host(subscription_data['target_url'])}"
+
+def delivery_limits(subscription_data: dict) -> Tuple[int, float]:
+    """(max concurrency, tokens per second) for a subscription; 0 means unlimited"""
+    max_concurrency = subscription_data.get("max_concurrency")
+    rate = subscription_data.get("rate_limit_per_second")
+    if max_concurrency is None:
+        max_concurrency = settings.DELIVERY_MAX_CONCURRENCY
+    if rate is None:
+        rate = settings.DELIVERY_RATE_LIMIT_PER_SECOND
+    return max_concurrency, rate
+
+def acquire_delivery_slot(subscription_data: dict) -> Tuple[Optional[str], float]:
+    """
+    Try to take a concurrency lease and a rate token for this delivery.
+
+    Returns (lease, 0) when the delivery may proceed, with lease None if no
+    concurrency limit applies, or (None, seconds to wait) when it should be
+    deferred. Fails open if Redis is unavailable.
+    """
+    max_concurrency, rate = delivery_limits(subscription_data)
+    if max_concurrency <= 0 and rate <= 0:
+        return None, 0
+
+    scope = limit_scope(subscription_data)
+    lease = str(uuid.uuid4()) if max_concurrency > 0 else None
+    burst = settings.DELIVERY_RATE_LIMIT_BURST or max(rate, 1)
+    # A lease outlives the longest possible request so crashed workers free their slot
+    lease_ttl_ms = int((settings.WEBHOOK_TIMEOUT * 2 + 5) * 1000)
+    try:
+        granted, wait_ms = _acquire(
+            keys=[f"{LIMIT_KEY_PREFIX}{scope}:leases", f"{LIMIT_KEY_PREFIX}{scope}:bucket"],
+            args=[int(time.time() * 1000), lease or "", max_concurrency, lease_ttl_ms, rate, burst],
+        )
+    except Exception as e:
+        logger.warning(f"Delivery limiter unavailable, not limiting {scope}: {str(e)}")
+        return None, 0
+
+    if granted:
+        return lease, 0
+    # Concurrency refusals have no known wait: poll again after the configured delay
+    wait = settings.DELIVERY_LIMIT_RETRY_DELAY if wait_ms < 0 else wait_ms / 1000
+    return None, wait
+
+def release_delivery_slot(subscription_data: dict, lease: Optional[str]) -> None:
+    """Give a concurrency lease back as soon as the HTTP request has finished"""
+    if not lease:
+        return
+    try:
+        redis_client.zrem(f"{LIMIT_KEY_PREFIX}{limit_scope(subscription_data)}:leases", lease)
+    except Exception as e:
+        # The lease expires on its own
+        logger.warning(f"Failed to release delivery lease: {str(e)}")
@@ -0,0 +1,124 @@
+"""
+Streaming NDJSON export of delivery logs.
+
+Rows are read through a server-side cursor (stream_results + yield_per) and
+written out one fetch batch at a time, so memory stays flat no matter how
+many rows match. No ORM objects or Pydantic models are built: each row is
+serialized straight from the result tuple, and payloads are spliced in as
+the raw JSON text stored in webhook_payloads, without parsing it.
+"""
+import json
+import zlib
+from datetime import datetime
+from typing import Iterator, List, Optional, Sequence
+from uuid import UUID
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.db import engine
+from app.models.webhook_log import WebhookLog
+from app.models.webhook_payload import WebhookPayload
+
+# Column order of an exported line; "payload" is the delivery's original JSON body
+EXPORT_FIELDS = (
+    "id",
+    "delivery_id",
+    "subscription_id",
+    "target_url",
+    "event_type",
+    "attempt_number",
+    "status_code",
+    "status",
+    "error_details",
+    "created_at",
+    "payload",
+)
+
+def parse_export_fields(fields: Optional[str]) -> List[str]:
+    """Parse a comma-separated projection; raises ValueError on unknown fields"""
+    if not fields:
+        return list(EXPORT_FIELDS)
+    selected = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in selected if f not in EXPORT_FIELDS]
+    if not selected:
+        raise ValueError(f"No export fields selected. Allowed: {', '.join(EXPORT_FIELDS)}")
+    if unknown:
+        raise ValueError(f"Unknown export fields: {', '.join(unknown)}. Allowed: {', '.join(EXPORT_FIELDS)}")
+    return selected
+
+def build_export_query(
+    subscription_id: UUID,
+    fields: Sequence[str],
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    status: Optional[str] = None,
+):
+    """Select the projected columns, oldest first, walking the (subscription_id, created_at) index"""
+    columns = [WebhookLog.__table__.c[f] for f in fields if f != "payload"]
+    if "payload" in fields:
+        columns.append(WebhookPayload.__table__.c.body)
+    stmt = select(*columns).where(WebhookLog.subscription_id == subscription_id)
+    if "payload" in fields:
+        stmt = stmt.select_from(
+            WebhookLog.__table__.outerjoin(
+                WebhookPayload.__table__,
+                WebhookPayload.delivery_id == WebhookLog.delivery_id,
+            )
+        )
+    if start is not None:
+        stmt = stmt.where(WebhookLog.created_at >= start)
+    if end is not None:
+        stmt = stmt.where(WebhookLog.created_at < end)
+    if status:
+        stmt = stmt.where(WebhookLog.status == status)
+    return stmt.order_by(WebhookLog.created_at)
+
+def _json_value(value):
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def format_ndjson_line(fields: Sequence[str], row: Sequence) -> str:
+    """One NDJSON line; the payload (last column when selected) is emitted verbatim"""
+    columns = [f for f in fields if f != "payload"]
+    record = {name: _json_value(value) for name, value in zip(columns, row)}
+    line = json.dumps(record, separators=(",", ":"))
+    if "payload" in fields:
+        body = row[len(columns)]
+        payload = body if body is not None else "null"
+        line = f'{line[:-1]}{"," if record else ""}"payload":{payload}}}'
+    return line + "\n"
+
+def iter_log_export(
+    subscription_id: UUID,
+    fields: Sequence[str],
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    status: Optional[str] = None,
+    compress: bool = False,
+    fetch_size: Optional[int] = None,
+) -> Iterator[bytes]:
+    """
+    Yield the export as byte chunks, one chunk per fetch batch.
+
+    Owns its own connection (held only while the stream is consumed) so the
+    request's session is not tied up, and gzips incrementally when asked.
+    """
+    fetch_size = fetch_size or settings.LOG_EXPORT_FETCH_SIZE
+    stmt = build_export_query(subscription_id, fields, start, end, status)
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31: gzip container
+
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=fetch_size).execute(stmt)
+        for rows in result.partitions():
+            chunk = "".join(format_ndjson_line(fields, row) for row in rows).encode("utf-8")
+            if compressor:
+                chunk = compressor.compress(chunk)
+                if not chunk:
+                    continue
+            yield chunk
+    if compressor:
+        yield compressor.flush()
@@ -0,0 +1,203 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db import engine
+from app.models.webhook_log import WebhookLog
+from app.models.webhook_payload import WebhookPayload
+from app.services.dead_letters import apply_dead_letters
+from app.services.deliveries import apply_delivery_states
+from app.services.delivery_stats import apply_delivery_stats
+from app.utils import payload_hash
+
+logger = logging.getLogger(__name__)
+
+class WebhookLogSink:
+    """
+    Write-behind sink for WebhookLog rows.
+
+    In "sync" mode every attempt is committed immediately with the caller's
+    session. In "buffered" mode rows are collected per worker process and
+    written as multi-row INSERTs when the buffer reaches `batch_size` rows or
+    every `flush_interval` seconds, and on worker shutdown.
+
+    A batch the database rejects (e.g. a row for a subscription deleted since,
+    which violates the webhook_logs foreign key) is split until the offending
+    rows are isolated; only those are dropped (counted in `rows_rejected`).
+    Other errors (database unavailable) requeue the unwritten rows.
+
+    Tasks are acked late (task_acks_late), but in buffered mode that is still
+    when the task returns, before its log row is flushed: rows buffered by a
+    worker that is killed are lost, and its tasks are not redelivered.
+    """
+
+    def __init__(self, mode: str, batch_size: int, flush_interval: float, max_buffered: int):
+        self.mode = mode
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.rows_written = 0
+        self.flushes = 0
+        self.rows_dropped = 0
+        self.rows_rejected = 0
+
+    @property
+    def buffered(self) -> bool:
+        return self.mode == "buffered"
+
+    def start(self) -> None:
+        if not self.buffered or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="webhook-log-sink", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+
+    def write(self, db: Session, row: Dict[str, Any]) -> None:
+        if not self.buffered:
+            try:
+                self._write_rows(db, [row])
+                db.commit()
+            except (IntegrityError, DataError) as e:
+                db.rollback()
+                self._reject(row, e)
+                return
+            self.rows_written += 1
+            return
+        with self._lock:
+            self._buffer.append(row)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._flush_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+            if not rows:
+                return
+            # Chunks still to write, the next one last
+            pending = [rows]
+            while pending:
+                chunk = pending.pop()
+                try:
+                    with engine.begin() as connection:
+                        self._write_rows(connection, chunk)
+                    self.rows_written += len(chunk)
+                    self.flushes += 1
+                except (IntegrityError, DataError) as e:
+                    # Rejected rows would fail every retry; bisect so the rest of the batch still gets written
+                    if len(chunk) == 1:
+                        self._reject(chunk[0], e)
+                    else:
+                        middle = len(chunk) // 2
+                        pending += [chunk[middle:], chunk[:middle]]
+                except Exception as e:
+                    unwritten = chunk + [row for rest in reversed(pending) for row in rest]
+                    logger.error(f"Failed to flush {len(unwritten)} webhook log rows: {str(e)}")
+                    self._requeue(unwritten)
+                    return
+
+    def _reject(self, row: Dict[str, Any], error: Exception) -> None:
+        self.rows_rejected += 1
+        logger.error(
+            f"Dropping webhook log row for delivery {row['delivery_id']} (attempt {row['attempt_number']}, "
+            f"{row['status']}) rejected by the database: {str(error)}"
+        )
+
+    def _write_rows(self, connection, rows: List[Dict[str, Any]]) -> None:
+        # The payload is stored once per delivery, on its first attempt
+        payloads = {}
+        log_rows = []
+        for row in rows:
+            # Copied rather than popped so a failed flush can requeue the original rows
+            log_row = dict(row)
+            body = log_row.pop("body", None)
+            log_row.pop("next_retry_at", None)
+            log_rows.append(log_row)
+            if row["attempt_number"] == 1 and body is not None:
+                payloads[row["delivery_id"]] = dict(
+                    delivery_id=row["delivery_id"],
+                    body=body,
+                    payload_hash=payload_hash(body),
+                    created_at=row["created_at"],
+                )
+        if payloads:
+            connection.execute(
+                pg_insert(WebhookPayload).on_conflict_do_nothing(index_elements=["delivery_id"]),
+                list(payloads.values())
+            )
+        # executemany of a Core insert is sent as multi-row INSERT ... VALUES statements
+        connection.execute(insert(WebhookLog), log_rows)
+        apply_delivery_stats(connection, apply_delivery_states(connection, rows))
+        apply_dead_letters(connection, rows)
+
+    def _requeue(self, rows: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._buffer[:0] = rows
+            overflow = len(self._buffer) - self.max_buffered
+            if overflow > 0:
+                del self._buffer[:overflow]
+                self.rows_dropped += overflow
+                logger.error(f"Webhook log buffer full, dropped {overflow} oldest rows")
+
+    def close(self) -> None:
+        """Stop the flush thread and write everything still buffered"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = len(self._buffer)
+        return {
+            "mode": self.mode,
+            "pending": pending,
+            "rows_written": self.rows_written,
+            "flushes": self.flushes,
+            "rows_dropped": self.rows_dropped,
+            "rows_rejected": self.rows_rejected,
+        }
+
+_sink: Optional[WebhookLogSink] = None
+_sink_pid: Optional[int] = None
+
+def get_log_sink() -> WebhookLogSink:
+    """The log sink for this process (re-created after a fork)"""
+    global _sink, _sink_pid
+    if _sink is None or _sink_pid != os.getpid():
+        _sink = WebhookLogSink(
+            mode=settings.LOG_WRITE_MODE,
+            batch_size=settings.LOG_FLUSH_BATCH_SIZE,
+            flush_interval=settings.LOG_FLUSH_INTERVAL,
+            max_buffered=settings.LOG_BUFFER_MAX_ROWS,
+        )
+        _sink_pid = os.getpid()
+        _sink.start()
+        atexit.register(_sink.close)
+    return _sink
+
+def close_log_sink() -> None:
+    global _sink, _sink_pid
+    if _sink is not None and _sink_pid == os.getpid():
+        _sink.close()
+    _sink = None
+    _sink_pid = None
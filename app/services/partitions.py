@@ -0,0 +1,146 @@
+"""
+Daily range partitions of webhook_logs on created_at.
+
+Partitions are named webhook_logs_pYYYYMMDD and cover one UTC day. They are
+created a few days ahead by the partition maintenance beat task. Retention
+detaches and drops whole partitions, which takes the same time however many
+rows they hold. A DEFAULT partition catches rows outside every daily range so
+inserts never fail if maintenance falls behind. When maintenance catches up,
+rows the DEFAULT partition holds for a day are moved into that day's partition
+as it is created.
+"""
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import text
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+LOG_TABLE = "webhook_logs"
+LOG_PARTITION_PREFIX = "webhook_logs_p"
+LOG_DEFAULT_PARTITION = "webhook_logs_default"
+
+def partition_name(day: date) -> str:
+    return f"{LOG_PARTITION_PREFIX}{day:%Y%m%d}"
+
+def partition_day(name: str) -> Optional[date]:
+    """The day a partition covers, from its name (None for anything else)"""
+    if not name.startswith(LOG_PARTITION_PREFIX):
+        return None
+    try:
+        return datetime.strptime(name[len(LOG_PARTITION_PREFIX):], "%Y%m%d").date()
+    except ValueError:
+        return None
+
+def is_partitioned(connection) -> bool:
+    return bool(connection.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"
+    ), {"table": LOG_TABLE}).scalar())
+
+def list_log_partitions(connection) -> List[str]:
+    return list(connection.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:table) AND c.relkind = 'r' ORDER BY c.relname"
+    ), {"table": LOG_TABLE}).scalars())
+
+def create_default_partition(connection) -> None:
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {LOG_DEFAULT_PARTITION} PARTITION OF {LOG_TABLE} DEFAULT"
+    ))
+
+def has_default_partition(connection) -> bool:
+    return bool(connection.execute(text("SELECT to_regclass(:name)"), {"name": LOG_DEFAULT_PARTITION}).scalar())
+
+def oldest_default_day(connection) -> Optional[date]:
+    """The UTC day of the oldest row in the DEFAULT partition (None if it is empty or missing)"""
+    if not has_default_partition(connection):
+        return None
+    oldest = connection.execute(text(f"SELECT min(created_at) FROM {LOG_DEFAULT_PARTITION}")).scalar()
+    return oldest.astimezone(timezone.utc).date() if oldest else None
+
+def create_log_partition(connection, day: date, lock_timeout: str = "5s") -> bool:
+    """
+    Create the partition for `day`; returns False if it already exists.
+
+    CREATE ... PARTITION OF fails if the DEFAULT partition already holds rows for the
+    day, so those are moved into a new table first, which is then attached.
+    """
+    name = partition_name(day)
+    if connection.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar():
+        return False
+    start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+    end = start + timedelta(days=1)
+    bounds = f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    stranded = has_default_partition(connection) and connection.execute(text(
+        f"SELECT EXISTS (SELECT 1 FROM {LOG_DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end)"
+    ), {"start": start, "end": end}).scalar()
+    if not stranded:
+        connection.execute(text(f"CREATE TABLE {name} PARTITION OF {LOG_TABLE} {bounds}"))
+        return True
+
+    # Locks the DEFAULT partition while its rows move; give up rather than stall inserts
+    connection.execute(text(f"SET LOCAL lock_timeout = '{lock_timeout}'"))
+    connection.execute(text(f"CREATE TABLE {name} (LIKE {LOG_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    moved = connection.execute(text(
+        f"WITH moved AS (DELETE FROM {LOG_DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), {"start": start, "end": end}).rowcount
+    connection.execute(text(f"ALTER TABLE {LOG_TABLE} ATTACH PARTITION {name} {bounds}"))
+    logger.warning(f"Moved {moved} rows from {LOG_DEFAULT_PARTITION} into new partition {name}")
+    return True
+
+def create_log_partitions(connection, days_ahead: int, start: Optional[date] = None) -> List[str]:
+    """
+    Make sure partitions exist from `start` through `days_ahead` days from today (UTC).
+
+    `start` defaults to today, or to the oldest day with rows in the DEFAULT partition
+    if that is earlier (e.g. maintenance was down). Each day is created in its own
+    savepoint, so a day that fails is logged and retried on the next run without
+    holding back the others.
+    """
+    today = datetime.now(timezone.utc).date()
+    if start is None:
+        stranded = oldest_default_day(connection)
+        start = min(stranded, today) if stranded else today
+    day = start
+    created = []
+    while day <= today + timedelta(days=days_ahead):
+        try:
+            with connection.begin_nested():
+                if create_log_partition(connection, day):
+                    created.append(partition_name(day))
+        except Exception as e:
+            logger.error(f"Failed to create webhook log partition {partition_name(day)}: {str(e)}")
+        day += timedelta(days=1)
+    return created
+
+def expired_log_partitions(connection, cutoff: datetime) -> List[str]:
+    """Daily partitions whose whole range is older than `cutoff`"""
+    expired = []
+    for name in list_log_partitions(connection):
+        day = partition_day(name)
+        if day is None:
+            continue
+        end = datetime(day.year, day.month, day.day, tzinfo=timezone.utc) + timedelta(days=1)
+        if end <= cutoff:
+            expired.append(name)
+    return expired
+
+def drop_log_partition(connection, name: str, lock_timeout: str = "5s") -> None:
+    """
+    Detach and drop one partition.
+
+    DETACH briefly needs an exclusive lock on webhook_logs; the lock timeout makes
+    it give up (and retry on the next run) instead of queueing live writes behind it.
+    """
+    connection.execute(text(f"SET LOCAL lock_timeout = '{lock_timeout}'"))
+    connection.execute(text(f"ALTER TABLE {LOG_TABLE} DETACH PARTITION {name}"))
+    connection.execute(text(f"DROP TABLE {name}"))
+
+def init_log_partitions(target, connection, **kwargs) -> None:
+    """after_create hook so create_all() produces an insertable partitioned table"""
+    create_default_partition(connection)
+    create_log_partitions(connection, settings.LOG_PARTITION_PREMAKE_DAYS)
@@ -0,0 +1,163 @@
+"""
+Retention cleanup for delivery logs and payloads.
+
+Expired daily partitions of webhook_logs are dropped whole. Everything else
+(unpartitioned webhook_logs, its default partition, webhook_payloads,
+deliveries, and dead_letters after their own longer retention) is
+deleted in small keyset-ordered chunks on (created_at, key). Each chunk is its
+own short transaction, with a pause between chunks, and a run stops at its time
+budget. The last deleted key is checkpointed in Redis so the next run resumes
+there instead of rescanning index entries of rows it has already deleted.
+"""
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.cache.redis import redis_client
+from app.config import settings
+from app.db import engine
+from app.metrics import incr_counters, set_gauges
+from app.services.partitions import (
+    LOG_DEFAULT_PARTITION,
+    LOG_TABLE,
+    drop_log_partition,
+    expired_log_partitions,
+    is_partitioned,
+)
+
+logger = logging.getLogger(__name__)
+
+RETENTION_CURSOR_KEY = "retention:cursor:{table}"
+PAYLOAD_TABLE = "webhook_payloads"
+DELIVERY_TABLE = "deliveries"
+DEAD_LETTER_TABLE = "dead_letters"
+
+def drop_expired_partitions(cutoff: datetime) -> List[str]:
+    """Detach and drop expired webhook_logs partitions, one short transaction each"""
+    with engine.connect() as connection:
+        expired = expired_log_partitions(connection, cutoff)
+    dropped = []
+    for name in expired:
+        try:
+            with engine.begin() as connection:
+                drop_log_partition(connection, name)
+            dropped.append(name)
+        except Exception as e:
+            logger.warning(f"Could not drop webhook log partition {name}: {str(e)}")
+    return dropped
+
+def _load_cursor(table: str) -> Optional[Tuple[str, str]]:
+    value = redis_client.get(RETENTION_CURSOR_KEY.format(table=table))
+    if not value:
+        return None
+    created_at, key = value.split("|", 1)
+    return created_at, key
+
+def _save_cursor(table: str, cursor: Optional[Tuple[datetime, Any]]) -> None:
+    name = RETENTION_CURSOR_KEY.format(table=table)
+    if cursor is None:
+        redis_client.delete(name)
+    else:
+        redis_client.set(name, f"{cursor[0].isoformat()}|{cursor[1]}")
+
+def delete_chunk(connection, table: str, key: str, cutoff: datetime, after: Optional[Tuple[Any, Any]], limit: int) -> Tuple[int, Optional[Tuple[datetime, Any]]]:
+    """Delete up to `limit` expired rows in (created_at, key) order after `after`; returns (count, last key)"""
+    params = {"cutoff": cutoff, "limit": limit}
+    after_clause = ""
+    if after is not None:
+        after_clause = f"AND (created_at, {key}) > (CAST(:after_created_at AS timestamptz), CAST(:after_key AS uuid))"
+        params.update(after_created_at=after[0], after_key=after[1])
+    rows = connection.execute(text(
+        f"WITH doomed AS ("
+        f"  SELECT created_at, {key} FROM {table}"
+        f"  WHERE created_at < :cutoff {after_clause}"
+        f"  ORDER BY created_at, {key} LIMIT :limit"
+        f") "
+        f"DELETE FROM {table} t USING doomed d "
+        f"WHERE t.created_at = d.created_at AND t.{key} = d.{key} "
+        f"RETURNING t.created_at, t.{key}"
+    ), params).all()
+    if not rows:
+        return 0, None
+    return len(rows), max(rows)
+
+def _retention_lag(cutoff: datetime) -> float:
+    """Seconds between the oldest remaining log row and the retention cutoff (0 when caught up)"""
+    with engine.connect() as connection:
+        oldest = connection.execute(text(f"SELECT min(created_at) FROM {LOG_TABLE}")).scalar()
+    if oldest is None or oldest >= cutoff:
+        return 0.0
+    return (cutoff - oldest).total_seconds()
+
+def cleanup_expired_logs(
+    time_budget: Optional[float] = None,
+    batch_size: Optional[int] = None,
+    pause: Optional[float] = None
+) -> Dict[str, Any]:
+    """Run one time-budgeted retention pass and report its progress as metrics"""
+    time_budget = settings.LOG_CLEANUP_TIME_BUDGET if time_budget is None else time_budget
+    batch_size = batch_size or settings.LOG_CLEANUP_BATCH_SIZE
+    pause = settings.LOG_CLEANUP_PAUSE_MS / 1000 if pause is None else pause
+
+    started = time.monotonic()
+    deadline = started + time_budget
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.LOG_RETENTION_HOURS)
+    dead_letter_cutoff = datetime.now(timezone.utc) - timedelta(days=settings.DEAD_LETTER_RETENTION_DAYS)
+    stats = {"cutoff": cutoff.isoformat(), "rows_deleted": 0, "batches": 0, "partitions_dropped": [], "completed": True}
+
+    with engine.connect() as connection:
+        partitioned = is_partitioned(connection)
+    if partitioned:
+        stats["partitions_dropped"] = drop_expired_partitions(cutoff)
+    log_table = LOG_DEFAULT_PARTITION if partitioned else LOG_TABLE
+
+    tables = (
+        (log_table, "id", cutoff),
+        (PAYLOAD_TABLE, "delivery_id", cutoff),
+        (DELIVERY_TABLE, "delivery_id", cutoff),
+        (DEAD_LETTER_TABLE, "delivery_id", dead_letter_cutoff),
+    )
+    for table, key, table_cutoff in tables:
+        cursor = _load_cursor(table)
+        while True:
+            if time.monotonic() >= deadline:
+                stats["completed"] = False
+                break
+            with engine.begin() as connection:
+                deleted, last = delete_chunk(connection, table, key, table_cutoff, cursor, batch_size)
+            if deleted:
+                stats["rows_deleted"] += deleted
+                stats["batches"] += 1
+                cursor = last
+                _save_cursor(table, cursor)
+            if deleted < batch_size:
+                # Caught up with the cutoff: the next run starts from the beginning
+                _save_cursor(table, None)
+                break
+            # Give live delivery writes room between chunks
+            time.sleep(pause)
+        if not stats["completed"]:
+            break
+
+    stats["lag_seconds"] = _retention_lag(cutoff)
+    stats["duration_seconds"] = round(time.monotonic() - started, 3)
+    try:
+        incr_counters("retention", {
+            "runs": 1,
+            "rows_deleted": stats["rows_deleted"],
+            "batches": stats["batches"],
+            "partitions_dropped": len(stats["partitions_dropped"]),
+        })
+        set_gauges("retention", {
+            "lag_seconds": stats["lag_seconds"],
+            "last_run_at": datetime.now(timezone.utc).isoformat(),
+            "last_run_completed": int(stats["completed"]),
+            "last_run_rows_deleted": stats["rows_deleted"],
+            "last_run_duration_seconds": stats["duration_seconds"],
+        })
+    except Exception as e:
+        logger.warning(f"Failed to report retention metrics: {str(e)}")
+    return stats
@@ -1,3 +1,84 @@
-# All logic shifted to tasks.py
-# sorrry, had some issues with the directory structure initially
-# Details about retry logic given in README.MD -- please verify
\ No newline at end of file
+"""
+Retry policy for failed delivery attempts.
+
+An attempt outcome is classified as retryable (network errors, timeouts, 408,
+425, 429 and 5xx) or terminal (any other non-2xx status: a 400 or 410 will not
+succeed on the next try, so retrying it only wastes attempts). Retryable
+failures wait for the target's Retry-After when it sends one (capped at the
+policy's max_delay), otherwise for a backoff delay:
+
+- "decorrelated" (default): delay = min(max_delay, uniform(base_delay, previous_delay * 3)),
+  which spreads retries of deliveries that failed together without the
+  synchronized waves of plain exponential backoff;
+- "exponential": base_delay * backoff_factor ** (attempt - 1), with RETRY_JITTER.
+
+Each field of a subscription's `retry_policy` overrides the RETRY_* default
+from Settings; unset fields keep the default.
+"""
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+from app.config import settings
+from app.utils import calculate_next_retry_delay
+
+RETRYABLE_STATUS_CODES = (408, 425, 429)
+
+def resolve_retry_policy(subscription_data: Optional[dict]) -> Dict[str, Any]:
+    """The subscription's retry policy with unset fields filled from Settings"""
+    policy = {
+        "max_attempts": settings.MAX_RETRY_ATTEMPTS,
+        "base_delay": settings.INITIAL_RETRY_DELAY,
+        "max_delay": settings.RETRY_MAX_DELAY,
+        "backoff": settings.RETRY_BACKOFF_STRATEGY,
+        "backoff_factor": settings.RETRY_BACKOFF_FACTOR,
+        "honor_retry_after": True,
+        "retryable_status_codes": None,
+    }
+    overrides = (subscription_data or {}).get("retry_policy") or {}
+    policy.update({key: value for key, value in overrides.items() if value is not None and key in policy})
+    return policy
+
+def is_retryable(status_code: Optional[int], policy: Dict[str, Any]) -> bool:
+    """Whether an attempt that ended with `status_code` (None: no response) is worth retrying"""
+    if status_code is None:
+        return True
+    if policy["retryable_status_codes"] is not None:
+        return status_code in policy["retryable_status_codes"]
+    return status_code >= 500 or status_code in RETRYABLE_STATUS_CODES
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date); None if absent or invalid"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+def next_retry_delay(
+    policy: Dict[str, Any],
+    attempt_number: int,
+    previous_delay: Optional[float] = None,
+    retry_after: Optional[float] = None
+) -> float:
+    """Seconds to wait before the attempt after `attempt_number`"""
+    max_delay = policy["max_delay"]
+    if retry_after is not None and policy["honor_retry_after"]:
+        return min(retry_after, max_delay)
+
+    base_delay = policy["base_delay"]
+    if policy["backoff"] == "exponential":
+        delay = calculate_next_retry_delay(
+            attempt_number, base_delay, policy["backoff_factor"], settings.RETRY_JITTER
+        )
+    else:
+        delay = random.uniform(base_delay, max(base_delay, (previous_delay or base_delay) * 3))
+    return min(delay, max_delay)
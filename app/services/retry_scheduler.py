@@ -0,0 +1,68 @@
+"""
+Delayed delivery scheduler backed by a Redis sorted set.
+
+Retries (and limiter deferrals) used to be published with a Celery countdown.
+With the Redis broker such a task is delivered right away and held unacked in
+a worker's memory until its ETA, so long backoffs made workers hoard ETA tasks
+and visibility-timeout redeliveries duplicated them.
+
+Instead, the task kwargs are added to RETRY_SCHEDULE_KEY scored by their due
+time. The pump_due_retries beat task pops due entries atomically (a Lua
+script, so concurrent pumps never publish an entry twice) and publishes them
+in batches as ordinary, immediately runnable tasks. Pending retries cost Redis
+memory only; workers hold nothing until a retry is due.
+
+An entry is deliver_webhook's kwargs, or {"task": name, "kwargs": ...} for
+another task (batched deliveries).
+"""
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from app.cache.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+RETRY_SCHEDULE_KEY = "retry:schedule"
+
+# KEYS: schedule zset; ARGV: now, max entries
+_POP_DUE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+if #due > 0 then
+    redis.call('ZREM', KEYS[1], unpack(due))
+end
+return due
+"""
+
+_pop_due = redis_client.register_script(_POP_DUE_SCRIPT)
+
+def schedule_delivery(task_kwargs: Dict[str, Any], delay: float, task_name: Optional[str] = None) -> None:
+    """Run deliver_webhook (or the task named `task_name`) with these kwargs once `delay` seconds have passed"""
+    entry = {"task": task_name, "kwargs": task_kwargs} if task_name else task_kwargs
+    # sort_keys: a delivery rescheduled with identical kwargs replaces its entry instead of duplicating it
+    redis_client.zadd(RETRY_SCHEDULE_KEY, {json.dumps(entry, sort_keys=True): time.time() + delay})
+
+def pop_due_deliveries(limit: int, now: Optional[float] = None) -> List[str]:
+    """Remove and return up to `limit` due entries (JSON), earliest first"""
+    return _pop_due(keys=[RETRY_SCHEDULE_KEY], args=[now or time.time(), limit])
+
+def reschedule_entries(entries: List[str]) -> None:
+    """Put popped entries back as due now (used when publishing them failed)"""
+    if entries:
+        now = time.time()
+        redis_client.zadd(RETRY_SCHEDULE_KEY, {entry: now for entry in entries})
+
+def get_retry_schedule_stats() -> Dict[str, Any]:
+    """Pending entries, how many are already due, and how far behind the oldest due entry is"""
+    now = time.time()
+    with redis_client.pipeline(transaction=False) as pipe:
+        pipe.zcard(RETRY_SCHEDULE_KEY)
+        pipe.zcount(RETRY_SCHEDULE_KEY, "-inf", now)
+        pipe.zrange(RETRY_SCHEDULE_KEY, 0, 0, withscores=True)
+        pending, due, oldest = pipe.execute()
+    return {
+        "pending": pending,
+        "due": due,
+        "lag_seconds": round(max(0.0, now - oldest[0][1]), 3) if oldest else 0.0,
+    }
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import threading
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import SessionLocal
+from app.models.subscription import Subscription
+from app.cache.redis import on_subscription_invalidated
+
+logger = logging.getLogger(__name__)
+
+class EventRoutingIndex:
+    """
+    In-memory event_type -> subscription IDs index for fan-out ingestion.
+
+    Only active subscriptions are indexed; subscriptions without event_types
+    receive every event. Built once per process and kept current one
+    subscription at a time from the cache invalidation channel. Rebuilds and
+    refreshes each hold `_writing` from their database read until applied, so
+    a rebuild's snapshot never replaces a newer refresh, and an invalidation
+    that arrives mid-rebuild is applied once the rebuild is done.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_event_type: Dict[str, Set[str]] = {}
+        self._wildcard: Set[str] = set()
+        self._event_types: Dict[str, Optional[tuple]] = {}
+        self._rebuilding = threading.Lock()
+        self._writing = threading.Lock()
+        self.loaded = False
+
+    def _remove(self, subscription_id: str) -> None:
+        if subscription_id not in self._event_types:
+            return
+        event_types = self._event_types.pop(subscription_id)
+        if not event_types:
+            self._wildcard.discard(subscription_id)
+            return
+        for event_type in event_types:
+            subscribers = self._by_event_type.get(event_type)
+            if subscribers is not None:
+                subscribers.discard(subscription_id)
+                if not subscribers:
+                    del self._by_event_type[event_type]
+
+    def _add(self, subscription_id: str, event_types: Optional[List[str]]) -> None:
+        event_types = tuple(sorted(set(event_types))) if event_types else None
+        self._event_types[subscription_id] = event_types
+        if not event_types:
+            self._wildcard.add(subscription_id)
+            return
+        for event_type in event_types:
+            self._by_event_type.setdefault(event_type, set()).add(subscription_id)
+
+    def update(self, subscription: Optional[Subscription], subscription_id: str) -> None:
+        """Apply the current state of one subscription (None if it was deleted)"""
+        with self._lock:
+            self._remove(subscription_id)
+            if subscription is not None and subscription.is_active:
+                self._add(subscription_id, subscription.event_types)
+
+    def rebuild(self) -> None:
+        """Load every active subscription from the database"""
+        with self._writing:
+            db = SessionLocal()
+            try:
+                rows = db.execute(
+                    select(Subscription.id, Subscription.event_types).where(Subscription.is_active.is_(True))
+                ).all()
+            finally:
+                db.close()
+            with self._lock:
+                self._by_event_type = {}
+                self._wildcard = set()
+                self._event_types = {}
+                for subscription_id, event_types in rows:
+                    self._add(str(subscription_id), event_types)
+                self.loaded = True
+        logger.info(f"Event routing index built with {len(rows)} active subscriptions")
+
+    def try_rebuild(self) -> None:
+        """Rebuild unless another thread already is; errors leave the index unloaded"""
+        if not self._rebuilding.acquire(blocking=False):
+            return
+        try:
+            self.rebuild()
+        except Exception as e:
+            logger.error(f"Failed to build event routing index: {str(e)}")
+        finally:
+            self._rebuilding.release()
+
+    def refresh(self, subscription_id: str) -> None:
+        """Re-read a single subscription after it was created, updated or deleted (no-op until built)"""
+        with self._writing:
+            if not self.loaded:
+                return
+            db = SessionLocal()
+            try:
+                subscription = db.query(Subscription).filter(Subscription.id == subscription_id).first()
+                self.update(subscription, subscription_id)
+            finally:
+                db.close()
+
+    def unload(self) -> None:
+        """Fall back to cold queries until the next rebuild (after any rebuild in progress)"""
+        with self._writing:
+            self.loaded = False
+
+    def match(self, event_type: str) -> List[str]:
+        with self._lock:
+            return list(self._by_event_type.get(event_type, set()) | self._wildcard)
+
+routing_index = EventRoutingIndex()
+
+def _on_invalidated(subscription_id: Optional[str]) -> None:
+    if subscription_id is None:
+        # Invalidations may have been missed; rebuild lazily on next use
+        routing_index.unload()
+        return
+    try:
+        # Waits for a rebuild in progress, whose snapshot may predate this change
+        routing_index.refresh(subscription_id)
+    except Exception as e:
+        # A stale index is worse than none: fall back to cold queries until the next rebuild
+        logger.error(f"Failed to refresh routing for subscription {subscription_id}: {str(e)}")
+        routing_index.unload()
+
+on_subscription_invalidated(_on_invalidated)
+
+async def match_subscriptions(db: AsyncSession, event_type: str) -> List[str]:
+    """Active subscription IDs interested in event_type"""
+    if routing_index.loaded:
+        return routing_index.match(event_type)
+
+    # Cold path (index not built yet): containment query served by the GIN index
+    result = await db.execute(
+        select(Subscription.id).where(
+            Subscription.is_active.is_(True),
+            or_(
+                Subscription.event_types.contains([event_type]),
+                Subscription.event_types.is_(None),
+            ),
+        )
+    )
+    asyncio.get_running_loop().run_in_executor(None, routing_index.try_rebuild)
+    return [str(subscription_id) for subscription_id in result.scalars().all()]
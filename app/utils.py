@@ -1,38 +1,83 @@
+import base64
 import hmac
 import hashlib
+import json
+import random
 import uuid
-from typing import Optional, Dict, Any
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Union, Tuple
+from urllib.parse import urlsplit
+
+def create_hmac(secret: str):
+    """Create an incremental HMAC-SHA256 object, for payloads that arrive in chunks"""
+    return hmac.new(key=secret.encode('utf-8'), digestmod=hashlib.sha256)
 
 def generate_hmac_signature(payload: bytes, secret: str) -> str:
     """Generate HMAC signature for webhook payload"""
-    return hmac.new(
-        key=secret.encode('utf-8'),
-        msg=payload,
-        digestmod=hashlib.sha256
-    ).hexdigest()
+    mac = create_hmac(secret)
+    mac.update(payload)
+    return mac.hexdigest()
+
+def signatures_match(expected_signature: str, signature: Any) -> bool:
+    """Constant-time comparison; False (rather than TypeError) for non-string or non-ASCII input"""
+    if not isinstance(signature, str) or not signature.isascii():
+        return False
+    return hmac.compare_digest(expected_signature, signature)
 
 def verify_signature(payload: bytes, signature: str, secret: str) -> bool:
     """Verify webhook signature"""
     expected_signature = generate_hmac_signature(payload, secret)
-    return hmac.compare_digest(expected_signature, signature)
+    return signatures_match(expected_signature, signature)
+
+def strip_signature_prefix(signature: str) -> str:
+    """Accept both 'sha256=<hex>' and bare '<hex>' signature header values"""
+    if signature.startswith("sha256="):
+        return signature[7:]
+    return signature
+
+def payload_hash(body: str) -> str:
+    """sha256 hex digest of a raw JSON body"""
+    return hashlib.sha256(body.encode('utf-8')).hexdigest()
+
+def encode_cursor(created_at: datetime, row_id: uuid.UUID) -> str:
+    """Encode a keyset position (created_at, id) as an opaque URL-safe page token"""
+    raw = json.dumps([created_at.isoformat(), str(row_id)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """Decode a page token from encode_cursor; raises ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), uuid.UUID(row_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+def target_host(target_url: str) -> str:
+    """Lower-cased host[:port] of a target URL, used to group deliveries by destination"""
+    return (urlsplit(target_url).netloc or '').lower()
 
 def generate_delivery_id() -> str:
     """Generate a unique delivery ID for tracking webhook delivery attempts"""
     return str(uuid.uuid4())
 
-def should_deliver_to_subscription(event_type: Optional[str], subscription_event_types: Optional[str]) -> bool:
+def should_deliver_to_subscription(event_type: Optional[str], subscription_event_types: Optional[Union[List[str], str]]) -> bool:
     """
     Check if webhook should be delivered to subscription based on event type
     
     Args:
         event_type: The event type of the incoming webhook
-        subscription_event_types: Comma-separated list of event types the subscription is interested in
+        subscription_event_types: Event types the subscription is interested in (a list,
+            or a comma-separated string from older cache entries)
         
     Returns:
         bool: True if webhook should be delivered, False otherwise
     """
+    if isinstance(subscription_event_types, str):
+        subscription_event_types = [t.strip() for t in subscription_event_types.split(',') if t.strip()]
+    
     # If no event type filtering is set up, deliver to all subscriptions
-    if not subscription_event_types or not subscription_event_types.strip():
+    if not subscription_event_types:
         return True
     
     # If webhook has no event type but subscription requires specific types, don't deliver
@@ -40,10 +85,9 @@ def should_deliver_to_subscription(event_type: Optional[str], subscription_event
         return False
     
     # Check if webhook event type matches any of the subscription's event types
-    subscription_types = [t.strip() for t in subscription_event_types.split(',') if t.strip()]
-    return event_type in subscription_types
+    return event_type in subscription_event_types
 
-def calculate_next_retry_delay(attempt: int, base_delay: int, backoff_factor: int) -> int:
+def calculate_next_retry_delay(attempt: int, base_delay: int, backoff_factor: int, jitter: float = 0.0) -> float:
     """
     Calculate delay for next retry attempt using exponential backoff
     
@@ -51,8 +95,13 @@ def calculate_next_retry_delay(attempt: int, base_delay: int, backoff_factor: in
         attempt: Current attempt number (1-based)
         base_delay: Initial delay in seconds
         backoff_factor: Backoff multiplier factor
+        jitter: Fraction of the delay to randomize (0.1 = +/-10%), so deliveries
+            that failed together don't all retry at the same instant
         
     Returns:
-        int: Delay in seconds for the next retry
+        float: Delay in seconds for the next retry
     """
-    return base_delay * (backoff_factor ** (attempt - 1))
\ No newline at end of file
+    delay = base_delay * (backoff_factor ** (attempt - 1))
+    if jitter:
+        delay *= 1 + random.uniform(-jitter, jitter)
+    return delay
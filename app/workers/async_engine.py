@@ -0,0 +1,321 @@
+"""
+Asyncio delivery engine
+
+An alternative to running deliver_webhook in Celery prefork slots. It consumes
+the same task messages from the delivery queue and runs thousands of HTTP
+deliveries concurrently per process, while reusing the task's own steps
+(prepare_delivery, build_delivery_headers, record_*) so retry, logging and
+signing semantics are identical. Database work runs on a small thread pool.
+
+Select it with DELIVERY_ENGINE=asyncio (prefork workers then stop consuming the
+delivery queues) and run:
+
+    python -m app.workers.async_engine
+
+It consumes first attempts and retries; run one engine per pool with
+WORKER_POOL=delivery and WORKER_POOL=retry to keep retries from taking
+first attempts' concurrency.
+"""
+import asyncio
+import inspect
+import logging
+import queue
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, List
+
+import httpx
+from kombu import Connection, Consumer, Queue
+
+from app.celery_app import pool_queues
+from app.config import settings
+from app.db import SessionLocal
+from app.cache.redis import start_invalidation_listener
+from app.metrics import report_process_stats
+from app.services.batching import batch_settings
+from app.services.circuit_breaker import PARK, PROBE, check_circuit, record_circuit_result, release_probe
+from app.services.claim_check import release_body
+from app.services.delivery import create_async_delivery_pool
+from app.services.limiter import acquire_delivery_slot, release_delivery_slot
+from app.services.log_sink import close_log_sink, get_log_sink
+from app.services.retry import parse_retry_after
+from app.workers.tasks import (
+    buffer_for_batch,
+    build_delivery_headers,
+    defer_delivery,
+    deliver_webhook,
+    park_for_open_circuit,
+    prepare_delivery,
+    record_delivery_response,
+    record_failed_attempt,
+    record_unexpected_error,
+    resolve_body,
+    sign_body,
+)
+from app.utils import target_host
+
+logger = logging.getLogger(__name__)
+
+_DELIVER_SIGNATURE = inspect.signature(deliver_webhook.run)
+
+class AsyncDeliveryEngine:
+    def __init__(self, queues: List[str], concurrency: int, db_threads: int, shutdown_timeout: float):
+        self.queues = queues
+        self.concurrency = concurrency
+        self.shutdown_timeout = shutdown_timeout
+        self.http = create_async_delivery_pool(settings.ASYNC_ENGINE_MAX_CONNECTIONS_PER_HOST)
+        self._db_executor = ThreadPoolExecutor(max_workers=db_threads, thread_name_prefix="delivery-db")
+        # Kombu channels are not thread-safe: acks and QoS changes are handed back
+        # to the consumer thread through this queue
+        self._control: "queue.Queue" = queue.Queue()
+        self._stopping = threading.Event()
+        self._in_flight = 0
+        self._held_eta = 0
+        self.delivered = 0
+
+    # Consumer thread
+
+    def _consume(self) -> None:
+        with Connection(settings.CELERY_BROKER_URL) as connection:
+            channel = connection.channel()
+            consumer = Consumer(
+                channel,
+                queues=[Queue(name) for name in self.queues],
+                callbacks=[self._on_message],
+                accept=["json"],
+            )
+            consumer.qos(prefetch_count=self.concurrency)
+            consumer.consume()
+            logger.info(f"Async delivery engine consuming {self.queues} with concurrency {self.concurrency}")
+
+            deadline = None
+            while True:
+                self._process_control(consumer)
+                if self._stopping.is_set():
+                    if deadline is None:
+                        consumer.cancel()
+                        deadline = time.monotonic() + self.shutdown_timeout
+                    if self._in_flight == 0:
+                        break
+                    if time.monotonic() > deadline:
+                        # Unacked messages are restored to the queue when the channel closes
+                        logger.warning(f"Shutdown timeout reached with {self._in_flight} deliveries in flight")
+                        break
+                try:
+                    connection.drain_events(timeout=0.1)
+                except socket.timeout:
+                    pass
+            self._process_control(consumer)
+
+    def _process_control(self, consumer: Consumer) -> None:
+        while True:
+            try:
+                action, message = self._control.get_nowait()
+            except queue.Empty:
+                return
+            if action == "ack":
+                message.ack()
+                self._in_flight -= 1
+            elif action == "reject":
+                message.reject(requeue=False)
+                self._in_flight -= 1
+            elif action == "qos":
+                # Messages waiting for their ETA must not use up delivery capacity
+                consumer.qos(prefetch_count=self.concurrency + self._held_eta)
+
+    def _on_message(self, body: Any, message) -> None:
+        self._in_flight += 1
+        asyncio.run_coroutine_threadsafe(self._handle(body, message), self.loop)
+
+    # Event loop
+
+    async def _handle(self, body: Any, message) -> None:
+        action = "ack"
+        try:
+            task_name = message.headers.get("task")
+            if task_name != deliver_webhook.name:
+                logger.error(f"Async delivery engine cannot run task {task_name}, dropping it")
+                action = "reject"
+                return
+
+            # Celery message protocol v2: [args, kwargs, embed]
+            args, kwargs = body[0], body[1]
+            bound = _DELIVER_SIGNATURE.bind(*args, **kwargs)
+            bound.apply_defaults()
+
+            eta = message.headers.get("eta")
+            if eta:
+                await self._wait_for_eta(eta)
+
+            await self._deliver(**bound.arguments)
+        except Exception as e:
+            logger.exception(f"Async delivery engine failed to handle message: {str(e)}")
+        finally:
+            self._control.put((action, message))
+
+    async def _wait_for_eta(self, eta: str) -> None:
+        delay = (datetime.fromisoformat(eta) - datetime.now(timezone.utc)).total_seconds()
+        if delay <= 0:
+            return
+        self._held_eta += 1
+        self._control.put(("qos", None))
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self._held_eta -= 1
+            self._control.put(("qos", None))
+
+    async def _in_db(self, func, *args):
+        def run():
+            db = SessionLocal()
+            try:
+                return func(db, *args)
+            finally:
+                db.close()
+        return await self.loop.run_in_executor(self._db_executor, run)
+
+    async def _deliver(
+        self,
+        delivery_id: str,
+        subscription_id: str,
+        payload: dict = None,
+        attempt_number: int = 1,
+        event_type: str = None,
+        body: str = None,
+        signature: str = None,
+        body_ref: str = None,
+        retry_delay: float = None
+    ) -> None:
+        """Same flow as the deliver_webhook task, with a non-blocking HTTP request"""
+        logger.info(f"Delivering webhook {delivery_id} to subscription {subscription_id}, attempt {attempt_number}")
+        subscription_data = None
+        retrying = False
+        try:
+            body = await self._in_db(resolve_body, delivery_id, payload, body, body_ref)
+            subscription_data = await self._in_db(
+                prepare_delivery, delivery_id, subscription_id, body, attempt_number, event_type
+            )
+            if not subscription_data:
+                return
+
+            # Batches are sent by the deliver_webhook_batch task on the default queue (retries included, see route_delivery)
+            batching = batch_settings(subscription_data)
+            if batching and attempt_number == 1 and await self.loop.run_in_executor(
+                self._db_executor, buffer_for_batch, delivery_id, subscription_id,
+                event_type, body, body_ref, *batching
+            ):
+                retrying = True
+                return
+
+            signature = signature or sign_body(subscription_data, body)
+
+            host = target_host(subscription_data["target_url"])
+            circuit = await self.loop.run_in_executor(self._db_executor, check_circuit, host)
+            if circuit == PARK:
+                retrying = await self.loop.run_in_executor(
+                    self._db_executor, park_for_open_circuit, host, delivery_id, subscription_id,
+                    attempt_number, event_type, body, signature, body_ref, retry_delay
+                )
+                return
+
+            lease, wait = await self.loop.run_in_executor(
+                self._db_executor, acquire_delivery_slot, subscription_data
+            )
+            if wait:
+                if circuit == PROBE:
+                    await self.loop.run_in_executor(self._db_executor, release_probe, host)
+                retrying = await self.loop.run_in_executor(
+                    self._db_executor, defer_delivery, delivery_id, subscription_id,
+                    attempt_number, event_type, body, signature, body_ref, wait, retry_delay
+                )
+                return
+            try:
+                response = await self.http.post(
+                    subscription_data["target_url"],
+                    content=body.encode("utf-8"),
+                    headers=build_delivery_headers(delivery_id, signature, event_type)
+                )
+            except httpx.RequestError:
+                await self.loop.run_in_executor(self._db_executor, record_circuit_result, host, None)
+                raise
+            finally:
+                await self.loop.run_in_executor(
+                    self._db_executor, release_delivery_slot, subscription_data, lease
+                )
+            await self.loop.run_in_executor(
+                self._db_executor, record_circuit_result, host, response.status_code
+            )
+
+            retrying = await self._in_db(
+                record_delivery_response, delivery_id, subscription_id, subscription_data, body,
+                attempt_number, event_type, response.status_code, signature, body_ref,
+                parse_retry_after(response.headers.get("Retry-After")), retry_delay
+            )
+        except httpx.RequestError as e:
+            retrying = await self._in_db(
+                record_failed_attempt, delivery_id, subscription_id, subscription_data, body,
+                attempt_number, event_type, None, f"Request error: {str(e)}", signature, body_ref,
+                None, retry_delay
+            )
+        except Exception as e:
+            await self._in_db(
+                record_unexpected_error, delivery_id, subscription_id, subscription_data, body,
+                attempt_number, event_type, e
+            )
+        finally:
+            self.delivered += 1
+            if body_ref and not retrying:
+                await self.loop.run_in_executor(self._db_executor, release_body, body_ref)
+
+    async def _report_stats(self) -> None:
+        while not self._stopping.is_set():
+            stats = self.http.stats()
+            stats.update(engine="asyncio", in_flight=self._in_flight, held_eta=self._held_eta, handled=self.delivered)
+            try:
+                report_process_stats("delivery_pool", stats, force=True)
+                report_process_stats("log_sink", get_log_sink().stats(), force=True)
+            except Exception as e:
+                logger.warning(f"Failed to report engine stats: {str(e)}")
+            await asyncio.sleep(10)
+
+    def stop(self) -> None:
+        logger.info("Async delivery engine stopping, waiting for in-flight deliveries")
+        self._stopping.set()
+
+    async def run(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            self.loop.add_signal_handler(sig, self.stop)
+
+        start_invalidation_listener()
+        get_log_sink()
+        reporter = asyncio.ensure_future(self._report_stats())
+        try:
+            # Returns once stopping and in-flight deliveries are done (or timed out)
+            await self.loop.run_in_executor(None, self._consume)
+        finally:
+            self._stopping.set()
+            reporter.cancel()
+            await self.http.aclose()
+            # Let pending DB work finish so its log rows make it into the final flush
+            await self.loop.run_in_executor(None, self._db_executor.shutdown)
+            close_log_sink()
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    if settings.DELIVERY_ENGINE != "asyncio":
+        logger.warning("DELIVERY_ENGINE is not 'asyncio'; prefork workers will also consume the delivery queue")
+    engine = AsyncDeliveryEngine(
+        queues=pool_queues(),
+        concurrency=settings.ASYNC_ENGINE_CONCURRENCY,
+        db_threads=settings.ASYNC_ENGINE_DB_THREADS,
+        shutdown_timeout=settings.ASYNC_ENGINE_SHUTDOWN_TIMEOUT,
+    )
+    asyncio.run(engine.run())
+
+if __name__ == "__main__":
+    main()
@@ -1,247 +1,1147 @@
 import json
 import httpx
 import logging
+import random
+import time
+from typing import Optional
+import uuid
 from uuid import UUID
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from celery.concurrency import get_implementation
+from celery.concurrency.prefork import TaskPool as PreforkPool
+from celery.signals import task_postrun, worker_init, worker_process_init, worker_process_shutdown, worker_shutdown
 from celery.utils.log import get_task_logger
 from sqlalchemy.orm import Session
 
 from app.celery_app import celery_app
-from app.db import SessionLocal
+from app.db import SessionLocal, engine
 from app.config import settings
 from app.models.webhook_log import WebhookLog
-from app.models.subscription import Subscription
-from app.cache.redis import get_cached_subscription, cache_subscription
-from app.utils import calculate_next_retry_delay, should_deliver_to_subscription
+from app.cache.redis import start_invalidation_listener
+from app.cache.subscriptions import get_subscription
+from app.metrics import incr_counters, report_process_stats
+from app.services.batching import (
+    BATCH_FULL,
+    BATCH_MAX_EVENTS_LIMIT,
+    WINDOW_OPENED,
+    append_to_batch,
+    batch_settings,
+    build_batch_body,
+    pop_batch,
+    remove_from_batch,
+)
+from app.services.circuit_breaker import (
+    PARK,
+    PROBE,
+    check_circuit,
+    drain_budget,
+    forget_parked_host,
+    park_delivery,
+    parked_hosts,
+    pop_expired_parked_deliveries,
+    pop_parked_deliveries,
+    record_circuit_result,
+    release_probe,
+    return_parked_deliveries,
+)
+from app.services.claim_check import load_body, release_body, should_claim_check, store_bodies
+from app.services.dead_letters import claim_replay_batch, parse_status_filter, unclaim_replays
+from app.services.delivery import close_delivery_pool, get_delivery_pool
+from app.services.lanes import (
+    active_lanes,
+    delivery_queue_depth,
+    enqueue_deliveries,
+    next_lane_offset,
+    pop_lane,
+    return_to_lane,
+)
+from app.services.limiter import acquire_delivery_slot, release_delivery_slot
+from app.services.log_sink import close_log_sink, get_log_sink
+from app.services.partitions import create_log_partitions, is_partitioned
+from app.services.retention import cleanup_expired_logs
+from app.services.retry import is_retryable, next_retry_delay, parse_retry_after, resolve_retry_policy
+from app.services.retry_scheduler import pop_due_deliveries, reschedule_entries, schedule_delivery
+from app.utils import generate_hmac_signature, should_deliver_to_subscription, target_host
 
 # Set up logging
 logger = get_task_logger(__name__)
 
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    """Per-process setup for each (forked) worker process"""
+    start_invalidation_listener()
+    get_delivery_pool()
+    get_log_sink()
+
+@worker_process_shutdown.connect
+def shutdown_worker_process(**kwargs):
+    close_delivery_pool()
+    # Buffered log rows must reach the database before the process exits
+    close_log_sink()
+
+def _runs_tasks_in_process(worker) -> bool:
+    """True for pools that run tasks in the worker process itself (solo, threads, gevent, eventlet)"""
+    return not issubclass(get_implementation(worker.pool_cls), PreforkPool)
+
+@worker_init.connect
+def init_worker(sender=None, **kwargs):
+    # worker_process_init only fires in prefork children
+    if sender is not None and _runs_tasks_in_process(sender):
+        init_worker_process()
+
+@worker_shutdown.connect
+def shutdown_worker(sender=None, **kwargs):
+    if sender is not None and _runs_tasks_in_process(sender):
+        shutdown_worker_process()
+
+@task_postrun.connect
+def report_worker_stats(**kwargs):
+    try:
+        report_process_stats("delivery_pool", get_delivery_pool().stats())
+        report_process_stats("log_sink", get_log_sink().stats())
+    except Exception as e:
+        logger.warning(f"Failed to report worker stats: {str(e)}")
+
 @celery_app.task(bind=True, max_retries=None)
 def deliver_webhook(
     self,
     delivery_id: str,
     subscription_id: str,
-    payload: dict,
+    payload: dict = None,
     attempt_number: int = 1,
-    event_type: str = None
+    event_type: str = None,
+    body: str = None,
+    signature: str = None,
+    body_ref: str = None,
+    retry_delay: float = None
 ):
     """
     Attempt to deliver a webhook to the target URL
     
-    This task will retry itself with exponential backoff if delivery fails,
-    up to the configured maximum retry attempts.
+    `body` is the raw JSON body as received at ingest and is posted byte for byte;
+    large bodies are claim-checked in Redis and passed as `body_ref` instead.
+    `payload` is only used by tasks queued before raw bodies were carried.
+    `signature` is computed on the first attempt and reused by retries.
+    `retry_delay` is the delay before this attempt, the input to decorrelated backoff.
+    
+    Retryable failures are retried according to the subscription's retry policy
+    (app/services/retry.py); terminal responses such as 400 or 410 are not retried.
     """
     logger.info(f"Delivering webhook {delivery_id} to subscription {subscription_id}, attempt {attempt_number}")
     
     db = SessionLocal()
+    subscription_data = None
+    retrying = False
     
     try:
-        # Get subscription info (first from cache, then from DB)
-        subscription_data = get_cached_subscription(subscription_id)
-        
+        body = resolve_body(db, delivery_id, payload, body, body_ref)
+        subscription_data = prepare_delivery(
+            db, delivery_id, subscription_id, body, attempt_number, event_type
+        )
         if not subscription_data:
-            # Cache miss, fetch from DB
-            subscription = db.query(Subscription).filter(Subscription.id == subscription_id).first()
-            if not subscription:
-                logger.error(f"Subscription {subscription_id} not found")
-                log_delivery_result(
-                    db, delivery_id, subscription_id, None, 
-                    payload, attempt_number, None, "FAILURE", 
-                    "Subscription not found", event_type
-                )
-                return
-            
-            subscription_data = {
-                "id": str(subscription.id),
-                "target_url": subscription.target_url,
-                "secret_key": subscription.secret_key,
-                "event_types": subscription.event_types,
-                "is_active": subscription.is_active
-            }
-            
-            # Cache subscription data for future use
-            cache_subscription(str(subscription.id), subscription_data)
+            return
         
-        # Check if subscription is active
-        if not subscription_data["is_active"]:
-            logger.info(f"Subscription {subscription_id} is inactive, skipping delivery")
-            log_delivery_result(
-                db, delivery_id, subscription_id, subscription_data["target_url"], 
-                payload, attempt_number, None, "FAILURE", 
-                "Subscription is inactive", event_type
-            )
+        # Micro-batching subscriptions: first attempts are buffered and sent by deliver_webhook_batch
+        batching = batch_settings(subscription_data)
+        if batching and attempt_number == 1 and buffer_for_batch(
+            delivery_id, subscription_id, event_type, body, body_ref, *batching
+        ):
+            retrying = True
             return
         
-        # Check if this webhook should be delivered based on event type
-        if not should_deliver_to_subscription(event_type, subscription_data.get("event_types")):
-            logger.info(f"Webhook event type {event_type} doesn't match subscription {subscription_id} event types")
-            log_delivery_result(
-                db, delivery_id, subscription_id, subscription_data["target_url"], 
-                payload, attempt_number, None, "FAILURE", 
-                f"Event type {event_type} doesn't match subscription filters", event_type
+        signature = signature or sign_body(subscription_data, body)
+        
+        # Circuit breaker: while the target is known to be down, park without an attempt
+        host = target_host(subscription_data["target_url"])
+        circuit = check_circuit(host)
+        if circuit == PARK:
+            retrying = park_for_open_circuit(
+                host, delivery_id, subscription_id, attempt_number, event_type, body, signature, body_ref,
+                retry_delay
             )
             return
-            
-        # Attempt delivery
-        headers = {
-            "Content-Type": "application/json",
-            "User-Agent": "Webhook-Delivery-Service/1.0",
-            "X-Webhook-ID": delivery_id,
-        }
-        
-        # Add signature header if secret key is available
-        if subscription_data.get("secret_key"):
-            payload_bytes = json.dumps(payload).encode('utf-8')
-            from app.utils import generate_hmac_signature
-            signature = generate_hmac_signature(payload_bytes, subscription_data["secret_key"])
-            headers["X-Hub-Signature-256"] = f"sha256={signature}"
         
-        # Add event type header if available
-        if event_type:
-            headers["X-Webhook-Event"] = event_type
+        # Per-destination concurrency and rate limits: over the limit, defer (not an attempt)
+        lease, wait = acquire_delivery_slot(subscription_data)
+        if wait:
+            if circuit == PROBE:
+                release_probe(host)
+            retrying = defer_delivery(
+                delivery_id, subscription_id, attempt_number, event_type, body, signature, body_ref, wait,
+                retry_delay
+            )
+            return
         
-        # Make the HTTP request
-        with httpx.Client(timeout=settings.WEBHOOK_TIMEOUT) as client:
-            response = client.post(
+        try:
+            # Make the HTTP request (pooled keep-alive connection per target host)
+            response = get_delivery_pool().post(
                 subscription_data["target_url"],
-                json=payload,
-                headers=headers
+                content=body.encode('utf-8'),
+                headers=build_delivery_headers(delivery_id, signature, event_type)
             )
-            
-            # Check if request was successful (2xx status code)
-            if 200 <= response.status_code < 300:
-                logger.info(f"Successfully delivered webhook {delivery_id} to {subscription_data['target_url']}")
-                log_delivery_result(
-                    db, delivery_id, subscription_id, subscription_data["target_url"], 
-                    payload, attempt_number, response.status_code, "SUCCESS", 
-                    None, event_type
-                )
-                return
-            
-            # Non-2xx response
-            error_message = f"Target returned status code: {response.status_code}"
-            logger.warning(f"Failed to deliver webhook {delivery_id}: {error_message}")
-            
-            # Determine if we should retry
-            if attempt_number < settings.MAX_RETRY_ATTEMPTS:
-                log_delivery_result(
-                    db, delivery_id, subscription_id, subscription_data["target_url"], 
-                    payload, attempt_number, response.status_code, "FAILED_ATTEMPT", 
-                    error_message, event_type
-                )
-                
-                # Schedule retry with exponential backoff
-                next_attempt = attempt_number + 1
-                delay = calculate_next_retry_delay(
-                    attempt_number,
-                    settings.INITIAL_RETRY_DELAY,
-                    settings.RETRY_BACKOFF_FACTOR
-                )
-                
-                logger.info(f"Scheduling retry {next_attempt} for webhook {delivery_id} in {delay} seconds")
-                deliver_webhook.apply_async(
-                    args=[delivery_id, subscription_id, payload, next_attempt, event_type],
-                    countdown=delay
-                )
-            else:
-                # Max retries reached
-                logger.error(f"Maximum retry attempts reached for webhook {delivery_id}")
-                log_delivery_result(
-                    db, delivery_id, subscription_id, subscription_data["target_url"], 
-                    payload, attempt_number, response.status_code, "FAILURE", 
-                    f"Maximum retry attempts reached. Last error: {error_message}", event_type
-                )
+        except httpx.RequestError:
+            record_circuit_result(host, None)
+            raise
+        finally:
+            release_delivery_slot(subscription_data, lease)
+        record_circuit_result(host, response.status_code)
+        
+        retrying = record_delivery_response(
+            db, delivery_id, subscription_id, subscription_data, body,
+            attempt_number, event_type, response.status_code, signature, body_ref,
+            parse_retry_after(response.headers.get("Retry-After")), retry_delay
+        )
                 
     except httpx.RequestError as e:
         # Network-related error
-        error_message = f"Request error: {str(e)}"
-        logger.warning(f"Failed to deliver webhook {delivery_id}: {error_message}")
-        
-        if attempt_number < settings.MAX_RETRY_ATTEMPTS:
-            log_delivery_result(
-                db, delivery_id, subscription_id, subscription_data["target_url"], 
-                payload, attempt_number, None, "FAILED_ATTEMPT", 
-                error_message, event_type
-            )
-            
-            # Schedule retry with exponential backoff
-            next_attempt = attempt_number + 1
-            delay = calculate_next_retry_delay(
-                attempt_number,
-                settings.INITIAL_RETRY_DELAY,
-                settings.RETRY_BACKOFF_FACTOR
-            )
-            
-            logger.info(f"Scheduling retry {next_attempt} for webhook {delivery_id} in {delay} seconds")
-            deliver_webhook.apply_async(
-                args=[delivery_id, subscription_id, payload, next_attempt, event_type],
-                countdown=delay
-            )
-        else:
-            # Max retries reached
-            logger.error(f"Maximum retry attempts reached for webhook {delivery_id}")
-            log_delivery_result(
-                db, delivery_id, subscription_id, subscription_data["target_url"], 
-                payload, attempt_number, None, "FAILURE", 
-                f"Maximum retry attempts reached. Last error: {error_message}", event_type
-            )
+        retrying = record_failed_attempt(
+            db, delivery_id, subscription_id, subscription_data, body,
+            attempt_number, event_type, None, f"Request error: {str(e)}", signature, body_ref,
+            None, retry_delay
+        )
             
     except Exception as e:
-        # Unexpected error
-        error_message = f"Unexpected error: {str(e)}"
-        logger.error(f"Error delivering webhook {delivery_id}: {error_message}")
-        log_delivery_result(
-            db, delivery_id, subscription_id, subscription_data["target_url"], 
-            payload, attempt_number, None, "FAILURE", 
-            error_message, event_type
+        record_unexpected_error(
+            db, delivery_id, subscription_id, subscription_data, body,
+            attempt_number, event_type, e
         )
     finally:
         db.close()
+        # Terminal state reached: the claim-checked body is no longer needed
+        if body_ref and not retrying:
+            release_body(body_ref)
+
+# The steps below are shared by the Celery task above and the asyncio delivery
+# engine (app/workers/async_engine.py), so both keep identical semantics.
+
+def resolve_body(
+    db: Session,
+    delivery_id: str,
+    payload: Optional[dict],
+    body: Optional[str],
+    body_ref: Optional[str]
+) -> Optional[str]:
+    """The raw JSON body to deliver, or None if a claim-checked body has expired"""
+    if body is not None:
+        return body
+    if body_ref is not None:
+        return load_body(db, delivery_id, body_ref)
+    # Serialized here only for tasks queued with a dict payload
+    return json.dumps(payload)
+
+def prepare_delivery(
+    db: Session,
+    delivery_id: str,
+    subscription_id: str,
+    body: Optional[str],
+    attempt_number: int,
+    event_type: str = None
+) -> Optional[dict]:
+    """
+    Resolve the subscription and check it should receive this webhook.
+    
+    Returns the subscription data, or None if the delivery ended here (already logged).
+    """
+    # Get subscription info (in-process cache, then Redis, then DB)
+    subscription_data = get_subscription(db, subscription_id)
+    
+    if not subscription_data:
+        logger.error(f"Subscription {subscription_id} not found")
+        log_delivery_result(
+            db, delivery_id, subscription_id, "", 
+            body, attempt_number, None, "FAILURE", 
+            "Subscription not found", event_type
+        )
+        return None
+    
+    if body is None:
+        logger.error(f"Body for webhook {delivery_id} is no longer available")
+        log_delivery_result(
+            db, delivery_id, subscription_id, subscription_data["target_url"], 
+            body, attempt_number, None, "FAILURE", 
+            "Payload no longer available", event_type
+        )
+        return None
+    
+    # Check if subscription is active
+    if not subscription_data["is_active"]:
+        logger.info(f"Subscription {subscription_id} is inactive, skipping delivery")
+        log_delivery_result(
+            db, delivery_id, subscription_id, subscription_data["target_url"], 
+            body, attempt_number, None, "FAILURE", 
+            "Subscription is inactive", event_type
+        )
+        return None
+    
+    # Check if this webhook should be delivered based on event type
+    if not should_deliver_to_subscription(event_type, subscription_data.get("event_types")):
+        logger.info(f"Webhook event type {event_type} doesn't match subscription {subscription_id} event types")
+        log_delivery_result(
+            db, delivery_id, subscription_id, subscription_data["target_url"], 
+            body, attempt_number, None, "FAILURE", 
+            f"Event type {event_type} doesn't match subscription filters", event_type
+        )
+        return None
+    
+    return subscription_data
+
+def sign_body(subscription_data: dict, body: str) -> Optional[str]:
+    """HMAC-SHA256 of the exact bytes that will be sent, or None without a secret key"""
+    if not subscription_data.get("secret_key"):
+        return None
+    return generate_hmac_signature(body.encode('utf-8'), subscription_data["secret_key"])
+
+def build_delivery_headers(delivery_id: str, signature: Optional[str], event_type: str = None) -> dict:
+    headers = {
+        "Content-Type": "application/json",
+        "User-Agent": "Webhook-Delivery-Service/1.0",
+        "X-Webhook-ID": delivery_id,
+    }
+    
+    # Add signature header if the subscription has a secret key
+    if signature:
+        headers["X-Hub-Signature-256"] = f"sha256={signature}"
+    
+    # Add event type header if available
+    if event_type:
+        headers["X-Webhook-Event"] = event_type
+    
+    return headers
+
+def record_delivery_response(
+    db: Session,
+    delivery_id: str,
+    subscription_id: str,
+    subscription_data: dict,
+    body: str,
+    attempt_number: int,
+    event_type: str,
+    status_code: int,
+    signature: Optional[str] = None,
+    body_ref: Optional[str] = None,
+    retry_after: Optional[float] = None,
+    retry_delay: Optional[float] = None
+) -> bool:
+    """Log the outcome of an attempt that got an HTTP response, retrying retryable non-2xx; returns True if a retry was scheduled"""
+    # Check if request was successful (2xx status code)
+    if 200 <= status_code < 300:
+        logger.info(f"Successfully delivered webhook {delivery_id} to {subscription_data['target_url']}")
+        log_delivery_result(
+            db, delivery_id, subscription_id, subscription_data["target_url"], 
+            body, attempt_number, status_code, "SUCCESS", 
+            None, event_type
+        )
+        return False
+    
+    # Non-2xx response
+    return record_failed_attempt(
+        db, delivery_id, subscription_id, subscription_data, body,
+        attempt_number, event_type, status_code, f"Target returned status code: {status_code}", signature, body_ref,
+        retry_after, retry_delay
+    )
+
+def record_failed_attempt(
+    db: Session,
+    delivery_id: str,
+    subscription_id: str,
+    subscription_data: dict,
+    body: str,
+    attempt_number: int,
+    event_type: str,
+    status_code: Optional[int],
+    error_message: str,
+    signature: Optional[str] = None,
+    body_ref: Optional[str] = None,
+    retry_after: Optional[float] = None,
+    retry_delay: Optional[float] = None
+) -> bool:
+    """
+    Log a failed attempt and schedule a retry if the subscription's retry policy allows one.
+    
+    Terminal failures (e.g. 400, 410) and the last allowed attempt are logged as FAILURE.
+    Returns True if a retry was scheduled.
+    """
+    logger.warning(f"Failed to deliver webhook {delivery_id}: {error_message}")
+    policy = resolve_retry_policy(subscription_data)
+    
+    if not is_retryable(status_code, policy):
+        logger.info(f"Not retrying webhook {delivery_id}: status {status_code} is not retryable")
+        log_delivery_result(
+            db, delivery_id, subscription_id, subscription_data["target_url"], 
+            body, attempt_number, status_code, "FAILURE", 
+            f"Not retryable. {error_message}", event_type
+        )
+        try:
+            incr_counters("retry_policy", {"terminal": 1})
+        except Exception as e:
+            logger.warning(f"Failed to count terminal failure: {str(e)}")
+        return False
+    
+    # Determine if we should retry
+    if attempt_number < policy["max_attempts"]:
+        # Retry-After if the target sent one, otherwise the policy's backoff
+        next_attempt = attempt_number + 1
+        delay = next_retry_delay(policy, attempt_number, retry_delay, retry_after)
+        
+        log_delivery_result(
+            db, delivery_id, subscription_id, subscription_data["target_url"], 
+            body, attempt_number, status_code, "FAILED_ATTEMPT", 
+            error_message, event_type,
+            next_retry_at=datetime.now(timezone.utc) + timedelta(seconds=delay)
+        )
+        
+        logger.info(f"Scheduling retry {next_attempt} for webhook {delivery_id} in {delay:.1f} seconds")
+        requeue_delivery(
+            delivery_id, subscription_id, next_attempt, event_type, body, signature, body_ref, delay,
+            retry_delay=delay
+        )
+        return True
+    else:
+        # Max retries reached
+        logger.error(f"Maximum retry attempts reached for webhook {delivery_id}")
+        log_delivery_result(
+            db, delivery_id, subscription_id, subscription_data["target_url"], 
+            body, attempt_number, status_code, "FAILURE", 
+            f"Maximum retry attempts reached. Last error: {error_message}", event_type
+        )
+        return False
+
+def defer_delivery(
+    delivery_id: str,
+    subscription_id: str,
+    attempt_number: int,
+    event_type: str,
+    body: str,
+    signature: Optional[str],
+    body_ref: Optional[str],
+    wait: float,
+    retry_delay: Optional[float] = None
+) -> bool:
+    """Put a delivery refused by the destination limiter back for later; the attempt number is unchanged"""
+    # Jitter so deliveries deferred together don't all come back at the same instant
+    delay = wait * (1 + random.random() * 0.5)
+    logger.info(f"Destination limit reached for webhook {delivery_id}, deferring {delay:.2f}s")
+    requeue_delivery(
+        delivery_id, subscription_id, attempt_number, event_type, body, signature, body_ref, delay,
+        retry_delay=retry_delay
+    )
+    try:
+        incr_counters("limiter", {"deferred": 1})
+    except Exception as e:
+        logger.warning(f"Failed to count deferred delivery: {str(e)}")
+    return True
+
+def park_for_open_circuit(
+    host: str,
+    delivery_id: str,
+    subscription_id: str,
+    attempt_number: int,
+    event_type: str,
+    body: str,
+    signature: Optional[str],
+    body_ref: Optional[str],
+    retry_delay: Optional[float] = None
+) -> bool:
+    """Park a delivery to a host whose circuit is open; released by drain_parked_deliveries"""
+    logger.info(f"Circuit open for {host}, parking webhook {delivery_id}")
+    park_delivery(host, delivery_task_kwargs(
+        delivery_id, subscription_id, attempt_number, event_type, body, signature, body_ref, retry_delay
+    ))
+    try:
+        incr_counters("circuit_breaker", {"parked": 1})
+    except Exception as e:
+        logger.warning(f"Failed to count parked delivery: {str(e)}")
+    return True
+
+def requeue_delivery(
+    delivery_id: str,
+    subscription_id: str,
+    attempt_number: int,
+    event_type: str,
+    body: str,
+    signature: Optional[str],
+    body_ref: Optional[str],
+    delay: float,
+    retry_delay: Optional[float] = None
+):
+    """Run deliver_webhook for this delivery again after `delay` seconds"""
+    # Held in the Redis retry schedule (not as a countdown task in some worker's memory)
+    # until pump_due_retries publishes it
+    schedule_delivery(
+        delivery_task_kwargs(
+            delivery_id, subscription_id, attempt_number, event_type, body, signature, body_ref, retry_delay
+        ),
+        delay
+    )
+
+def delivery_task_kwargs(
+    delivery_id: str,
+    subscription_id: str,
+    attempt_number: int,
+    event_type: str,
+    body: str,
+    signature: Optional[str],
+    body_ref: Optional[str],
+    retry_delay: Optional[float] = None
+) -> dict:
+    return dict(
+        delivery_id=delivery_id,
+        subscription_id=subscription_id,
+        attempt_number=attempt_number,
+        event_type=event_type,
+        # Claim-checked bodies stay in Redis; only the reference is re-sent
+        body=None if body_ref else body,
+        signature=signature,
+        body_ref=body_ref,
+        retry_delay=retry_delay
+    )
+
+def buffer_for_batch(
+    delivery_id: str,
+    subscription_id: str,
+    event_type: str,
+    body: str,
+    body_ref: Optional[str],
+    max_events: int,
+    window_ms: int
+) -> bool:
+    """
+    Add a first attempt to its subscription's batch buffer; returns False if it must be delivered alone.
+    
+    The delivery that opens a window schedules a flush after `window_ms`, the one that fills
+    the batch flushes right away.
+    """
+    window_id = str(uuid.uuid4())
+    item = dict(
+        delivery_id=delivery_id,
+        event_type=event_type,
+        body=None if body_ref else body,
+        body_ref=body_ref
+    )
+    try:
+        outcome = append_to_batch(subscription_id, item, max_events, window_id)
+    except Exception as e:
+        logger.warning(f"Batch buffer unavailable, delivering webhook {delivery_id} alone: {str(e)}")
+        return False
+    
+    try:
+        if outcome == BATCH_FULL:
+            schedule_batch_flush(subscription_id)
+        elif outcome == WINDOW_OPENED:
+            schedule_batch_flush(subscription_id, window_id, window_ms / 1000)
+    except Exception as e:
+        # Without a scheduled flush the item could wait for the buffer to fill; take it back out
+        logger.warning(f"Failed to schedule batch flush, delivering webhook {delivery_id} alone: {str(e)}")
+        try:
+            if remove_from_batch(subscription_id, item, window_id if outcome == WINDOW_OPENED else None):
+                return False
+        except Exception as remove_error:
+            logger.error(f"Failed to take webhook {delivery_id} back out of its batch buffer: {str(remove_error)}")
+        # Already taken by a flush (or stranded until the next delivery opens a window)
+        return True
+    try:
+        incr_counters("batching", {"buffered": 1})
+    except Exception as e:
+        logger.warning(f"Failed to count buffered delivery: {str(e)}")
+    return True
+
+def schedule_batch_flush(subscription_id: str, window_id: Optional[str] = None, delay: float = 0):
+    """Run deliver_webhook_batch on the subscription's buffer now, or when window `window_id` closes"""
+    task_kwargs = dict(subscription_id=subscription_id, window_id=window_id)
+    if delay <= 0:
+        deliver_webhook_batch.apply_async(kwargs=task_kwargs)
+    else:
+        # A countdown (not the retry schedule): windows are milliseconds, shorter than a pump interval
+        deliver_webhook_batch.apply_async(kwargs=task_kwargs, countdown=delay)
+
+def record_unexpected_error(
+    db: Session,
+    delivery_id: str,
+    subscription_id: str,
+    subscription_data: Optional[dict],
+    body: str,
+    attempt_number: int,
+    event_type: str,
+    error: Exception
+):
+    # Unexpected error
+    error_message = f"Unexpected error: {str(error)}"
+    logger.error(f"Error delivering webhook {delivery_id}: {error_message}")
+    db.rollback()
+    log_delivery_result(
+        db, delivery_id, subscription_id, subscription_data["target_url"] if subscription_data else "", 
+        body, attempt_number, None, "FAILURE", 
+        error_message, event_type
+    )
 
 def log_delivery_result(
     db: Session,
     delivery_id: str,
     subscription_id: str,
     target_url: str,
-    payload: dict,
+    body: Optional[str],
     attempt_number: int,
     status_code: int = None,
     status: str = "FAILED_ATTEMPT",
     error_details: str = None,
-    event_type: str = None
+    event_type: str = None,
+    next_retry_at: Optional[datetime] = None
 ):
-    """Log the result of a webhook delivery attempt"""
-    log_entry = WebhookLog(
+    """Log the result of a webhook delivery attempt (and update the delivery's state row)"""
+    get_log_sink().write(db, dict(
+        id=uuid.uuid4(),
         delivery_id=delivery_id,
         subscription_id=subscription_id,
         target_url=target_url,
         event_type=event_type,
-        payload=payload,
+        body=body,
         attempt_number=attempt_number,
         status_code=status_code,
         status=status,
-        error_details=error_details
-    )
-    
-    db.add(log_entry)
-    db.commit()
+        error_details=error_details,
+        next_retry_at=next_retry_at,
+        # Set here rather than by the DB, since buffered rows are inserted later
+        created_at=datetime.now(timezone.utc)
+    ))
 
-@celery_app.task
-def cleanup_old_webhook_logs():
-    """Delete webhook logs that are older than the retention period"""
+@celery_app.task(bind=True, max_retries=None)
+def deliver_webhook_batch(
+    self,
+    subscription_id: str,
+    items: list = None,
+    attempt_number: int = 1,
+    batch_id: str = None,
+    retry_delay: float = None,
+    window_id: str = None
+):
+    """
+    Deliver buffered webhooks of a micro-batching subscription as one signed JSON array
+    
+    Without `items`, up to batch_max_events deliveries are popped from the subscription's
+    buffer (app/services/batching.py), if window `window_id` (when given) is still open; retries, deferrals and parked batches carry their
+    `items` ({delivery_id, event_type, body, body_ref}). The batch goes through the
+    circuit breaker, the destination limiter and the retry policy as a single request,
+    and every delivery in it gets its own webhook_logs row per attempt.
+    """
     db = SessionLocal()
+    retrying = False
+    
     try:
-        cutoff_time = datetime.utcnow() - timedelta(hours=settings.LOG_RETENTION_HOURS)
-        logger.info(f"Cleaning up webhook logs older than {cutoff_time}")
+        subscription_data = get_subscription(db, subscription_id)
+        
+        if items is None:
+            max_events, window_ms = batch_settings(subscription_data or {}) or (
+                BATCH_MAX_EVENTS_LIMIT, settings.BATCH_WINDOW_MS
+            )
+            next_window_id = str(uuid.uuid4())
+            items, remaining = pop_batch(subscription_id, max_events, window_id, next_window_id)
+            # Buffered after this batch filled up, or while its flush was pending
+            if remaining >= max_events:
+                schedule_batch_flush(subscription_id)
+            elif remaining:
+                schedule_batch_flush(subscription_id, next_window_id, window_ms / 1000)
+            if not items:
+                return
+            batch_id = str(uuid.uuid4())
+        
+        logger.info(
+            f"Delivering batch {batch_id} of {len(items)} webhooks to subscription {subscription_id}, "
+            f"attempt {attempt_number}"
+        )
+        items = resolve_batch_items(db, subscription_id, subscription_data, items, attempt_number)
+        if not items:
+            return
+        
+        body = build_batch_body(items)
+        signature = sign_body(subscription_data, body)
         
-        # Delete logs older than the cutoff time
-        result = db.query(WebhookLog).filter(WebhookLog.created_at < cutoff_time).delete()
-        db.commit()
+        host = target_host(subscription_data["target_url"])
+        circuit = check_circuit(host)
+        if circuit == PARK:
+            logger.info(f"Circuit open for {host}, parking batch {batch_id}")
+            park_delivery(
+                host, batch_task_kwargs(subscription_id, items, attempt_number, batch_id, retry_delay),
+                deliver_webhook_batch.name
+            )
+            retrying = True
+            count_batch_event("circuit_breaker", {"parked": 1})
+            return
+        
+        # One batch is one request against the destination's limits
+        lease, wait = acquire_delivery_slot(subscription_data)
+        if wait:
+            if circuit == PROBE:
+                release_probe(host)
+            delay = wait * (1 + random.random() * 0.5)
+            logger.info(f"Destination limit reached for batch {batch_id}, deferring {delay:.2f}s")
+            schedule_delivery(
+                batch_task_kwargs(subscription_id, items, attempt_number, batch_id, retry_delay),
+                delay, deliver_webhook_batch.name
+            )
+            retrying = True
+            count_batch_event("limiter", {"deferred": 1})
+            return
+        
+        try:
+            headers = build_delivery_headers(batch_id, signature)
+            headers["X-Webhook-Batch-Size"] = str(len(items))
+            response = get_delivery_pool().post(
+                subscription_data["target_url"],
+                content=body.encode('utf-8'),
+                headers=headers
+            )
+        except httpx.RequestError:
+            record_circuit_result(host, None)
+            raise
+        finally:
+            release_delivery_slot(subscription_data, lease)
+        record_circuit_result(host, response.status_code)
         
-        logger.info(f"Deleted {result} old webhook logs")
+        if 200 <= response.status_code < 300:
+            logger.info(f"Successfully delivered batch {batch_id} to {subscription_data['target_url']}")
+            log_batch_result(
+                db, subscription_id, subscription_data["target_url"], items, attempt_number,
+                response.status_code, "SUCCESS"
+            )
+            count_batch_event("batching", {"batches": 1, "delivered": len(items)})
+        else:
+            retrying = record_failed_batch(
+                db, subscription_id, subscription_data, items, attempt_number, batch_id,
+                response.status_code, f"Target returned status code: {response.status_code}",
+                parse_retry_after(response.headers.get("Retry-After")), retry_delay
+            )
+    
+    except httpx.RequestError as e:
+        retrying = record_failed_batch(
+            db, subscription_id, subscription_data, items, attempt_number, batch_id,
+            None, f"Request error: {str(e)}", None, retry_delay
+        )
+    
     except Exception as e:
-        logger.error(f"Error cleaning up old webhook logs: {str(e)}")
+        logger.error(f"Error delivering batch {batch_id}: {str(e)}")
         db.rollback()
+        if items:
+            log_batch_result(
+                db, subscription_id, subscription_data["target_url"] if subscription_data else "",
+                items, attempt_number, None, "FAILURE", f"Unexpected error: {str(e)}"
+            )
+    finally:
+        db.close()
+        if items and not retrying:
+            for item in items:
+                if item.get("body_ref"):
+                    release_body(item["body_ref"])
+
+def resolve_batch_items(
+    db: Session,
+    subscription_id: str,
+    subscription_data: Optional[dict],
+    items: list,
+    attempt_number: int
+) -> list:
+    """Load claim-checked bodies; deliveries that can't be sent end here as FAILURE"""
+    if not subscription_data or not subscription_data["is_active"]:
+        error = "Subscription not found" if not subscription_data else "Subscription is inactive"
+        logger.info(f"{error}: not delivering batch to subscription {subscription_id}")
+        log_batch_result(
+            db, subscription_id, subscription_data["target_url"] if subscription_data else "",
+            items, attempt_number, None, "FAILURE", error
+        )
+        return []
+    
+    resolved = []
+    for item in items:
+        body = resolve_body(db, item["delivery_id"], None, item.get("body"), item.get("body_ref"))
+        if body is None:
+            logger.error(f"Body for webhook {item['delivery_id']} is no longer available")
+            log_delivery_result(
+                db, item["delivery_id"], subscription_id, subscription_data["target_url"],
+                None, attempt_number, None, "FAILURE",
+                "Payload no longer available", item.get("event_type")
+            )
+            continue
+        resolved.append(dict(item, body=body))
+    return resolved
+
+def record_failed_batch(
+    db: Session,
+    subscription_id: str,
+    subscription_data: dict,
+    items: list,
+    attempt_number: int,
+    batch_id: str,
+    status_code: Optional[int],
+    error_message: str,
+    retry_after: Optional[float] = None,
+    retry_delay: Optional[float] = None
+) -> bool:
+    """record_failed_attempt for a whole batch, which is retried as a unit; returns True if a retry was scheduled"""
+    logger.warning(f"Failed to deliver batch {batch_id}: {error_message}")
+    policy = resolve_retry_policy(subscription_data)
+    target_url = subscription_data["target_url"]
+    
+    if not is_retryable(status_code, policy):
+        log_batch_result(
+            db, subscription_id, target_url, items, attempt_number, status_code, "FAILURE",
+            f"Not retryable. {error_message}"
+        )
+        count_batch_event("retry_policy", {"terminal": len(items)})
+        return False
+    
+    if attempt_number < policy["max_attempts"]:
+        delay = next_retry_delay(policy, attempt_number, retry_delay, retry_after)
+        log_batch_result(
+            db, subscription_id, target_url, items, attempt_number, status_code, "FAILED_ATTEMPT",
+            error_message, next_retry_at=datetime.now(timezone.utc) + timedelta(seconds=delay)
+        )
+        logger.info(f"Scheduling retry {attempt_number + 1} for batch {batch_id} in {delay:.1f} seconds")
+        schedule_delivery(
+            batch_task_kwargs(subscription_id, items, attempt_number + 1, batch_id, delay),
+            delay, deliver_webhook_batch.name
+        )
+        return True
+    
+    logger.error(f"Maximum retry attempts reached for batch {batch_id}")
+    log_batch_result(
+        db, subscription_id, target_url, items, attempt_number, status_code, "FAILURE",
+        f"Maximum retry attempts reached. Last error: {error_message}"
+    )
+    return False
+
+def batch_task_kwargs(
+    subscription_id: str,
+    items: list,
+    attempt_number: int,
+    batch_id: str,
+    retry_delay: Optional[float] = None
+) -> dict:
+    return dict(
+        subscription_id=subscription_id,
+        # Claim-checked bodies stay in Redis; only the reference is re-sent
+        items=[dict(item, body=None if item.get("body_ref") else item["body"]) for item in items],
+        attempt_number=attempt_number,
+        batch_id=batch_id,
+        retry_delay=retry_delay
+    )
+
+def count_batch_event(group: str, counters: dict):
+    try:
+        incr_counters(group, counters)
+    except Exception as e:
+        logger.warning(f"Failed to count {group} batch event: {str(e)}")
+
+def log_batch_result(
+    db: Session,
+    subscription_id: str,
+    target_url: str,
+    items: list,
+    attempt_number: int,
+    status_code: Optional[int],
+    status: str,
+    error_details: str = None,
+    next_retry_at: Optional[datetime] = None
+):
+    """One log row per delivery in the batch"""
+    for item in items:
+        log_delivery_result(
+            db, item["delivery_id"], subscription_id, target_url,
+            item.get("body"), attempt_number, status_code, status,
+            error_details, item.get("event_type"), next_retry_at
+        )
+
+@celery_app.task
+def cleanup_old_webhook_logs():
+    """Delete webhook logs and payloads older than the retention period (chunked, time-budgeted)"""
+    try:
+        stats = cleanup_expired_logs()
+        logger.info(
+            f"Retention cleanup deleted {stats['rows_deleted']} rows in {stats['batches']} batches, "
+            f"dropped partitions {stats['partitions_dropped']}, lag {stats['lag_seconds']}s"
+            + ("" if stats["completed"] else " (time budget reached, resuming next run)")
+        )
+    except Exception as e:
+        logger.error(f"Error cleaning up old webhook logs: {str(e)}")
+
+@celery_app.task
+def pump_due_retries():
+    """Publish due entries of the Redis retry schedule, a batch at a time, for up to one pump interval"""
+    deadline = time.monotonic() + settings.RETRY_PUMP_INTERVAL
+    published = 0
+    try:
+        while True:
+            entries = pop_due_deliveries(settings.RETRY_PUMP_BATCH_SIZE)
+            if not entries:
+                break
+            publish_scheduled_deliveries(entries)
+            published += len(entries)
+            if len(entries) < settings.RETRY_PUMP_BATCH_SIZE or time.monotonic() >= deadline:
+                break
+    except Exception as e:
+        logger.error(f"Error publishing due retries: {str(e)}")
+    if published:
+        incr_counters("retry_scheduler", {"published": published})
+        logger.info(f"Published {published} due retries")
+
+def scheduled_task(entry: dict):
+    """The task and kwargs of a schedule or parked entry; plain kwargs, or no task name, are for deliver_webhook"""
+    if "kwargs" in entry:
+        return celery_app.tasks[entry["task"]] if entry.get("task") else deliver_webhook, entry["kwargs"]
+    return deliver_webhook, entry
+
+def publish_scheduled_deliveries(entries: list):
+    """Publish popped schedule entries over one producer; unpublished entries go back on failure"""
+    with celery_app.producer_or_acquire() as producer:
+        for i, entry in enumerate(entries):
+            try:
+                task, task_kwargs = scheduled_task(json.loads(entry))
+                task.apply_async(kwargs=task_kwargs, producer=producer)
+            except Exception:
+                reschedule_entries(entries[i:])
+                raise
+
+@celery_app.task
+def dispatch_lanes():
+    """Move deliveries from per-subscription lanes to the delivery queue, weighted round-robin, for up to one dispatch interval"""
+    deadline = time.monotonic() + settings.FAIR_DISPATCH_INTERVAL
+    dispatched = 0
+    db = SessionLocal()
+    try:
+        while time.monotonic() < deadline:
+            lanes = active_lanes()
+            if not lanes:
+                break
+            # Keep the shared queue shallow; the backlog waits in the lanes, where it can be interleaved
+            room = settings.FAIR_QUEUE_TARGET_DEPTH - delivery_queue_depth()
+            if room <= 0:
+                break
+            sent = dispatch_lane_round(db, lanes, room)
+            if not sent:
+                # Every lane with a backlog is at its per-second cap
+                break
+            dispatched += sent
+    except Exception as e:
+        logger.error(f"Error dispatching delivery lanes: {str(e)}")
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+    if dispatched:
+        incr_counters("lanes", {"dispatched": dispatched})
+
+def dispatch_lane_round(db: Session, lanes: list, room: int) -> int:
+    """One round over the lanes: up to lane_weight * FAIR_LANE_QUANTUM deliveries each, `room` in total"""
+    offset = next_lane_offset(len(lanes))
+    sent = 0
+    with celery_app.producer_or_acquire() as producer:
+        for subscription_id in lanes[offset:] + lanes[:offset]:
+            if sent >= room:
+                break
+            subscription_data = get_subscription(db, subscription_id) or {}
+            quantum = (subscription_data.get("lane_weight") or 1) * settings.FAIR_LANE_QUANTUM
+            entries = pop_lane(
+                subscription_id, min(quantum, room - sent), subscription_data.get("lane_max_per_second")
+            )
+            for i, entry in enumerate(entries):
+                try:
+                    deliver_webhook.apply_async(kwargs=json.loads(entry), producer=producer)
+                except Exception:
+                    return_to_lane(subscription_id, entries[i:])
+                    raise
+            sent += len(entries)
+    return sent
+
+def publish_parked_deliveries(host: str, entries: list):
+    """Publish popped parked deliveries over one producer; unpublished entries go back on failure"""
+    with celery_app.producer_or_acquire() as producer:
+        for i, entry in enumerate(entries):
+            try:
+                task, task_kwargs = scheduled_task(entry)
+                task.apply_async(kwargs=task_kwargs, producer=producer)
+            except Exception:
+                return_parked_deliveries(host, entries[i:])
+                raise
+
+def expire_parked_deliveries(host: str, entries: list):
+    """Record deliveries parked for too long as failed attempts; unrecorded entries go back on failure"""
+    if not entries:
+        return
+    db = SessionLocal()
+    try:
+        for i, entry in enumerate(entries):
+            try:
+                task, task_kwargs = scheduled_task(entry)
+                error_message = f"Circuit open for {host} longer than {settings.CIRCUIT_BREAKER_MAX_PARK_SECONDS:g}s"
+                if task is deliver_webhook_batch:
+                    expire_parked_batch(db, error_message, **task_kwargs)
+                else:
+                    expire_parked_delivery(db, error_message, **task_kwargs)
+            except Exception:
+                db.rollback()
+                return_parked_deliveries(host, entries[i:])
+                raise
+    finally:
+        db.close()
+
+def expire_parked_delivery(
+    db: Session,
+    error_message: str,
+    delivery_id: str,
+    subscription_id: str,
+    payload: dict = None,
+    attempt_number: int = 1,
+    event_type: str = None,
+    body: str = None,
+    signature: str = None,
+    body_ref: str = None,
+    retry_delay: float = None
+):
+    """A parked deliver_webhook delivery's attempt fails without a request; retried or failed per its policy"""
+    retrying = False
+    body = resolve_body(db, delivery_id, payload, body, body_ref)
+    subscription_data = prepare_delivery(db, delivery_id, subscription_id, body, attempt_number, event_type)
+    if subscription_data:
+        retrying = record_failed_attempt(
+            db, delivery_id, subscription_id, subscription_data, body,
+            attempt_number, event_type, None, error_message, signature, body_ref,
+            None, retry_delay
+        )
+    if body_ref and not retrying:
+        release_body(body_ref)
+
+def expire_parked_batch(
+    db: Session,
+    error_message: str,
+    subscription_id: str,
+    items: list,
+    attempt_number: int = 1,
+    batch_id: str = None,
+    retry_delay: float = None,
+    window_id: str = None
+):
+    """expire_parked_delivery for a parked batch, which is retried or failed as a unit"""
+    retrying = False
+    subscription_data = get_subscription(db, subscription_id)
+    resolved = resolve_batch_items(db, subscription_id, subscription_data, items, attempt_number)
+    if resolved:
+        retrying = record_failed_batch(
+            db, subscription_id, subscription_data, resolved, attempt_number, batch_id,
+            None, error_message, None, retry_delay
+        )
+    if not retrying:
+        for item in items:
+            if item.get("body_ref"):
+                release_body(item["body_ref"])
+
+@celery_app.task
+def drain_parked_deliveries():
+    """
+    Re-enqueue deliveries parked by open circuits: a batch per host once closed, one probe while half-open.
+    Deliveries parked for longer than CIRCUIT_BREAKER_MAX_PARK_SECONDS become failed attempts instead.
+    """
+    try:
+        drained = 0
+        expired = 0
+        for host in parked_hosts():
+            stale = pop_expired_parked_deliveries(host, settings.CIRCUIT_BREAKER_DRAIN_BATCH)
+            expire_parked_deliveries(host, stale)
+            expired += len(stale)
+            budget = drain_budget(host)
+            if budget <= 0:
+                continue
+            parked = pop_parked_deliveries(host, budget)
+            publish_parked_deliveries(host, parked)
+            drained += len(parked)
+            # A delivery parked after the pop keeps the host tracked
+            if len(parked) < budget:
+                forget_parked_host(host)
+        if drained:
+            incr_counters("circuit_breaker", {"drained": drained})
+            logger.info(f"Re-enqueued {drained} parked deliveries")
+        if expired:
+            incr_counters("circuit_breaker", {"expired": expired})
+            logger.warning(f"Recorded {expired} deliveries parked for too long as failed attempts")
+    except Exception as e:
+        logger.error(f"Error draining parked deliveries: {str(e)}")
+
+@celery_app.task
+def replay_dead_letters(
+    subscription_id: str,
+    start: str = None,
+    end: str = None,
+    status: str = None,
+    rate: float = None
+):
+    """
+    Re-deliver a subscription's dead letters that failed in [start, end) (ISO timestamps),
+    optionally only those whose last status matches `status` ('503', '5xx').
+    
+    Each run replays one batch, oldest first, as new deliveries and schedules the next
+    batch so that no more than `rate` deliveries per second are started.
+    """
+    rate = rate or settings.DEAD_LETTER_REPLAY_RATE
+    # At most one second's worth per batch, so the rate holds over short spans too
+    batch_size = max(1, min(settings.DEAD_LETTER_REPLAY_BATCH_SIZE, int(rate)))
+    try:
+        with engine.begin() as connection:
+            claimed, task_kwargs_list = claim_replay_batch(
+                connection, subscription_id,
+                datetime.fromisoformat(start) if start else None,
+                datetime.fromisoformat(end) if end else None,
+                parse_status_filter(status), batch_size
+            )
+        publish_replays(task_kwargs_list)
+    except Exception as e:
+        logger.error(f"Error replaying dead letters for subscription {subscription_id}: {str(e)}")
+        return
+    
+    if task_kwargs_list:
+        incr_counters("dead_letters", {"replayed": len(task_kwargs_list)})
+        logger.info(f"Replayed {len(task_kwargs_list)} dead letters for subscription {subscription_id}")
+    if claimed == batch_size:
+        schedule_delivery(
+            dict(subscription_id=subscription_id, start=start, end=end, status=status, rate=rate),
+            claimed / rate, replay_dead_letters.name
+        )
+
+def publish_replays(task_kwargs_list: list):
+    """
+    Publish replayed deliveries like ingest does; the ones not published get
+    their claims undone and their claim-checked bodies released.
+    """
+    if not task_kwargs_list:
+        return
+    large = [task_kwargs for task_kwargs in task_kwargs_list if should_claim_check(task_kwargs["body"])]
+    if large:
+        refs = store_bodies([task_kwargs["body"] for task_kwargs in large])
+        for task_kwargs, body_ref in zip(large, refs):
+            del task_kwargs["body"]
+            task_kwargs["body_ref"] = body_ref
+    published = 0
+    try:
+        if settings.FAIR_SCHEDULING_ENABLED:
+            published = enqueue_deliveries(task_kwargs_list)
+            if published < len(task_kwargs_list):
+                raise RuntimeError(f"Only {published} of {len(task_kwargs_list)} replays were added to their lanes")
+        else:
+            with celery_app.producer_or_acquire() as producer:
+                for task_kwargs in task_kwargs_list:
+                    deliver_webhook.apply_async(kwargs=task_kwargs, producer=producer)
+                    published += 1
+    except Exception:
+        unpublished = task_kwargs_list[published:]
+        with engine.begin() as connection:
+            unclaim_replays(connection, [task_kwargs["delivery_id"] for task_kwargs in unpublished])
+        for task_kwargs in unpublished:
+            if "body_ref" in task_kwargs:
+                release_body(task_kwargs["body_ref"])
+        raise
+
+@celery_app.task
+def maintain_webhook_log_partitions():
+    """Create upcoming daily webhook_logs partitions (expired ones are dropped by the retention cleanup)"""
+    try:
+        with engine.begin() as connection:
+            if not is_partitioned(connection):
+                return
+            created = create_log_partitions(connection, settings.LOG_PARTITION_PREMAKE_DAYS)
+        logger.info(f"Webhook log partitions created: {created}")
+    except Exception as e:
+        logger.error(f"Error maintaining webhook log partitions: {str(e)}")
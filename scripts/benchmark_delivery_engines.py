@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+"""
+Benchmark the prefork delivery path against the asyncio delivery engine.
+
+Starts a local target that answers every webhook after a fixed delay (a slow
+customer endpoint) and pushes the same number of deliveries through:
+
+  * prefork: N processes, each posting sequentially with DeliveryHTTPPool,
+    which is how a Celery prefork worker with concurrency N spends its slots
+  * asyncio: one process with AsyncDeliveryHTTPPool and C concurrent deliveries,
+    which is how app/workers/async_engine.py runs them
+
+Only the HTTP part of a delivery is measured; DB logging is identical for both.
+
+    python scripts/benchmark_delivery_engines.py --deliveries 2000 --target-delay 0.2
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+# Add parent directory to path so we can import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.services.delivery import AsyncDeliveryHTTPPool, DeliveryHTTPPool
+
+PAYLOAD = {"event": "order.created", "data": {"order_id": 123, "amount": 99.99}}
+
+async def _handle_target_connection(reader, writer, delay):
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            if length:
+                await reader.readexactly(length)
+            await asyncio.sleep(delay)
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+def _serve_target(port, delay, ready):
+    async def main():
+        await asyncio.start_server(
+            lambda r, w: _handle_target_connection(r, w, delay), "127.0.0.1", port, backlog=4096
+        )
+        ready.set()
+        await asyncio.Event().wait()
+    asyncio.run(main())
+
+def start_target(port, delay):
+    """Run the slow target in its own process so it doesn't compete with the client for the GIL"""
+    ready = multiprocessing.Event()
+    multiprocessing.Process(target=_serve_target, args=(port, delay, ready), daemon=True).start()
+    ready.wait()
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def _prefork_slot(args):
+    url, count = args
+    pool = DeliveryHTTPPool(timeout=30, max_connections_per_host=1, keepalive_expiry=60)
+    latencies = []
+    for _ in range(count):
+        started = time.perf_counter()
+        pool.post(url, json=PAYLOAD)
+        latencies.append(time.perf_counter() - started)
+    pool.close()
+    return latencies
+
+def run_prefork(url, deliveries, processes):
+    per_slot = [deliveries // processes + (1 if i < deliveries % processes else 0) for i in range(processes)]
+    with multiprocessing.Pool(processes) as pool:
+        started = time.perf_counter()
+        results = pool.map(_prefork_slot, [(url, count) for count in per_slot])
+        elapsed = time.perf_counter() - started
+    return elapsed, sorted(latency for slot in results for latency in slot)
+
+async def _run_asyncio(url, deliveries, concurrency):
+    pool = AsyncDeliveryHTTPPool(
+        timeout=30, max_connections_per_host=concurrency, keepalive_expiry=60,
+        shard_size=settings.ASYNC_ENGINE_POOL_SHARD_SIZE,
+    )
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def deliver():
+        async with semaphore:
+            started = time.perf_counter()
+            await pool.post(url, json=PAYLOAD)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(deliver() for _ in range(deliveries)))
+    elapsed = time.perf_counter() - started
+    await pool.aclose()
+    return elapsed, sorted(latencies)
+
+def report(name, deliveries, elapsed, latencies):
+    print(json.dumps({
+        "engine": name,
+        "deliveries": deliveries,
+        "elapsed_s": round(elapsed, 2),
+        "deliveries_per_s": round(deliveries / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+    }))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark prefork vs asyncio webhook delivery")
+    parser.add_argument("--deliveries", type=int, default=2000)
+    parser.add_argument("--target-delay", type=float, default=0.2, help="Seconds the target takes to respond")
+    parser.add_argument("--prefork-processes", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--async-concurrency", type=int, default=500)
+    parser.add_argument("--port", type=int, default=8899)
+    args = parser.parse_args()
+
+    start_target(args.port, args.target_delay)
+    url = f"http://127.0.0.1:{args.port}/webhook"
+
+    elapsed, latencies = run_prefork(url, args.deliveries, args.prefork_processes)
+    report(f"prefork x{args.prefork_processes}", args.deliveries, elapsed, latencies)
+
+    elapsed, latencies = asyncio.run(_run_asyncio(url, args.deliveries, args.async_concurrency))
+    report(f"asyncio x{args.async_concurrency}", args.deliveries, elapsed, latencies)
@@ -1,36 +1,37 @@
 #!/usr/bin/env python
+"""
+Run the retention cleanup by hand (same code as the cleanup_old_webhook_logs beat task).
+
+Deletes expired webhook logs and payloads in keyset-ordered chunks, pausing between
+chunks and stopping at the time budget; run it again to resume where it stopped.
+
+    python scripts/cleanup_logs.py --time-budget 600 --batch-size 10000
+"""
+import argparse
+import json
 import sys
 import os
 import logging
-from datetime import datetime, timedelta
 
 # Add parent directory to path so we can import app modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.db import SessionLocal
-from app.models.webhook_log import WebhookLog
 from app.config import settings
+from app.services.retention import cleanup_expired_logs
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def cleanup_old_logs():
+def cleanup_old_logs(time_budget: float, batch_size: int, pause_ms: int):
     """Delete webhook logs that are older than the retention period"""
-    db = SessionLocal()
-    try:
-        cutoff_time = datetime.utcnow() - timedelta(hours=settings.LOG_RETENTION_HOURS)
-        logger.info(f"Cleaning up webhook logs older than {cutoff_time}")
-        
-        # Delete logs older than the cutoff time
-        result = db.query(WebhookLog).filter(WebhookLog.created_at < cutoff_time).delete()
-        db.commit()
-        
-        logger.info(f"Deleted {result} old webhook logs")
-    except Exception as e:
-        logger.error(f"Error cleaning up old webhook logs: {str(e)}")
-        db.rollback()
-    finally:
-        db.close()
+    logger.info(f"Cleaning up webhook logs older than {settings.LOG_RETENTION_HOURS} hours")
+    stats = cleanup_expired_logs(time_budget=time_budget, batch_size=batch_size, pause=pause_ms / 1000)
+    logger.info(json.dumps(stats))
 
 if __name__ == "__main__":
-    cleanup_old_logs()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Delete expired webhook logs in chunks")
+    parser.add_argument("--time-budget", type=float, default=settings.LOG_CLEANUP_TIME_BUDGET, help="Seconds to spend before stopping")
+    parser.add_argument("--batch-size", type=int, default=settings.LOG_CLEANUP_BATCH_SIZE)
+    parser.add_argument("--pause-ms", type=int, default=settings.LOG_CLEANUP_PAUSE_MS)
+    args = parser.parse_args()
+    cleanup_old_logs(args.time_budget, args.batch_size, args.pause_ms)
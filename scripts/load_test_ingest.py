@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+"""
+Load test for POST /ingest/{subscription_id}
+
+Fires a fixed number of ingest requests with bounded concurrency and reports
+throughput and latency percentiles. Run it once against the old build and
+once against the new one to compare, e.g.:
+
+    python scripts/load_test_ingest.py --base-url http://localhost:8000 \\
+        --subscription-id <uuid> --requests 20000 --concurrency 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import httpx
+
+# Add parent directory to path so we can import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import generate_hmac_signature
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+async def run(args):
+    payload = {"event": "order.created", "data": {"order_id": 123, "amount": 99.99}}
+    body = json.dumps(payload).encode("utf-8")
+    headers = {"Content-Type": "application/json", "x-webhook-event": "order.created"}
+    if args.secret_key:
+        headers["x-hub-signature-256"] = f"sha256={generate_hmac_signature(body, args.secret_key)}"
+
+    url = f"{args.base_url.rstrip('/')}/ingest/{args.subscription_id}"
+    latencies = []
+    status_counts = {}
+    remaining = iter(range(args.requests))
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=args.timeout) as client:
+        async def worker():
+            for _ in remaining:
+                started = time.perf_counter()
+                try:
+                    response = await client.post(url, content=body, headers=headers)
+                    key = response.status_code
+                except httpx.HTTPError as e:
+                    key = type(e).__name__
+                latencies.append(time.perf_counter() - started)
+                status_counts[key] = status_counts.get(key, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"requests:     {args.requests}")
+    print(f"concurrency:  {args.concurrency}")
+    print(f"elapsed:      {elapsed:.2f}s")
+    print(f"requests/sec: {args.requests / elapsed:.1f}")
+    for pct in (50, 95, 99):
+        print(f"p{pct}:          {percentile(latencies, pct) * 1000:.1f} ms")
+    print(f"status codes: {status_counts}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the webhook ingest endpoint")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--subscription-id", required=True)
+    parser.add_argument("--secret-key", default=None)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,23 @@
+#!/usr/bin/env python
+"""
+Recompute the per-subscription delivery rollups from the deliveries table.
+
+Use after restoring data or if the counters are suspected to have drifted.
+"""
+import sys
+import os
+import logging
+
+# Add parent directory to path so we can import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db import engine
+from app.services.delivery_stats import rebuild_delivery_stats
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+if __name__ == "__main__":
+    with engine.begin() as connection:
+        count = rebuild_delivery_stats(connection)
+    logger.info(f"Rebuilt delivery stats for {count} subscriptions")